@@ -1,12 +1,72 @@
 import streamlit as st
 from modules.newEntry_comp import newEntry
-from modules.auth_utils import fetch_users, prepare_credentials, initialize_authenticator
+from modules.auth_utils import login, logout, get_current_user
 from modules.encoded_data import encoded_data_mps, encoded_data_ppo, encoded_data_pro
-from modules.query_cases_encoded import search_cases, display_cases
+from modules.query_cases_encoded import search_cases, display_cases, search_narratives
+from modules.reports import request_report, display_report_jobs
+from modules.crime_stats import display_crime_stats
 
 # Set page configuration
 st.set_page_config(page_title="PRO 12 CIR")
 
+# Tabs available to each role
+ROLE_TABS = {
+    "encoder": ["New Entry", "Encoded Data", "Search and Edit Entry", "Change Password"],
+    "viewer": ["Encoded Data", "Extract Report", "Change Password"],
+    "administrator": ["Encoded Data", "Extract Report", "Change Password"],
+}
+
+
+@st.experimental_fragment
+def new_entry_tab(mps_cps):
+    st.subheader("New Entry")
+    newEntry(mps_cps)
+
+
+@st.experimental_fragment
+def encoded_data_tab(role, mps_cps, ppo_cpo, pro):
+    # Encoders see their station, viewers their province and administrators the region
+    if role == "encoder":
+        encoded_data_mps(mps_cps)
+    elif role == "viewer":
+        st.subheader("Crime statistics")
+        display_crime_stats({"ppo_cpo": ppo_cpo})
+        encoded_data_ppo(ppo_cpo)
+        st.subheader("Search case narratives")
+        search_narratives({"ppo_cpo": ppo_cpo})
+    elif role == "administrator":
+        st.subheader("Crime statistics")
+        display_crime_stats({"pro": pro})
+        encoded_data_pro(pro)
+        st.subheader("Search case narratives")
+        search_narratives({"pro": pro})
+
+
+@st.experimental_fragment
+def search_tab(mps_cps):
+    st.subheader("You can search and edit your entries here")
+    search_cases(mps_cps)
+    display_cases()
+
+    st.subheader("Search case narratives")
+    search_narratives({"mps_cps": mps_cps})
+
+
+@st.experimental_fragment
+def extract_report_tab(role, ppo_cpo, pro, session_token):
+    st.subheader("You can extract report here in Detailed Crime Analysis Report Format")
+    # Viewers report on their province and administrators on the region
+    scope_params = {"ppo_cpo": ppo_cpo} if role == "viewer" else {"pro": pro}
+    request_report(scope_params, session_token)
+
+    st.subheader("Requested Reports")
+    display_report_jobs(session_token)
+
+
+def change_password_tab():
+    st.subheader("You can change your password here")
+    st.write(":red[Under Development]")
+
 # Hide the sidebar with custom CSS
 hide_sidebar_css = '''
 <style>
@@ -17,20 +77,14 @@ hide_sidebar_css = '''
 '''
 st.markdown(hide_sidebar_css, unsafe_allow_html=True)
 
-# Fetch users from FastAPI and prepare credentials
-users_data = fetch_users()
-credentials = prepare_credentials(users_data)
-
-# Initialize the authenticator
-authenticator = initialize_authenticator(credentials)
-
-authenticator.login(fields={'Form name': 'PRO 12 Crime Incident Recording User\'s Login'})
+# Only the user logging in is verified by the API, the signed session token
+# is then checked locally on every run
+login('PRO 12 Crime Incident Recording User\'s Login')
 
 if st.session_state["authentication_status"]:
     st.session_state['username'] = st.session_state["name"]
-    authenticator.logout()
-    username = st.session_state['username']
-    user_info = credentials["usernames"].get(username, {})
+    logout()
+    user_info = get_current_user()
     mps_cps = user_info.get("mps_cps", "")
     ppo_cpo = user_info.get("ppo_cpo", "")
     pro = user_info.get("pro","")
@@ -42,59 +96,22 @@ if st.session_state["authentication_status"]:
         st.session_state.page = "home"
 
     if st.session_state.page == "home":
-        if role == "encoder":
-            # Create tabs for navigation
-            tab1, tab2, tab3, tab4 = st.tabs(["New Entry", "Encoded Data", "Search and Edit Entry", "Change Password"])
-
-            with tab1:
-                st.subheader("New Entry")
-                entryCode = newEntry(mps_cps)
-
-            with tab2:
-                encoded_data_mps(mps_cps)
-
-            with tab3:
-                st.subheader("You can search and edit your entries here")
-                search_cases(mps_cps)
-                display_cases()
-
-            with tab4:
-                st.subheader("You can change your password here")
-                st.write(":red[Under Development]")
-
-        if role == "viewer":
-            # Create tabs for navigation
-            tab1, tab2, tab3 = st.tabs(["Encoded Data", "Extract Report", "Change Password"])
-
-            with tab1:
-                encoded_data_ppo(ppo_cpo)
-
-            with tab2:
-                st.subheader("You can extract report here in Detailed Crime Analysis Report Format")
-                st.write(":red[Under Development]")
-                # search_cases(mps_cps)
-                # display_cases()
-
-            with tab3:
-                st.subheader("You can change your password here")
-                st.write(":red[Under Development]")
-
-        if role == "administrator":
-            # Create tabs for navigation
-            tab1, tab2, tab3 = st.tabs(["Encoded Data", "Extract Report", "Change Password"])
-
-            with tab1:
-                encoded_data_pro(pro)
-
-            with tab2:
-                st.subheader("You can extract report here in Detailed Crime Analysis Report Format")
-                st.write(":red[Under Development]")
-                # search_cases(mps_cps)
-                # display_cases()
-
-            with tab3:
-                st.subheader("You can change your password here")
-                st.write(":red[Under Development]")
+        # Only the selected tab is rendered, unlike st.tabs which runs every tab
+        # body on each rerun, and each tab is a fragment so its widgets only rerun it
+        tabs = ROLE_TABS.get(role, [])
+        if tabs:
+            selected_tab = st.radio("Navigation", tabs, horizontal=True, label_visibility="collapsed", key="home_tab")
+
+            if selected_tab == "New Entry":
+                new_entry_tab(mps_cps)
+            elif selected_tab == "Encoded Data":
+                encoded_data_tab(role, mps_cps, ppo_cpo, pro)
+            elif selected_tab == "Search and Edit Entry":
+                search_tab(mps_cps)
+            elif selected_tab == "Extract Report":
+                extract_report_tab(role, ppo_cpo, pro, st.session_state["session_token"])
+            elif selected_tab == "Change Password":
+                change_password_tab()
 
 
 
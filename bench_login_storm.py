@@ -0,0 +1,88 @@
+# Login storm benchmark for sizing PASSWORD_HASH_WORKERS in main.py.
+# Fires --concurrency /login/ requests at a time for --seconds while timing
+# /cases requests alongside them, once with the API idle and once during the
+# storm. It reports login throughput and the p50/p99 of both endpoints.
+#
+#   PASSWORD_HASH_WORKERS=4 uvicorn main:app
+#   python bench_login_storm.py --url http://localhost:8000 --username encoder1 --password secret --mps-cps "Sample MPS"
+#
+# Repeat with PASSWORD_HASH_WORKERS at 1, 2, 4, 8 and so on, and keep the
+# smallest pool after which logins per second stop growing while the /cases
+# p99 during the storm stays close to the idle p99. Needs httpx.
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+
+def percentile(samples, q):
+    if len(samples) < 2:
+        return samples[0] if samples else float("nan")
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1]
+
+
+def summary(name, samples, seconds):
+    ms = [sample * 1000 for sample in samples]
+    return (
+        f"{name:<8} {len(samples):>6} requests  {len(samples) / seconds:8.1f}/s  "
+        f"p50 {percentile(ms, 50):8.1f} ms  p99 {percentile(ms, 99):8.1f} ms"
+    )
+
+
+async def timed(client, method, path, **kwargs):
+    started = time.perf_counter()
+    response = await client.request(method, path, **kwargs)
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    return elapsed
+
+
+async def login_worker(client, deadline, credentials, samples):
+    while time.perf_counter() < deadline:
+        samples.append(await timed(client, "POST", "/login/", json=credentials))
+
+
+async def cases_worker(client, deadline, mps_cps, samples):
+    while time.perf_counter() < deadline:
+        samples.append(await timed(client, "GET", "/cases", params={"mps_cps": mps_cps}))
+
+
+async def run(args):
+    credentials = {"username": args.username, "password": args.password}
+    limits = httpx.Limits(max_connections=args.concurrency + args.readers)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        idle = []
+        deadline = time.perf_counter() + args.seconds
+        await asyncio.gather(*(cases_worker(client, deadline, args.mps_cps, idle) for _ in range(args.readers)))
+
+        logins, busy = [], []
+        deadline = time.perf_counter() + args.seconds
+        await asyncio.gather(
+            *(login_worker(client, deadline, credentials, logins) for _ in range(args.concurrency)),
+            *(cases_worker(client, deadline, args.mps_cps, busy) for _ in range(args.readers)),
+        )
+
+    print(f"{args.concurrency} concurrent logins, {args.readers} /cases readers, {args.seconds}s per phase")
+    print("idle:")
+    print("  " + summary("/cases", idle, args.seconds))
+    print("during the login storm:")
+    print("  " + summary("/login/", logins, args.seconds))
+    print("  " + summary("/cases", busy, args.seconds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time /cases while /login/ is under load")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--mps-cps", required=True, help="Station whose /cases page is timed")
+    parser.add_argument("--concurrency", type=int, default=50, help="Logins in flight at once")
+    parser.add_argument("--readers", type=int, default=4, help="/cases requests in flight at once")
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--timeout", type=float, default=60)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 import streamlit as st
 
@@ -8,11 +9,17 @@ pg_conn = st.secrets["connections"]["postgresql"]
 
 
 DATABASE_URL = f"postgresql://{pg_conn['username']}:{pg_conn['password']}@{pg_conn['host']}:{pg_conn['port']}/{pg_conn['database']}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{pg_conn['username']}:{pg_conn['password']}@{pg_conn['host']}:{pg_conn['port']}/{pg_conn['database']}"
 
 engine = create_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Used by the FastAPI backend so queries do not block the event loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=async_engine)
+
 Base = declarative_base()
 
 # API Endpoint
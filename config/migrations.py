@@ -0,0 +1,271 @@
+from sqlalchemy import text
+from sqlalchemy.sql.expression import Executable
+import config.models as models
+from config.partitions import partition_existing_table
+from config.uuid7 import UUID7_AT_FUNCTION
+
+# Arbitrary key for the advisory lock that keeps several workers from migrating at once
+MIGRATION_LOCK_ID = 120012
+
+def create_missing_indexes(*names):
+    # create_all only builds indexes together with new tables, this adds the
+    # named indexes declared on the models to tables that already exist.
+    # Indexes are named explicitly so a migration keeps creating the same set
+    # when later models add more.
+    indexes = {
+        index.name: index
+        for table in models.Base.metadata.tables.values()
+        for index in table.indexes
+    }
+
+    def migrate(conn):
+        for name in names:
+            indexes[name].create(conn, checkfirst=True)
+    return migrate
+
+
+def case_summary_backfill(link):
+    # case_summary_upsert as it was when a migration was written, frozen as SQL
+    # so the migration doesn't pick up columns that later migrations add.
+    # link is the case_details column that victims and suspects are matched on.
+    return f"""
+        INSERT INTO case_summary (
+            entry_number, case_id, date_encoded, pro, ppo_cpo, mps_cps,
+            offense, offense_class, case_status, date_reported, time_reported,
+            date_committed, time_committed, victim_details, suspect_details
+        )
+        SELECT DISTINCT ON (case_details.entry_number)
+            case_details.entry_number, case_details.id, case_details.date_encoded,
+            case_details.pro, case_details.ppo_cpo, case_details.mps_cps,
+            case_details.offense, case_details.offense_class, case_details.case_status,
+            case_details.date_reported, case_details.time_reported,
+            case_details.date_committed, case_details.time_committed,
+            (SELECT string_agg(concat(
+                vic_fname, ' ', vic_midname, ' ', vic_lname, ' ', vic_qlfr, ' ',
+                vic_alias, ' (', vic_age, '/', vic_gndr, ')'), '; ')
+             FROM victim_details WHERE victim_details.{link} = case_details.{link}),
+            (SELECT string_agg(concat(
+                sus_fname, ' ', sus_midname, ' ', sus_lname, ' ', sus_qlfr, ' ',
+                sus_alias, ' (', sus_age, '/', sus_gndr, ')'), '; ')
+             FROM suspect_details WHERE suspect_details.{link} = case_details.{link})
+        FROM case_details
+        ORDER BY case_details.entry_number, case_details.date_encoded DESC
+        ON CONFLICT (entry_number) DO UPDATE SET
+            case_id = excluded.case_id, date_encoded = excluded.date_encoded,
+            pro = excluded.pro, ppo_cpo = excluded.ppo_cpo, mps_cps = excluded.mps_cps,
+            offense = excluded.offense, offense_class = excluded.offense_class,
+            case_status = excluded.case_status, date_reported = excluded.date_reported,
+            time_reported = excluded.time_reported, date_committed = excluded.date_committed,
+            time_committed = excluded.time_committed, victim_details = excluded.victim_details,
+            suspect_details = excluded.suspect_details
+    """
+
+
+# Statements of applied migrations as they were when the migration was
+# written, so a fresh database runs the same SQL the existing ones ran
+
+CASE_COUNTS_BACKFILL = """
+    INSERT INTO case_counts (pro, ppo_cpo, mps_cps, year_month, case_status, count)
+    SELECT coalesce(pro, ''), coalesce(ppo_cpo, ''), coalesce(mps_cps, ''),
+        to_char(date_encoded, 'YYYYMM'), coalesce(case_status, ''), count(*)
+    FROM case_summary
+    GROUP BY coalesce(pro, ''), coalesce(ppo_cpo, ''), coalesce(mps_cps, ''),
+        to_char(date_encoded, 'YYYYMM'), coalesce(case_status, '')
+"""
+
+QUERY_SHAPE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_case_summary_mps_cps_date_encoded ON case_summary (mps_cps, date_encoded DESC, case_id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_case_summary_ppo_cpo_date_encoded ON case_summary (ppo_cpo, date_encoded DESC, case_id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_case_summary_pro_date_encoded ON case_summary (pro, date_encoded DESC, case_id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_case_details_mps_cps_date_encoded ON case_details (mps_cps, date_encoded DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_case_details_ppo_cpo_date_encoded ON case_details (ppo_cpo, date_encoded DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_case_details_pro_date_encoded ON case_details (pro, date_encoded DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_case_details_entry_number_pattern ON case_details (entry_number text_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_victim_details_entry_number_summary ON victim_details (entry_number) "
+    "INCLUDE (vic_fname, vic_midname, vic_lname, vic_qlfr, vic_alias, vic_age, vic_gndr)",
+    "CREATE INDEX IF NOT EXISTS ix_suspect_details_entry_number_summary ON suspect_details (entry_number) "
+    "INCLUDE (sus_fname, sus_midname, sus_lname, sus_qlfr, sus_alias, sus_age, sus_gndr)",
+    "CREATE INDEX IF NOT EXISTS ix_case_counts_ppo_cpo ON case_counts (ppo_cpo)",
+    "CREATE INDEX IF NOT EXISTS ix_case_counts_mps_cps ON case_counts (mps_cps)",
+]
+
+CRIME_STATS_FUNCTION = """
+CREATE OR REPLACE FUNCTION crime_stats_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+        AND (OLD.pro, OLD.ppo_cpo, OLD.mps_cps, OLD.brgy, OLD.offense, OLD.offense_class, OLD.case_status, OLD.date_reported)
+        IS NOT DISTINCT FROM
+        (NEW.pro, NEW.ppo_cpo, NEW.mps_cps, NEW.brgy, NEW.offense, NEW.offense_class, NEW.case_status, NEW.date_reported)
+    THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE crime_stats SET count = count - 1
+        WHERE pro = coalesce(OLD.pro, '') AND ppo_cpo = coalesce(OLD.ppo_cpo, '')
+            AND mps_cps = coalesce(OLD.mps_cps, '') AND brgy = coalesce(OLD.brgy, '')
+            AND offense = coalesce(OLD.offense, '') AND offense_class = coalesce(OLD.offense_class, '')
+            AND case_status = coalesce(OLD.case_status, '') AND day = OLD.date_reported;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO crime_stats (pro, ppo_cpo, mps_cps, brgy, offense, offense_class, case_status, day, count)
+        VALUES (
+            coalesce(NEW.pro, ''), coalesce(NEW.ppo_cpo, ''), coalesce(NEW.mps_cps, ''), coalesce(NEW.brgy, ''),
+            coalesce(NEW.offense, ''), coalesce(NEW.offense_class, ''), coalesce(NEW.case_status, ''), NEW.date_reported, 1
+        )
+        ON CONFLICT (pro, ppo_cpo, mps_cps, brgy, offense, offense_class, case_status, day)
+        DO UPDATE SET count = crime_stats.count + 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+CRIME_STATS_TRIGGER = (
+    "CREATE TRIGGER case_details_crime_stats AFTER INSERT OR UPDATE OR DELETE ON case_details "
+    "FOR EACH ROW EXECUTE FUNCTION crime_stats_apply()"
+)
+
+CRIME_STATS_BACKFILL = """
+    INSERT INTO crime_stats (pro, ppo_cpo, mps_cps, brgy, offense, offense_class, case_status, day, count)
+    SELECT coalesce(pro, ''), coalesce(ppo_cpo, ''), coalesce(mps_cps, ''), coalesce(brgy, ''),
+        coalesce(offense, ''), coalesce(offense_class, ''), coalesce(case_status, ''), date_reported, count(*)
+    FROM case_details
+    GROUP BY coalesce(pro, ''), coalesce(ppo_cpo, ''), coalesce(mps_cps, ''), coalesce(brgy, ''),
+        coalesce(offense, ''), coalesce(offense_class, ''), coalesce(case_status, ''), date_reported
+"""
+
+
+# Applied once each, in order, and recorded in schema_migrations.
+# A statement is a SQL string, a SQLAlchemy executable or a callable taking the connection.
+# Entries are append-only: an applied migration is never edited or renamed, a
+# change goes into a new entry. Steps must not build on code that later
+# migrations change (e.g. query builders over the models); freeze them as SQL.
+MIGRATIONS = [
+    ("0001_backfill_case_summary", [
+        case_summary_backfill("entry_number"),
+    ]),
+    ("0002_backfill_case_counts", [
+        CASE_COUNTS_BACKFILL,
+    ]),
+    ("0003_query_shape_indexes", [
+        *QUERY_SHAPE_INDEXES,
+    ]),
+    ("0004_case_summary_trigram_indexes", [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        create_missing_indexes(
+            "ix_case_summary_entry_number_trgm",
+            "ix_case_summary_victim_details_trgm",
+            "ix_case_summary_suspect_details_trgm",
+        ),
+    ]),
+    ("0005_case_details_narrative_search", [
+        "ALTER TABLE case_details ADD COLUMN IF NOT EXISTS narrative_tsv tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('english', coalesce(narrative, ''))) STORED",
+        create_missing_indexes("ix_case_details_narrative_tsv"),
+    ]),
+    ("0006_temp_entry_reservations", [
+        "ALTER TABLE temp_entries ADD COLUMN IF NOT EXISTS owner VARCHAR",
+        "ALTER TABLE temp_entries ADD COLUMN IF NOT EXISTS expires_at TIMESTAMP WITH TIME ZONE",
+        "ALTER TABLE temp_edit_entries ADD COLUMN IF NOT EXISTS owner VARCHAR",
+        "ALTER TABLE temp_edit_entries ADD COLUMN IF NOT EXISTS expires_at TIMESTAMP WITH TIME ZONE",
+        # Rows left over from the old handoff have no owner and are purged right away
+        "UPDATE temp_entries SET expires_at = now() WHERE expires_at IS NULL",
+        "UPDATE temp_edit_entries SET expires_at = now() WHERE expires_at IS NULL",
+        create_missing_indexes("ix_temp_entries_expires_at", "ix_temp_edit_entries_expires_at"),
+    ]),
+    ("0007_crime_stats", [
+        "ALTER TABLE case_details ADD COLUMN IF NOT EXISTS brgy VARCHAR",
+        # crime_stats itself is new, so create_all has already made it and its indexes
+        CRIME_STATS_FUNCTION,
+        "DROP TRIGGER IF EXISTS case_details_crime_stats ON case_details",
+        CRIME_STATS_TRIGGER,
+        "DELETE FROM crime_stats",
+        CRIME_STATS_BACKFILL,
+    ]),
+    ("0008_partition_case_tables", [
+        partition_existing_table(models.CaseDetails),
+        partition_existing_table(models.Victim_Details),
+        partition_existing_table(models.Suspect_Details),
+        # Dropping the old case_details dropped its trigger as well
+        "DROP TRIGGER IF EXISTS case_details_crime_stats ON case_details",
+        CRIME_STATS_TRIGGER,
+    ]),
+    ("0009_uuid7_case_keys", [
+        # Re-key the uuid4 rows with version 7 ids taken from their date_encoded,
+        # then point case_summary at the new case ids
+        UUID7_AT_FUNCTION,
+        "UPDATE case_details SET id = uuid7_at(date_encoded) WHERE substring(id::text FROM 15 FOR 1) = '4'",
+        "UPDATE victim_details SET id = uuid7_at(date_encoded) WHERE substring(id::text FROM 15 FOR 1) = '4'",
+        "UPDATE suspect_details SET id = uuid7_at(date_encoded) WHERE substring(id::text FROM 15 FOR 1) = '4'",
+        case_summary_backfill("entry_number"),
+    ]),
+    ("0010_case_no", [
+        # case_no_seq is new, so create_all has already made it
+        "ALTER TABLE case_details ADD COLUMN IF NOT EXISTS case_no BIGINT",
+        "ALTER TABLE victim_details ADD COLUMN IF NOT EXISTS case_no BIGINT",
+        "ALTER TABLE suspect_details ADD COLUMN IF NOT EXISTS case_no BIGINT",
+        # Number the existing cases in the order they were first encoded
+        "UPDATE case_details SET case_no = numbered.case_no FROM ("
+        "SELECT entry_number, nextval('case_no_seq') AS case_no FROM ("
+        "SELECT entry_number FROM case_details WHERE case_no IS NULL GROUP BY entry_number ORDER BY min(date_encoded)"
+        ") entries) numbered "
+        "WHERE case_details.entry_number = numbered.entry_number",
+        "UPDATE victim_details SET case_no = case_details.case_no FROM case_details "
+        "WHERE victim_details.entry_number = case_details.entry_number AND victim_details.case_no IS NULL",
+        "UPDATE suspect_details SET case_no = case_details.case_no FROM case_details "
+        "WHERE suspect_details.entry_number = case_details.entry_number AND suspect_details.case_no IS NULL",
+        create_missing_indexes("ix_victim_details_case_no_summary", "ix_suspect_details_case_no_summary"),
+        models.CASE_NO_ASSIGN_FUNCTION,
+        models.CASE_NO_LINK_FUNCTION,
+        "DROP TRIGGER IF EXISTS case_details_case_no ON case_details",
+        "DROP TRIGGER IF EXISTS victim_details_case_no ON victim_details",
+        "DROP TRIGGER IF EXISTS suspect_details_case_no ON suspect_details",
+        *models.CASE_NO_TRIGGERS.values(),
+        # case_summary now collects victims and suspects by case_no
+        case_summary_backfill("case_no"),
+    ]),
+    ("0011_query_shape_indexes_by_name", [
+        # The 0003 indexes looked up on the models by name, as later index
+        # migrations do; a no-op wherever 0003 created them
+        create_missing_indexes(
+            "ix_case_summary_mps_cps_date_encoded",
+            "ix_case_summary_ppo_cpo_date_encoded",
+            "ix_case_summary_pro_date_encoded",
+            "ix_case_details_mps_cps_date_encoded",
+            "ix_case_details_ppo_cpo_date_encoded",
+            "ix_case_details_pro_date_encoded",
+            "ix_case_details_entry_number_pattern",
+            "ix_victim_details_entry_number_summary",
+            "ix_suspect_details_entry_number_summary",
+            "ix_case_counts_ppo_cpo",
+            "ix_case_counts_mps_cps",
+        ),
+    ]),
+]
+
+
+def run_migrations(engine):
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "name VARCHAR PRIMARY KEY, "
+            "applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now())"
+        ))
+        applied = set(conn.execute(text("SELECT name FROM schema_migrations")).scalars())
+
+        for name, statements in MIGRATIONS:
+            if name in applied:
+                continue
+            for statement in statements:
+                if isinstance(statement, str):
+                    conn.execute(text(statement))
+                elif isinstance(statement, Executable):
+                    # Checked before callable: DDL elements are callable too
+                    conn.execute(statement)
+                else:
+                    statement(conn)
+            conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": name})
@@ -1,10 +1,11 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, Date, Time, ForeignKey, func, TIMESTAMP
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, Integer, BigInteger, Sequence, String, DateTime, Date, Time, ForeignKey, func, TIMESTAMP, Index, DDL, event, Computed
+from sqlalchemy.orm import relationship, deferred
 from config.database import Base
 from sqlalchemy.sql import func
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
 import uuid
+from config.uuid7 import uuid7
 
 class UserBase(Base):
     __tablename__ = 'userbase'
@@ -27,12 +28,24 @@ class Station_Sequence(Base):
     ppo_cpo = Column(String)
 
 
+class Entry_Number_Counter(Base):
+    __tablename__ = 'entry_number_counter'
+
+    # Last entry number handed out to a station for a YYYYMM month
+    mps_cps = Column(String, primary_key=True)
+    year_month = Column(String, primary_key=True)
+    last_value = Column(Integer, nullable=False, default=0)
+
+
 class TempEntry(Base):
     __tablename__ = 'temp_entries'
 
     id = Column(Integer, primary_key=True, index=True)
     combined_value = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Username of the encoder holding the entry, and when an abandoned entry is purged
+    owner = Column(String, nullable=True)
+    expires_at = Column(DateTime(timezone=True), index=True)
 
 class TempEditEntry(Base):
     __tablename__ = 'temp_edit_entries'
@@ -40,6 +53,8 @@ class TempEditEntry(Base):
     id = Column(Integer, primary_key=True, index=True)
     entry_number = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    owner = Column(String, nullable=True)
+    expires_at = Column(DateTime(timezone=True), index=True)
 
 class Province_Brgy_Details(Base):
     __tablename__ = 'regionxii_brgy'
@@ -63,10 +78,16 @@ class Offense(Base):
 
 class CaseDetails(Base):
     __tablename__ = 'case_details'
+    # Monthly partitions by date_encoded, see config/partitions.py. Postgres needs
+    # the partition key in the primary key; rows are still identified by id alone.
+    __table_args__ = {"postgresql_partition_by": "RANGE (date_encoded)"}
+    __mapper_args__ = {"primary_key": ["id"]}
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    date_encoded = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    date_encoded = Column(TIMESTAMP(timezone=True), primary_key=True, server_default=func.now())
     entry_number = Column(String, index=True, nullable=False)
+    # Shared by every row of the entry number and copied to its victims and suspects
+    case_no = Column(BigInteger)
     pro = Column(String, nullable=True)
     ppo_cpo = Column(String, nullable=True)
     mps_cps = Column(String, nullable=True)
@@ -79,6 +100,10 @@ class CaseDetails(Base):
     time_reported = Column(Time, nullable=True)
     date_committed = Column(Date, nullable=True)
     time_committed = Column(Time, nullable=True)
+    # Barangay of the place of commission
+    brgy = Column(String, nullable=True)
+    # Kept by Postgres for /search_narrative, deferred so case rows don't carry it
+    narrative_tsv = deferred(Column(TSVECTOR, Computed("to_tsvector('english', coalesce(narrative, ''))", persisted=True)))
 
     # victims = relationship("Victim_Details", back_populates="case")
     # suspects = relationship("Suspect_Details", back_populates="case")
@@ -86,11 +111,16 @@ class CaseDetails(Base):
 
 class Victim_Details(Base):
     __tablename__ = 'victim_details'
+    __table_args__ = {"postgresql_partition_by": "RANGE (date_encoded)"}
+    __mapper_args__ = {"primary_key": ["id"]}
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    date_encoded = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    date_encoded = Column(TIMESTAMP(timezone=True), primary_key=True, server_default=func.now())
     entry_number = Column(String, index=True)
     # entry_number = Column(String, ForeignKey('case_details.entry_number'), index=True)
+    # case_no of the case, set from entry_number by the case_no_link trigger.
+    # No foreign key: case_no is not unique in the partitioned case_details.
+    case_no = Column(BigInteger)
     pro = Column(String)
     ppo_cpo = Column(String)
     mps_cps = Column(String)
@@ -111,11 +141,16 @@ class Victim_Details(Base):
 
 class Suspect_Details(Base):
     __tablename__ = 'suspect_details'
+    __table_args__ = {"postgresql_partition_by": "RANGE (date_encoded)"}
+    __mapper_args__ = {"primary_key": ["id"]}
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    date_encoded = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    date_encoded = Column(TIMESTAMP(timezone=True), primary_key=True, server_default=func.now())
     entry_number = Column(String, index=True)
     # entry_number = Column(String, ForeignKey('case_details.entry_number'), index=True)
+    # case_no of the case, set from entry_number by the case_no_link trigger.
+    # No foreign key: case_no is not unique in the partitioned case_details.
+    case_no = Column(BigInteger)
     pro = Column(String)
     ppo_cpo = Column(String)
     mps_cps = Column(String)
@@ -131,4 +166,238 @@ class Suspect_Details(Base):
     sus_brgy = Column(String)
     sus_strName = Column(String)
 
-    # case = relationship("CaseDetails", back_populates="suspects")
\ No newline at end of file
+    # case = relationship("CaseDetails", back_populates="suspects")
+
+
+# Numbers the cases for case_no
+CASE_NO_SEQUENCE = Sequence("case_no_seq", metadata=Base.metadata)
+
+
+class Case_Summary(Base):
+    __tablename__ = 'case_summary'
+
+    # One row per case with the victim and suspect details already rendered,
+    # kept up to date by the endpoints that write cases, victims and suspects
+    entry_number = Column(String, primary_key=True)
+    case_id = Column(UUID(as_uuid=True), nullable=False)
+    date_encoded = Column(TIMESTAMP(timezone=True))
+    pro = Column(String)
+    ppo_cpo = Column(String)
+    mps_cps = Column(String)
+    offense = Column(String)
+    offense_class = Column(String)
+    case_status = Column(String)
+    date_reported = Column(Date)
+    time_reported = Column(Time)
+    date_committed = Column(Date)
+    time_committed = Column(Time)
+    victim_details = Column(String)
+    suspect_details = Column(String)
+
+
+class Case_Count(Base):
+    __tablename__ = 'case_counts'
+
+    # Number of cases per scope, encoding month and status, kept up to date
+    # together with case_summary. A case is an entry number, as in case_summary,
+    # not a case_details row. Missing scope values are stored as ''.
+    pro = Column(String, primary_key=True)
+    ppo_cpo = Column(String, primary_key=True)
+    mps_cps = Column(String, primary_key=True)
+    year_month = Column(String, primary_key=True)
+    case_status = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class Crime_Stat(Base):
+    __tablename__ = 'crime_stats'
+
+    # Number of case_details rows, i.e. offenses, per place, offense, status and
+    # reporting day. Kept up to date by a trigger on case_details, see below.
+    # Missing values are stored as ''.
+    pro = Column(String, primary_key=True)
+    ppo_cpo = Column(String, primary_key=True)
+    mps_cps = Column(String, primary_key=True)
+    brgy = Column(String, primary_key=True)
+    offense = Column(String, primary_key=True)
+    offense_class = Column(String, primary_key=True)
+    case_status = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class Report_Job(Base):
+    __tablename__ = 'report_jobs'
+
+    # A Detailed Crime Analysis Report requested from the dashboard. Jobs are
+    # built by the API's report workers: queued -> running -> done or failed.
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    requested_by = Column(String)
+    scope = Column(String, nullable=False)  # pro, ppo_cpo or mps_cps
+    scope_value = Column(String, nullable=False)
+    date_from = Column(Date, nullable=False)
+    date_to = Column(Date, nullable=False)
+    format = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued")
+    error = Column(String)
+    file_path = Column(String)
+    row_count = Column(Integer)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    started_at = Column(TIMESTAMP(timezone=True))
+    finished_at = Column(TIMESTAMP(timezone=True))
+
+
+# =====================================================
+# Indexes matching the query shapes of the list, count and summary queries
+
+# Case lists and exports: one scope, newest first, keyset on (date_encoded, case_id)
+Index("ix_case_summary_mps_cps_date_encoded", Case_Summary.mps_cps, Case_Summary.date_encoded.desc(), Case_Summary.case_id.desc())
+Index("ix_case_summary_ppo_cpo_date_encoded", Case_Summary.ppo_cpo, Case_Summary.date_encoded.desc(), Case_Summary.case_id.desc())
+Index("ix_case_summary_pro_date_encoded", Case_Summary.pro, Case_Summary.date_encoded.desc(), Case_Summary.case_id.desc())
+
+Index("ix_case_details_mps_cps_date_encoded", CaseDetails.mps_cps, CaseDetails.date_encoded.desc())
+Index("ix_case_details_ppo_cpo_date_encoded", CaseDetails.ppo_cpo, CaseDetails.date_encoded.desc())
+Index("ix_case_details_pro_date_encoded", CaseDetails.pro, CaseDetails.date_encoded.desc())
+
+# Prefix LIKE on entry_number when seeding the entry number counter
+Index("ix_case_details_entry_number_pattern", CaseDetails.entry_number, postgresql_ops={"entry_number": "text_pattern_ops"})
+
+# Victim and suspect summaries are built per entry_number; the included columns
+# let them be answered from the index alone
+Index(
+    "ix_victim_details_entry_number_summary", Victim_Details.entry_number,
+    postgresql_include=["vic_fname", "vic_midname", "vic_lname", "vic_qlfr", "vic_alias", "vic_age", "vic_gndr"]
+)
+Index(
+    "ix_suspect_details_entry_number_summary", Suspect_Details.entry_number,
+    postgresql_include=["sus_fname", "sus_midname", "sus_lname", "sus_qlfr", "sus_alias", "sus_age", "sus_gndr"]
+)
+
+# Victim and suspect summaries and the case bundle join on case_no
+Index(
+    "ix_victim_details_case_no_summary", Victim_Details.case_no,
+    postgresql_include=["vic_fname", "vic_midname", "vic_lname", "vic_qlfr", "vic_alias", "vic_age", "vic_gndr"]
+)
+Index(
+    "ix_suspect_details_case_no_summary", Suspect_Details.case_no,
+    postgresql_include=["sus_fname", "sus_midname", "sus_lname", "sus_qlfr", "sus_alias", "sus_age", "sus_gndr"]
+)
+
+# Province and station counts; region counts use the leading pro column of the primary key
+Index("ix_case_counts_ppo_cpo", Case_Count.ppo_cpo)
+Index("ix_case_counts_mps_cps", Case_Count.mps_cps)
+
+# Substring search over entry numbers and the rendered victim and suspect names
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+Index("ix_case_summary_entry_number_trgm", Case_Summary.entry_number, postgresql_using="gin", postgresql_ops={"entry_number": "gin_trgm_ops"})
+Index("ix_case_summary_victim_details_trgm", Case_Summary.victim_details, postgresql_using="gin", postgresql_ops={"victim_details": "gin_trgm_ops"})
+Index("ix_case_summary_suspect_details_trgm", Case_Summary.suspect_details, postgresql_using="gin", postgresql_ops={"suspect_details": "gin_trgm_ops"})
+
+# Full-text search over case narratives
+Index("ix_case_details_narrative_tsv", CaseDetails.narrative_tsv, postgresql_using="gin")
+
+# Report job list of a user, newest first
+Index("ix_report_jobs_requested_by_created_at", Report_Job.requested_by, Report_Job.created_at.desc())
+
+# /stats slices by province or station over a range of days; region slices use the leading pro column of the primary key
+Index("ix_crime_stats_ppo_cpo_day", Crime_Stat.ppo_cpo, Crime_Stat.day)
+Index("ix_crime_stats_mps_cps_day", Crime_Stat.mps_cps, Crime_Stat.day)
+
+# crime_stats follows every insert, update and delete of case_details. A trigger
+# is used because PATCH and the summary refresh never see the values a row had
+# before it was updated, and those are needed to move the row's count.
+CRIME_STATS_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION crime_stats_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+        AND (OLD.pro, OLD.ppo_cpo, OLD.mps_cps, OLD.brgy, OLD.offense, OLD.offense_class, OLD.case_status, OLD.date_reported)
+        IS NOT DISTINCT FROM
+        (NEW.pro, NEW.ppo_cpo, NEW.mps_cps, NEW.brgy, NEW.offense, NEW.offense_class, NEW.case_status, NEW.date_reported)
+    THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE crime_stats SET count = count - 1
+        WHERE pro = coalesce(OLD.pro, '') AND ppo_cpo = coalesce(OLD.ppo_cpo, '')
+            AND mps_cps = coalesce(OLD.mps_cps, '') AND brgy = coalesce(OLD.brgy, '')
+            AND offense = coalesce(OLD.offense, '') AND offense_class = coalesce(OLD.offense_class, '')
+            AND case_status = coalesce(OLD.case_status, '') AND day = OLD.date_reported;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO crime_stats (pro, ppo_cpo, mps_cps, brgy, offense, offense_class, case_status, day, count)
+        VALUES (
+            coalesce(NEW.pro, ''), coalesce(NEW.ppo_cpo, ''), coalesce(NEW.mps_cps, ''), coalesce(NEW.brgy, ''),
+            coalesce(NEW.offense, ''), coalesce(NEW.offense_class, ''), coalesce(NEW.case_status, ''), NEW.date_reported, 1
+        )
+        ON CONFLICT (pro, ppo_cpo, mps_cps, brgy, offense, offense_class, case_status, day)
+        DO UPDATE SET count = crime_stats.count + 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""")
+CRIME_STATS_TRIGGER = DDL(
+    "CREATE TRIGGER case_details_crime_stats AFTER INSERT OR UPDATE OR DELETE ON case_details "
+    "FOR EACH ROW EXECUTE FUNCTION crime_stats_apply()"
+)
+event.listen(CaseDetails.__table__, "after_create", CRIME_STATS_FUNCTION)
+event.listen(CaseDetails.__table__, "after_create", CRIME_STATS_TRIGGER)
+
+# case_no is kept by triggers so every way of writing cases, victims and
+# suspects, including the ones that only know the entry number, links them.
+# A case row takes the case_no of the other rows of its entry number or a new
+# one, and links the victims and suspects that were stored before it.
+CASE_NO_ASSIGN_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION case_no_assign() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.entry_number IS NOT DISTINCT FROM OLD.entry_number THEN
+        RETURN NEW;
+    END IF;
+
+    SELECT case_no INTO NEW.case_no FROM case_details
+    WHERE entry_number = NEW.entry_number AND case_no IS NOT NULL
+    LIMIT 1;
+    IF NEW.case_no IS NULL THEN
+        NEW.case_no := nextval('case_no_seq');
+    END IF;
+
+    UPDATE victim_details SET case_no = NEW.case_no
+    WHERE entry_number = NEW.entry_number AND case_no IS DISTINCT FROM NEW.case_no;
+    UPDATE suspect_details SET case_no = NEW.case_no
+    WHERE entry_number = NEW.entry_number AND case_no IS DISTINCT FROM NEW.case_no;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+""")
+CASE_NO_LINK_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION case_no_link() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.entry_number IS NOT DISTINCT FROM OLD.entry_number THEN
+        RETURN NEW;
+    END IF;
+
+    NEW.case_no := (SELECT case_no FROM case_details WHERE entry_number = NEW.entry_number LIMIT 1);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+""")
+CASE_NO_TRIGGERS = {
+    table: DDL(
+        f"CREATE TRIGGER {table.name}_case_no BEFORE INSERT OR UPDATE OF entry_number ON {table.name} "
+        f"FOR EACH ROW EXECUTE FUNCTION {function}()"
+    )
+    for table, function in [
+        (CaseDetails.__table__, "case_no_assign"),
+        (Victim_Details.__table__, "case_no_link"),
+        (Suspect_Details.__table__, "case_no_link"),
+    ]
+}
+event.listen(CaseDetails.__table__, "after_create", CASE_NO_ASSIGN_FUNCTION)
+event.listen(Victim_Details.__table__, "after_create", CASE_NO_LINK_FUNCTION)
+event.listen(Suspect_Details.__table__, "after_create", CASE_NO_LINK_FUNCTION)
+for table, trigger in CASE_NO_TRIGGERS.items():
+    event.listen(table, "after_create", trigger)
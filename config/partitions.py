@@ -0,0 +1,208 @@
+import re
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import text, table, column, select, exists
+import config.models as models
+
+# case_details, victim_details and suspect_details are range partitioned by the
+# month of date_encoded. Months are UTC; partitions are named <table>_pYYYYMM and
+# rows outside every month partition land in <table>_default.
+PARTITIONED_MODELS = (models.CaseDetails, models.Victim_Details, models.Suspect_Details)
+
+# Months after the current one that always have a partition ready
+PARTITION_MONTHS_AHEAD = 3
+
+# Advisory lock that keeps API workers starting together from creating the same partition
+PARTITION_LOCK_ID = 120013
+
+# Entry numbers end in -YYYYMM-N, the month the number was reserved
+ENTRY_NUMBER_MONTH = re.compile(r'-(\d{4})(\d{2})-\d+$')
+
+PARTITION_NAME = re.compile(r'_p(\d{4})(\d{2})$')
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(month: date) -> date:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(table_name: str, month: date) -> str:
+    return f"{table_name}_p{month:%Y%m}"
+
+
+def create_month_partition(conn, table_name: str, month: date, parent: str = None):
+    # parent is only given while a table is being converted under a temporary name
+    conn.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(table_name, month)}" PARTITION OF "{parent or table_name}" '
+        f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{next_month(month):%Y-%m-%d} 00:00:00+00')"
+    ))
+
+
+def create_default_partition(conn, table_name: str, parent: str = None):
+    conn.execute(text(f'CREATE TABLE IF NOT EXISTS "{table_name}_default" PARTITION OF "{parent or table_name}" DEFAULT'))
+
+
+def archive_table_name(table_name: str) -> str:
+    return f"{table_name}_archive"
+
+
+def create_archive_table(conn, table_name: str):
+    # <table>_archive receives the partitions moved out by archive_partitions.
+    # It copies the live table's columns and indexes, so a migration that adds a
+    # column to a case table has to add it to the archive table as well.
+    conn.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{archive_table_name(table_name)}" '
+        f'(LIKE "{table_name}" INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING INDEXES) '
+        f"PARTITION BY RANGE (date_encoded)"
+    ))
+
+
+def ensure_partitions(conn, since: date = None):
+    # Creates the default partition, the archive table and every month partition
+    # from since (or the current month) through PARTITION_MONTHS_AHEAD months
+    # ahead. Safe to repeat.
+    conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": PARTITION_LOCK_ID})
+    today = datetime.now(timezone.utc).date()
+    last = month_start(today)
+    for _ in range(PARTITION_MONTHS_AHEAD):
+        last = next_month(last)
+
+    for model in PARTITIONED_MODELS:
+        table_name = model.__tablename__
+        create_default_partition(conn, table_name)
+        create_archive_table(conn, table_name)
+        month = month_start(since or today)
+        while month <= last:
+            create_month_partition(conn, table_name, month)
+            month = next_month(month)
+
+
+def partition_existing_table(model):
+    # Migration step that turns a plain case table into a partitioned one:
+    # build the partitioned copy next to it, move the rows, then swap the names
+    table = model.__table__
+    table_name = table.name
+    staging = f"{table_name}_partitioned"
+
+    def migrate(conn):
+        relkind = conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"), {"name": table_name}).scalar()
+        if relkind == 'p':
+            # Created partitioned by create_all
+            return
+
+        conn.execute(text(
+            f'CREATE TABLE "{staging}" (LIKE "{table_name}" INCLUDING DEFAULTS INCLUDING GENERATED) '
+            f"PARTITION BY RANGE (date_encoded)"
+        ))
+
+        first = conn.execute(text(f'SELECT min(date_encoded) FROM "{table_name}"')).scalar()
+        create_default_partition(conn, table_name, parent=staging)
+        month = month_start((first.astimezone(timezone.utc) if first else datetime.now(timezone.utc)).date())
+        last = next_month(month_start(datetime.now(timezone.utc).date()))
+        while month <= last:
+            create_month_partition(conn, table_name, month, parent=staging)
+            month = next_month(month)
+
+        # Columns added to the model by later migrations don't exist yet
+        existing = set(conn.execute(
+            text("SELECT column_name FROM information_schema.columns WHERE table_name = :name"), {"name": table_name}
+        ).scalars())
+
+        # Generated columns are recomputed by the new table. Rows without a
+        # date_encoded, which the primary key no longer allows, get the migration
+        # time so they stay above the entry number bound of encoded_since.
+        quote = conn.dialect.identifier_preparer.quote
+        columns = [column.name for column in table.columns if column.computed is None and column.name in existing]
+        column_list = ", ".join(quote(name) for name in columns)
+        select_list = ", ".join(
+            "coalesce(date_encoded, now())" if name == "date_encoded" else quote(name)
+            for name in columns
+        )
+        conn.execute(text(f'INSERT INTO "{staging}" ({column_list}) SELECT {select_list} FROM "{table_name}"'))
+
+        conn.execute(text(f'DROP TABLE "{table_name}"'))
+        conn.execute(text(f'ALTER TABLE "{staging}" RENAME TO "{table_name}"'))
+        conn.execute(text(f'ALTER TABLE "{table_name}" ADD PRIMARY KEY (id, date_encoded)'))
+        for index in table.indexes:
+            if all(column.name in existing for column in index.columns):
+                index.create(conn, checkfirst=True)
+    return migrate
+
+
+def archive_partitions(conn, before: date):
+    # Moves the month partitions that end on or before `before` out of the live
+    # tables and into <table>_archive, which has the same columns and can still be
+    # queried. Archived cases are read-only. They keep their case_summary rows
+    # and stay counted in case_counts and crime_stats, which the admin rebuild
+    # also reads from the archive.
+    archived = []
+    for model in PARTITIONED_MODELS:
+        table_name = model.__tablename__
+        archive = archive_table_name(table_name)
+        create_archive_table(conn, table_name)
+
+        partitions = conn.execute(text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(:name) ORDER BY child.relname"
+        ), {"name": table_name}).scalars().all()
+
+        for partition in partitions:
+            match = PARTITION_NAME.search(partition)
+            if not match:
+                continue
+            month = date(int(match.group(1)), int(match.group(2)), 1)
+            if next_month(month) > before:
+                continue
+            conn.execute(text(f'ALTER TABLE "{table_name}" DETACH PARTITION "{partition}"'))
+            conn.execute(text(
+                f'ALTER TABLE "{archive}" ATTACH PARTITION "{partition}" '
+                f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{next_month(month):%Y-%m-%d} 00:00:00+00')"
+            ))
+            archived.append(partition)
+    return archived
+
+
+def entry_number_month(entry_number: str):
+    match = ENTRY_NUMBER_MONTH.search(entry_number or "")
+    if not match:
+        return None
+    year, month = int(match.group(1)), int(match.group(2))
+    if not 1 <= month <= 12:
+        return None
+    return date(year, month, 1)
+
+
+def encoded_since_month(month: date) -> datetime:
+    # Entry numbers carry the local month, partitions are cut at UTC midnight;
+    # a day of slack covers the difference
+    return datetime.combine(month - timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+
+
+def encoded_since(entry_numbers):
+    # Rows of a case are never encoded before its entry number was reserved, so
+    # the earliest entry month is a safe lower bound on date_encoded.
+    # None when any entry number has no month.
+    months = [entry_number_month(entry_number) for entry_number in entry_numbers]
+    if not months or None in months:
+        return None
+    return encoded_since_month(min(months))
+
+
+def entry_partition_filter(model, entry_numbers):
+    # Extra WHERE clauses that let Postgres skip the partitions older than the entries
+    since = encoded_since(entry_numbers)
+    return [model.date_encoded >= since] if since else []
+
+
+def archived_case_query(entry_number: str):
+    # SELECT EXISTS for a case that was moved to case_details_archive. The
+    # archive has no model, so it is addressed as a lightweight table.
+    archive = table(archive_table_name(models.CaseDetails.__tablename__), column("entry_number"), column("date_encoded"))
+    archived = exists().where(archive.c.entry_number == entry_number)
+    since = encoded_since([entry_number])
+    if since:
+        archived = archived.where(archive.c.date_encoded >= since)
+    return select(archived)
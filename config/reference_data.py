@@ -0,0 +1,58 @@
+from collections import namedtuple
+from types import MappingProxyType
+import hashlib
+import json
+from sqlalchemy import select
+import config.models as models
+
+# A prebuilt JSON response body and the ETag that identifies it
+ReferenceEntry = namedtuple("ReferenceEntry", ["etag", "body"])
+
+# The brgy/city/mun lookup of stations that have no barangays on file
+EMPTY_BRGY_CITY_MUN = {"brgy_values": [], "city_mun_value": None, "province_value": None}
+
+
+def reference_entry(payload) -> ReferenceEntry:
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return ReferenceEntry(etag=f'"{hashlib.sha1(body).hexdigest()}"', body=body)
+
+
+def build_reference_index(conn):
+    # Reads regionxii_brgy and offense_class once and renders every response
+    # those lookups can give. conn is a sync Connection or Session.
+    brgy_rows = conn.execute(
+        select(
+            models.Province_Brgy_Details.id,
+            models.Province_Brgy_Details.mps_cps,
+            models.Province_Brgy_Details.brgy,
+            models.Province_Brgy_Details.mun_city,
+            models.Province_Brgy_Details.province
+        ).order_by(models.Province_Brgy_Details.id)
+    ).fetchall()
+
+    stations = {}
+    for row in brgy_rows:
+        station = stations.get(row.mps_cps)
+        if station is None:
+            # City/municipality and province are taken from the station's first row
+            station = stations[row.mps_cps] = {
+                "brgy_values": [],
+                "city_mun_value": {"id": row.id, "city_mun": row.mun_city},
+                "province_value": {"id": row.id, "province": row.province}
+            }
+        station["brgy_values"].append({"id": row.id, "brgy": row.brgy})
+
+    offenses = conn.execute(select(models.Offense.incidents).order_by(models.Offense.id)).scalars().all()
+
+    return MappingProxyType({
+        "brgy_city_mun": MappingProxyType({mps_cps: reference_entry(payload) for mps_cps, payload in stations.items()}),
+        "brgy_city_mun_empty": reference_entry(EMPTY_BRGY_CITY_MUN),
+        "offense_classifications": reference_entry([{"incidents": incidents} for incidents in offenses]),
+    })
+
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return "*" in tags or any(tag.removeprefix('W/') == etag for tag in tags)
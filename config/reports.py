@@ -0,0 +1,140 @@
+import logging
+import os
+from datetime import datetime, timezone
+import pandas as pd
+import streamlit as st
+from sqlalchemy import select, update
+import config.models as models
+from config.database import engine, SessionLocal
+from config.partitions import encoded_since_month, month_start
+
+logger = logging.getLogger(__name__)
+
+# Finished report files are kept here, relative to the API's working directory
+# unless the [reports] section of the secrets says otherwise
+reports = st.secrets.get("reports", {})
+REPORT_DIR = reports.get("directory", "reports")
+
+REPORT_FORMATS = ("xlsx", "csv")
+REPORT_SCOPES = ("pro", "ppo_cpo", "mps_cps")
+
+# Rows pulled per round trip from the server-side cursor while counting
+REPORT_CHUNK_SIZE = 5000
+
+# Every report table is a roll-up of the case counts per these keys
+REPORT_KEYS = ["ppo_cpo", "mps_cps", "offense_class", "offense", "case_status", "month"]
+
+REPORT_LABELS = {
+    "ppo_cpo": "PPO",
+    "mps_cps": "Station",
+    "offense_class": "Offense Classification",
+    "offense": "Offense",
+    "case_status": "Case Status",
+    "month": "Month Reported",
+    "cases": "Cases"
+}
+
+MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv"
+}
+
+
+def report_rows_query(job):
+    # The cases of the job's scope reported within its date range. Each
+    # case_details row is one offense of a case and is counted, like crime_stats
+    # and /stats count them. A case is encoded after it is reported, so the
+    # month of date_from bounds date_encoded and lets Postgres skip older partitions.
+    scope_column = getattr(models.CaseDetails, job.scope)
+    return (
+        select(
+            models.CaseDetails.ppo_cpo,
+            models.CaseDetails.mps_cps,
+            models.CaseDetails.offense_class,
+            models.CaseDetails.offense,
+            models.CaseDetails.case_status,
+            models.CaseDetails.date_reported
+        )
+        .where(
+            scope_column == job.scope_value,
+            models.CaseDetails.date_reported.between(job.date_from, job.date_to),
+            models.CaseDetails.date_encoded >= encoded_since_month(month_start(job.date_from))
+        )
+    )
+
+
+def count_report_rows(job):
+    # Streams the cases in chunks and counts each chunk with one group-by, so
+    # memory follows the number of distinct keys rather than the number of cases
+    partials = []
+    row_count = 0
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True, max_row_buffer=REPORT_CHUNK_SIZE)
+        for chunk in pd.read_sql(report_rows_query(job), conn, chunksize=REPORT_CHUNK_SIZE):
+            row_count += len(chunk)
+            chunk["month"] = pd.to_datetime(chunk.pop("date_reported")).dt.strftime("%Y-%m")
+            chunk = chunk.fillna("")
+            partials.append(chunk.groupby(REPORT_KEYS).size())
+
+    if not partials:
+        return pd.DataFrame(columns=REPORT_KEYS + ["cases"]), 0
+
+    counts = pd.concat(partials).groupby(level=REPORT_KEYS).sum()
+    return counts.rename("cases").reset_index(), row_count
+
+
+def report_pivot(counts, index, columns):
+    return (
+        counts.pivot_table(index=index, columns=columns, values="cases", aggfunc="sum", fill_value=0, margins=True, margins_name="Total")
+        .rename_axis(index=[REPORT_LABELS[key] for key in index], columns=REPORT_LABELS[columns])
+    )
+
+
+def write_report(job, counts):
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    path = os.path.join(REPORT_DIR, f"{job.id}.{job.format}")
+    partial_path = os.path.join(REPORT_DIR, f"{job.id}.partial.{job.format}")
+
+    details = counts.sort_values(REPORT_KEYS).rename(columns=REPORT_LABELS)
+    if job.format == "csv":
+        details.to_csv(partial_path, index=False)
+    else:
+        with pd.ExcelWriter(partial_path, engine="openpyxl") as writer:
+            if not counts.empty:
+                report_pivot(counts, ["offense_class", "offense"], "case_status").to_excel(writer, sheet_name="By Offense")
+                report_pivot(counts, ["ppo_cpo", "mps_cps"], "case_status").to_excel(writer, sheet_name="By Station")
+                report_pivot(counts, ["month"], "offense_class").to_excel(writer, sheet_name="By Month")
+            details.to_excel(writer, sheet_name="Details", index=False)
+
+    # Only a complete file is ever visible under the final name
+    os.replace(partial_path, path)
+    return path
+
+
+def run_report_job(job_id):
+    # Runs on a report worker thread. The job is claimed with a conditional
+    # UPDATE so a job submitted twice is still only built once.
+    with SessionLocal() as db:
+        claimed = db.execute(
+            update(models.Report_Job)
+            .where(models.Report_Job.id == job_id, models.Report_Job.status == "queued")
+            .values(status="running", started_at=datetime.now(timezone.utc))
+            .returning(models.Report_Job.id)
+        ).scalar()
+        db.commit()
+        if claimed is None:
+            return
+
+        job = db.get(models.Report_Job, job_id)
+        try:
+            counts, row_count = count_report_rows(job)
+            job.file_path = write_report(job, counts)
+            job.row_count = row_count
+            job.status = "done"
+        except Exception as e:
+            logger.exception("Report job %s failed", job_id)
+            db.rollback()
+            job.status = "failed"
+            job.error = str(e)
+        job.finished_at = datetime.now(timezone.utc)
+        db.commit()
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+import jwt
+import streamlit as st
+
+# Secret shared by the API, which signs the tokens, and the Streamlit pages, which check them
+auth = st.secrets["auth"]
+SECRET_KEY = auth["secret_key"]
+
+SESSION_TOKEN_ALGORITHM = "HS256"
+
+# Same lifetime the login cookie had
+SESSION_TOKEN_DAYS = 30
+
+
+def create_session_token(user) -> str:
+    now = datetime.now(timezone.utc)
+    claims = {
+        "sub": user.username,
+        "pro": user.pro or "",
+        "ppo_cpo": user.ppo_cpo or "",
+        "mps_cps": user.mps_cps or "",
+        "role": user.role or "",
+        "iat": now,
+        "exp": now + timedelta(days=SESSION_TOKEN_DAYS)
+    }
+    return jwt.encode(claims, SECRET_KEY, algorithm=SESSION_TOKEN_ALGORITHM)
+
+
+def verify_session_token(token):
+    # Returns the user claims of a valid token, None for a missing, tampered or expired one
+    if not token:
+        return None
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[SESSION_TOKEN_ALGORITHM])
+    except jwt.InvalidTokenError:
+        return None
+
+
+# Report files are downloaded by the browser straight from the API, which can't
+# send the session token, so each download link carries a short-lived token for
+# one job. The audience keeps it from passing as a session token.
+REPORT_DOWNLOAD_AUDIENCE = "report_download"
+REPORT_DOWNLOAD_TOKEN_MINUTES = 15
+
+
+def create_report_download_token(job_id, username) -> str:
+    now = datetime.now(timezone.utc)
+    claims = {
+        "sub": username or "",
+        "job": str(job_id),
+        "aud": REPORT_DOWNLOAD_AUDIENCE,
+        "iat": now,
+        "exp": now + timedelta(minutes=REPORT_DOWNLOAD_TOKEN_MINUTES)
+    }
+    return jwt.encode(claims, SECRET_KEY, algorithm=SESSION_TOKEN_ALGORITHM)
+
+
+def verify_report_download_token(token, job_id):
+    # Returns the username the link was issued to, None unless the token is valid for this job
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[SESSION_TOKEN_ALGORITHM], audience=REPORT_DOWNLOAD_AUDIENCE)
+    except jwt.InvalidTokenError:
+        return None
+    return claims["sub"] if claims.get("job") == str(job_id) else None
@@ -0,0 +1,224 @@
+from collections import Counter
+from sqlalchemy import select, func, delete, exists, tuple_, table, column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+import config.models as models
+from config.partitions import encoded_since, archive_table_name
+
+
+def victim_details_summary(case_no, since=None):
+    # Correlated subquery that renders all victims of a case as one string.
+    # since skips the victim_details partitions encoded before the case.
+    query = (
+        select(
+            func.string_agg(
+                func.concat(
+                    models.Victim_Details.vic_fname, ' ', models.Victim_Details.vic_midname, ' ',
+                    models.Victim_Details.vic_lname, ' ', models.Victim_Details.vic_qlfr, ' ',
+                    models.Victim_Details.vic_alias, ' (', models.Victim_Details.vic_age, '/', models.Victim_Details.vic_gndr, ')'
+                ), '; '
+            )
+        )
+        .where(models.Victim_Details.case_no == case_no)
+    )
+    if since is not None:
+        query = query.where(models.Victim_Details.date_encoded >= since)
+    return query.scalar_subquery()
+
+
+def suspect_details_summary(case_no, since=None):
+    # Correlated subquery that renders all suspects of a case as one string.
+    # since skips the suspect_details partitions encoded before the case.
+    query = (
+        select(
+            func.string_agg(
+                func.concat(
+                    models.Suspect_Details.sus_fname, ' ', models.Suspect_Details.sus_midname, ' ',
+                    models.Suspect_Details.sus_lname, ' ', models.Suspect_Details.sus_qlfr, ' ',
+                    models.Suspect_Details.sus_alias, ' (', models.Suspect_Details.sus_age, '/', models.Suspect_Details.sus_gndr, ')'
+                ), '; '
+            )
+        )
+        .where(models.Suspect_Details.case_no == case_no)
+    )
+    if since is not None:
+        query = query.where(models.Suspect_Details.date_encoded >= since)
+    return query.scalar_subquery()
+
+
+def case_summary_upsert(where_clause=None, since=None):
+    # INSERT ... SELECT ... ON CONFLICT that (re)builds case_summary rows from
+    # case_details, for the cases matching where_clause or for every case.
+    # since is a lower bound on date_encoded that lets Postgres prune partitions.
+    source = (
+        select(
+            models.CaseDetails.entry_number,
+            models.CaseDetails.id,
+            models.CaseDetails.date_encoded,
+            models.CaseDetails.pro,
+            models.CaseDetails.ppo_cpo,
+            models.CaseDetails.mps_cps,
+            models.CaseDetails.offense,
+            models.CaseDetails.offense_class,
+            models.CaseDetails.case_status,
+            models.CaseDetails.date_reported,
+            models.CaseDetails.time_reported,
+            models.CaseDetails.date_committed,
+            models.CaseDetails.time_committed,
+            victim_details_summary(models.CaseDetails.case_no, since),
+            suspect_details_summary(models.CaseDetails.case_no, since)
+        )
+        # entry_number is not unique in case_details, keep the latest row of each
+        .distinct(models.CaseDetails.entry_number)
+        .order_by(models.CaseDetails.entry_number, models.CaseDetails.date_encoded.desc())
+    )
+    if where_clause is not None:
+        source = source.where(where_clause)
+    if since is not None:
+        source = source.where(models.CaseDetails.date_encoded >= since)
+
+    columns = [
+        "entry_number", "case_id", "date_encoded", "pro", "ppo_cpo", "mps_cps",
+        "offense", "offense_class", "case_status", "date_reported", "time_reported",
+        "date_committed", "time_committed", "victim_details", "suspect_details"
+    ]
+    statement = pg_insert(models.Case_Summary).from_select(columns, source)
+    return statement.on_conflict_do_update(
+        index_elements=[models.Case_Summary.entry_number],
+        set_={column: statement.excluded[column] for column in columns if column != "entry_number"}
+    )
+
+
+def case_summary_prune(entry_numbers, since=None):
+    # Drop summary rows whose case no longer exists under that entry number
+    case_exists = exists().where(models.CaseDetails.entry_number == models.Case_Summary.entry_number)
+    if since is not None:
+        case_exists = case_exists.where(models.CaseDetails.date_encoded >= since)
+    return delete(models.Case_Summary).where(
+        models.Case_Summary.entry_number.in_(entry_numbers),
+        ~case_exists
+    )
+
+
+def case_page_query(scope_filter, columns, limit, after=None):
+    # One page of a case list. Cases are read from case_summary, which already
+    # holds the victim and suspect details, and paged with the (date_encoded,
+    # case_id) keyset; after is the keyset of the last row of the previous page.
+    query = (
+        select(models.Case_Summary.case_id, models.Case_Summary.date_encoded, *columns)
+        .where(scope_filter)
+    )
+    if after is not None:
+        query = query.where(tuple_(models.Case_Summary.date_encoded, models.Case_Summary.case_id) < tuple_(*after))
+    return (
+        query
+        .order_by(models.Case_Summary.date_encoded.desc(), models.Case_Summary.case_id.desc())
+        .limit(limit + 1)  # One extra row tells us whether another page exists
+    )
+
+
+def case_count_query(scope_filter):
+    # case_counts has one row per station, month and status, so this reads a
+    # handful of rows no matter how many cases exist
+    return select(
+        models.Case_Count.mps_cps,
+        models.Case_Count.year_month,
+        models.Case_Count.case_status,
+        models.Case_Count.count
+    ).where(scope_filter)
+
+
+def case_count_key_columns():
+    # The case_counts key of a case_summary row
+    return [
+        func.coalesce(models.Case_Summary.pro, ''),
+        func.coalesce(models.Case_Summary.ppo_cpo, ''),
+        func.coalesce(models.Case_Summary.mps_cps, ''),
+        func.to_char(models.Case_Summary.date_encoded, 'YYYYMM'),
+        func.coalesce(models.Case_Summary.case_status, ''),
+    ]
+
+
+def case_counts_backfill():
+    # INSERT ... SELECT that fills case_counts from every case_summary row, so
+    # a case with several offenses (case_details rows) is counted once
+    key_columns = case_count_key_columns()
+    source = select(*key_columns, func.count()).group_by(*key_columns)
+    return pg_insert(models.Case_Count).from_select(
+        ["pro", "ppo_cpo", "mps_cps", "year_month", "case_status", "count"], source
+    )
+
+
+def crime_stats_backfill(archived=False):
+    # INSERT ... SELECT that fills crime_stats from every case_details row, and
+    # with archived also from case_details_archive; afterwards the case_details
+    # trigger keeps it up to date
+    cases = models.CaseDetails.__table__
+    if archived:
+        names = ["pro", "ppo_cpo", "mps_cps", "brgy", "offense", "offense_class", "case_status", "date_reported"]
+        archive = table(archive_table_name(cases.name), *[column(name) for name in names])
+        cases = select(*[cases.c[name] for name in names]).union_all(select(archive)).subquery("cases")
+
+    key_columns = [
+        func.coalesce(cases.c.pro, ''),
+        func.coalesce(cases.c.ppo_cpo, ''),
+        func.coalesce(cases.c.mps_cps, ''),
+        func.coalesce(cases.c.brgy, ''),
+        func.coalesce(cases.c.offense, ''),
+        func.coalesce(cases.c.offense_class, ''),
+        func.coalesce(cases.c.case_status, ''),
+        cases.c.date_reported,
+    ]
+    source = select(*key_columns, func.count()).group_by(*key_columns)
+    return pg_insert(models.Crime_Stat).from_select(
+        ["pro", "ppo_cpo", "mps_cps", "brgy", "offense", "offense_class", "case_status", "day", "count"], source
+    )
+
+
+async def case_count_keys(db, entry_numbers, lock=False):
+    query = select(*case_count_key_columns()).where(models.Case_Summary.entry_number.in_(entry_numbers))
+    if lock:
+        query = query.with_for_update()
+    result = await db.execute(query)
+    return Counter(tuple(row) for row in result.fetchall())
+
+
+async def adjust_case_counts(db, before, after):
+    # Apply the difference between the old and new keys of the changed cases
+    deltas = Counter(after)
+    deltas.subtract(before)
+    values = [
+        {"pro": key[0], "ppo_cpo": key[1], "mps_cps": key[2], "year_month": key[3], "case_status": key[4], "count": delta}
+        for key, delta in deltas.items() if delta
+    ]
+    if not values:
+        return
+
+    statement = pg_insert(models.Case_Count)
+    statement = statement.on_conflict_do_update(
+        index_elements=["pro", "ppo_cpo", "mps_cps", "year_month", "case_status"],
+        set_={"count": models.Case_Count.count + statement.excluded.count}
+    )
+    await db.execute(statement, values)
+
+
+async def lock_entry_numbers(db, entry_numbers):
+    # Advisory locks held until the caller's transaction ends, serializing the
+    # writers of the same entry numbers; entry_number isn't unique across the
+    # case_details partitions and summary rows may not exist yet to lock.
+    # Sorted so two transactions always lock in the same order.
+    for entry_number in sorted(set(entry_numbers)):
+        await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(entry_number))))
+
+
+async def refresh_case_summary(db, entry_numbers):
+    # Runs inside the caller's transaction so the summary and the counters
+    # commit together with the change
+    entry_numbers = sorted(set(entry_numbers))
+    since = encoded_since(entry_numbers)
+    # FOR UPDATE in case_count_keys can't lock summary rows that don't exist yet
+    await lock_entry_numbers(db, entry_numbers)
+    before = await case_count_keys(db, entry_numbers, lock=True)
+    await db.execute(case_summary_upsert(models.CaseDetails.entry_number.in_(entry_numbers), since))
+    await db.execute(case_summary_prune(entry_numbers, since))
+    after = await case_count_keys(db, entry_numbers)
+    await adjust_case_counts(db, before, after)
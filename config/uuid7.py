@@ -0,0 +1,36 @@
+import os
+import time
+import uuid
+from sqlalchemy import DDL
+
+# UUID version 7 (RFC 9562): 48 bits of Unix time in milliseconds, then random
+# bits. Keys of rows inserted together sort together, so new case, victim and
+# suspect rows are appended to the right edge of the primary key index instead
+# of landing on random pages of it like uuid4 keys.
+
+UUID7_VERSION = 0x7 << 76
+UUID7_VARIANT = 0x2 << 62
+
+
+def uuid7() -> uuid.UUID:
+    timestamp_ms = time.time_ns() // 1_000_000
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | UUID7_VERSION
+    value = value & ~(0x3 << 62) | UUID7_VARIANT
+    return uuid.UUID(int=value)
+
+
+# The same layout built in Postgres for an arbitrary time, used to re-key rows
+# that were stored with uuid4 keys: the 48 time bits are written over a random
+# uuid4 and the version bits are switched from 4 to 7.
+UUID7_AT_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION uuid7_at(ts timestamptz) RETURNS uuid AS $$
+    SELECT encode(
+        set_bit(set_bit(
+            overlay(uuid_send(gen_random_uuid())
+                placing substring(int8send(floor(extract(epoch FROM ts) * 1000)::bigint) FROM 3)
+                FROM 1 FOR 6),
+            52, 1), 53, 1),
+        'hex')::uuid
+$$ LANGUAGE sql VOLATILE
+""")
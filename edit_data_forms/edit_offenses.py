@@ -1,8 +1,7 @@
 import streamlit as st
-import requests
 from modules.dataValidation import Offense_Validation
 from pydantic import ValidationError
-from config.database import api_endpoint
+from modules.api_client import get_api_client
 
 # Process Offense
 def get_offense_index(vicbrgydetails, brgy_values):
@@ -20,7 +19,7 @@ def get_cases_status_index(caseStatus, case_status_values):
 @st.cache_data(ttl=1800)
 def get_offense_classifications():
     # Make a GET request to the FastAPI endpoint
-    response = requests.get(f"{api_endpoint}/offense_classifications")
+    response = get_api_client().offense_classifications()
     response.raise_for_status()  # Ensure we handle HTTP errors
 
     # Parse the JSON response
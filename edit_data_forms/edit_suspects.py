@@ -1,8 +1,7 @@
 import streamlit as st
-import requests
 from pydantic import ValidationError
 from modules.dataValidation import SuspectData_Validation
-from config.database import api_endpoint
+from modules.api_client import get_api_client
 
 
 # Process Unidentified and Unknown Entries
@@ -34,7 +33,7 @@ def process_suspect_names(susfname, susmidname, suslastname, susalias):
 @st.cache_data(ttl=1800)  # Cache data for 30 minutes
 def get_brgy_city_mun(mps_cps):
     # Make a GET request to the FastAPI endpoint
-    response = requests.get(f"{api_endpoint}/brgy-city-mun/{mps_cps}")
+    response = get_api_client().brgy_city_mun(mps_cps)
 
     # Parse the JSON response
     data = response.json()
@@ -62,7 +61,8 @@ def get_gender_index(vicgenderdetails, gender_values):
 
 
 
-def editSuspect(susdetails):
+def editSuspect(susdetails, row_key=""):
+    # row_key keeps the widgets of each suspect of the case apart
     # Initialize Barangay Values and City Mun Values
     brgy_values, city_mun_value, province_value = get_brgy_city_mun(susdetails.get("mps_cps"))
 
@@ -81,16 +81,16 @@ def editSuspect(susdetails):
 
     # First, Middle, and Last Name Portion
     fname, mname = st.columns(2)
-    sus_fname = fname.text_input("First Name",key="sus_fname",value=susfname)
-    sus_midname = mname.text_input("Middle Name",key="sus_mname",value=susmidname)
-    sus_lname = st.text_input("Last Name",key="sus_lname",value=suslastname)
+    sus_fname = fname.text_input("First Name",key=f"sus_fname_{row_key}",value=susfname)
+    sus_midname = mname.text_input("Middle Name",key=f"sus_mname_{row_key}",value=susmidname)
+    sus_lname = st.text_input("Last Name",key=f"sus_lname_{row_key}",value=suslastname)
 
 
 
     # Qualifier, Alias and Gender
     qlfr, alias, gndr= st.columns(3)
-    sus_qlfr = qlfr.text_input("Qualifier",key="sus_qlfr",value=susdetails.get("sus_qlfr"))
-    sus_alias = alias.text_input("Alias",key="sus_alias",value=susalias)
+    sus_qlfr = qlfr.text_input("Qualifier",key=f"sus_qlfr_{row_key}",value=susdetails.get("sus_qlfr"))
+    sus_alias = alias.text_input("Alias",key=f"sus_alias_{row_key}",value=susalias)
     if sus_alias is None:
         sus_alias = None
     else:
@@ -100,30 +100,30 @@ def editSuspect(susdetails):
         gender_values = ["Male","Female"]
         sus_gender_details = susdetails.get("sus_gndr")
         gender_index = get_gender_index(sus_gender_details, gender_values)
-        sus_gndr = st.radio("Gender",gender_values,index=gender_index,horizontal=True,key="sus_gndr")
+        sus_gndr = st.radio("Gender",gender_values,index=gender_index,horizontal=True,key=f"sus_gndr_{row_key}")
 
     # Age Group
     ageGrp, age = st.columns(2)
-    ageGrp.selectbox("Age Group",index=None,placeholder="Select Victims Age Group",options=("Infant (0-12 months)","Toddler (1-3 y/o)","Kid (4-9 y/o)","Preteen (10-12 y/o)","Teenager (13-18 y/o)","Young Adult (19-39 y/o)","Middle age Adult (40-64 y/o)","Old Age Adult (65 y/o-up)"),key="sus_ageGrp")
-    sus_age = age.number_input("Estimated or Exact Age",value=susdetails.get("sus_age"),step=1,key="sus_age")
+    ageGrp.selectbox("Age Group",index=None,placeholder="Select Victims Age Group",options=("Infant (0-12 months)","Toddler (1-3 y/o)","Kid (4-9 y/o)","Preteen (10-12 y/o)","Teenager (13-18 y/o)","Young Adult (19-39 y/o)","Middle age Adult (40-64 y/o)","Old Age Adult (65 y/o-up)"),key=f"sus_ageGrp_{row_key}")
+    sus_age = age.number_input("Estimated or Exact Age",value=susdetails.get("sus_age"),step=1,key=f"sus_age_{row_key}")
 
     # Address - Region and Disttict/Province
     st.subheader("Suspect's Address")
     region, distprov = st.columns(2)
-    region.text_input("Region",value="Region XII",disabled=True,key="sus_region")
-    sus_distprov = distprov.selectbox("District/Province",([province_value]),disabled=True,key="sus_distprov")
+    region.text_input("Region",value="Region XII",disabled=True,key=f"sus_region_{row_key}")
+    sus_distprov = distprov.selectbox("District/Province",([province_value]),disabled=True,key=f"sus_distprov_{row_key}")
 
 
 
     # Address - RCity/Municipality, Barangay and House No/Street Name
     citymun, brgy = st.columns(2)
-    sus_cityMun = citymun.selectbox("City/Municipality",([city_mun_value]),disabled=True,key="sus_citymun")
+    sus_cityMun = citymun.selectbox("City/Municipality",([city_mun_value]),disabled=True,key=f"sus_citymun_{row_key}")
     #  Process barangay Selectbox
     sus_brgy_details = susdetails.get("sus_brgy")
     brgy_index = get_brgy_index(sus_brgy_details, brgy_values)
-    sus_brgy = brgy.selectbox("Barangay :red[#]",brgy_values,placeholder="Please select a Barangay",key="sus_abrgy",index=brgy_index)
+    sus_brgy = brgy.selectbox("Barangay :red[#]",brgy_values,placeholder="Please select a Barangay",key=f"sus_abrgy_{row_key}",index=brgy_index)
 
-    sus_strName = st.text_input("House No./Street Name",key="sus_strName",value=susdetails.get("sus_strName"))
+    sus_strName = st.text_input("House No./Street Name",key=f"sus_strName_{row_key}",value=susdetails.get("sus_strName"))
 
 
     st.write("---")
@@ -1,8 +1,7 @@
 import streamlit as st
-import requests
 from pydantic import ValidationError
 from modules.dataValidation import VictimData_Validation
-from config.database import api_endpoint
+from modules.api_client import get_api_client
 
 
 # Process Unidentified and Unknown Entries
@@ -33,7 +32,7 @@ def process_victim_names(vicfname, vicmidname, viclastname, vicalias):
 @st.cache_data(ttl=1800)  # Cache data for 30 minutes
 def get_brgy_city_mun(mps_cps):
     # Make a GET request to the FastAPI endpoint
-    response = requests.get(f"{api_endpoint}/brgy-city-mun/{mps_cps}")
+    response = get_api_client().brgy_city_mun(mps_cps)
 
     # Parse the JSON response
     data = response.json()
@@ -57,7 +56,8 @@ def get_gender_index(vicgenderdetails, gender_values):
         return gender_values.index(vicgenderdetails)
     return None
 
-def editVictim(vicdetails):
+def editVictim(vicdetails, row_key=""):
+    # row_key keeps the widgets of each victim of the case apart
     # Initialize Barangay Values and City Mun Values
     brgy_values, city_mun_value, province_value = get_brgy_city_mun(vicdetails.get("mps_cps"))
 
@@ -76,9 +76,9 @@ def editVictim(vicdetails):
 
     # First, Middle, and Last Name Portion
     fname, mname = st.columns(2)
-    vic_fname = fname.text_input("First Name :red[#]",key="vic_fname",value=vicfname)
-    vic_midname = mname.text_input("Middle Name",key="vic_mname",value=vicmidname)
-    vic_lname = st.text_input("Last Name :red[#]",key="vic_lname",value=viclastname)
+    vic_fname = fname.text_input("First Name :red[#]",key=f"vic_fname_{row_key}",value=vicfname)
+    vic_midname = mname.text_input("Middle Name",key=f"vic_mname_{row_key}",value=vicmidname)
+    vic_lname = st.text_input("Last Name :red[#]",key=f"vic_lname_{row_key}",value=viclastname)
 
     if not vic_fname:
         fname.warning('Please enter a first name.')
@@ -87,8 +87,8 @@ def editVictim(vicdetails):
 
     # Qualifier, Alias and Gender
     qlfr, alias, gndr= st.columns(3)
-    vic_qlfr = qlfr.text_input("Qualifier",key="vic_qlfr",value=vicdetails.get("vic_qlfr"))
-    vic_alias = alias.text_input("Alias",key="vic_alias",value=vicalias)
+    vic_qlfr = qlfr.text_input("Qualifier",key=f"vic_qlfr_{row_key}",value=vicdetails.get("vic_qlfr"))
+    vic_alias = alias.text_input("Alias",key=f"vic_alias_{row_key}",value=vicalias)
     if vic_alias is None:
         vic_alias = None
     else:
@@ -98,7 +98,7 @@ def editVictim(vicdetails):
         gender_values = ["Male","Female"]
         vic_gender_details = vicdetails.get("vic_gndr")
         gender_index = get_gender_index(vic_gender_details, gender_values)
-        vic_gndr = st.radio("Gender :red[#]",gender_values,index=gender_index,horizontal=True,key="vic_gndr") # Process Gender Entries
+        vic_gndr = st.radio("Gender :red[#]",gender_values,index=gender_index,horizontal=True,key=f"vic_gndr_{row_key}") # Process Gender Entries
 
     if not vic_gndr:
         gndr.warning('Please select a gender.')
@@ -106,24 +106,24 @@ def editVictim(vicdetails):
 
     # Age Group
     ageGrp, age = st.columns(2)
-    ageGrp.selectbox("Age Group",index=None,placeholder="Select Victims Age Group",options=("Infant (0-12 months)","Toddler (1-3 y/o)","Kid (4-9 y/o)","Preteen (10-12 y/o)","Teenager (13-18 y/o)","Young Adult (19-39 y/o)","Middle age Adult (40-64 y/o)","Old Age Adult (65 y/o-up)"),key="vic_ageGrp")
-    vic_age = age.number_input("Estimated or Exact Age",value=vicdetails.get("vic_age"),step=1,key="vic_age")
+    ageGrp.selectbox("Age Group",index=None,placeholder="Select Victims Age Group",options=("Infant (0-12 months)","Toddler (1-3 y/o)","Kid (4-9 y/o)","Preteen (10-12 y/o)","Teenager (13-18 y/o)","Young Adult (19-39 y/o)","Middle age Adult (40-64 y/o)","Old Age Adult (65 y/o-up)"),key=f"vic_ageGrp_{row_key}")
+    vic_age = age.number_input("Estimated or Exact Age",value=vicdetails.get("vic_age"),step=1,key=f"vic_age_{row_key}")
 
     # Address - Region and Disttict/Province
     st.subheader("Victim's Address")
     region, distprov = st.columns(2)
-    region.text_input("Region",value="Region XII",disabled=True,key="vic_region")
-    vic_distprov = distprov.selectbox("District/Province",([province_value]),disabled=True,key="vic_distprov")
+    region.text_input("Region",value="Region XII",disabled=True,key=f"vic_region_{row_key}")
+    vic_distprov = distprov.selectbox("District/Province",([province_value]),disabled=True,key=f"vic_distprov_{row_key}")
 
     # Address - RCity/Municipality, Barangay and House No/Street Name
     citymun, brgy = st.columns(2)
-    vic_cityMun = citymun.selectbox("City/Municipality",([city_mun_value]),disabled=True,key="vic_citymun")
+    vic_cityMun = citymun.selectbox("City/Municipality",([city_mun_value]),disabled=True,key=f"vic_citymun_{row_key}")
 
     
     #  Process barangay Selectbox
     vic_brgy_details = vicdetails.get("vic_brgy")
     brgy_index = get_brgy_index(vic_brgy_details, brgy_values)
-    vic_brgy = brgy.selectbox("Barangay :red[#]",brgy_values,placeholder="Please select a Barangay",key="vic_abrgy",index=brgy_index)
+    vic_brgy = brgy.selectbox("Barangay :red[#]",brgy_values,placeholder="Please select a Barangay",key=f"vic_abrgy_{row_key}",index=brgy_index)
 
 
 
@@ -132,7 +132,7 @@ def editVictim(vicdetails):
     if vic_brgy == None:
         st.warning("Please select a Barangay.")
     else:
-        vic_strName = st.text_input("House No./Street Name",value=vicdetails.get("vic_strName"),key="vic_strName")
+        vic_strName = st.text_input("House No./Street Name",value=vicdetails.get("vic_strName"),key=f"vic_strName_{row_key}")
 
     st.write("---")
 
@@ -1,15 +1,14 @@
 import streamlit as st
-import requests
 from modules.ui_models import input_time_committed, input_time_reported
 import datetime
 from modules.dataValidation import Case_Detail_Validation
 from pydantic import ValidationError
-from config.database import api_endpoint
+from modules.api_client import get_api_client
 
 @st.cache_data(ttl=1800)  # Cache data for 30 minutes
 def get_brgy_city_mun(mps_cps):
     # Make a GET request to the FastAPI endpoint
-    response = requests.get(f"{api_endpoint}/brgy-city-mun/{mps_cps}")
+    response = get_api_client().brgy_city_mun(mps_cps)
 
     # Parse the JSON response
     data = response.json()
@@ -60,7 +59,8 @@ def case_Details(mps_cps,ppo_cpo,pro):
         col2.write("\n")
         col2.write("\n")
         if col2.button("Enter Time", use_container_width=True, key="timereported"):
-            input_time_reported()
+            st.session_state.open_time_dialog = "reported"
+            st.rerun()
 
     # Handling Date and Time Committed
     with DTcommitted:
@@ -79,7 +79,8 @@ def case_Details(mps_cps,ppo_cpo,pro):
         col2.write("\n")
         col2.write("\n")
         if col2.button("Enter Time", use_container_width=True, key="timecommitted"):
-            input_time_committed()
+            st.session_state.open_time_dialog = "committed"
+            st.rerun()
 
     st.write("---")
 
@@ -156,7 +157,8 @@ def case_Details(mps_cps,ppo_cpo,pro):
         "dt_reported": dt_reported,
         "time_reported": st.session_state.input_time_reported,
         "dt_committed": dt_committed,
-        "time_committed": st.session_state.input_time_committed
+        "time_committed": st.session_state.input_time_committed,
+        "brgy": vic_brgy
     }
 
     # Mapping of field names to user-friendly names
@@ -180,4 +182,24 @@ def case_Details(mps_cps,ppo_cpo,pro):
     # finally:
     #     st.write(case_detail)
 
-    return case_detail
\ No newline at end of file
+    return case_detail
+
+
+# The case details run as a fragment so typing in them doesn't rerun the whole page.
+# The validated case detail, or None, is kept in st.session_state.case_detail_result.
+@st.experimental_fragment
+def CaseDetailsForm(mps_cps, ppo_cpo, pro):
+    st.session_state.case_detail_result = case_Details(mps_cps, ppo_cpo, pro) or None
+
+
+def addCaseDetails(mps_cps, ppo_cpo, pro):
+    # The time dialogs are fragments themselves, so they are opened here on a
+    # full rerun instead of from inside the case details fragment
+    time_dialog = st.session_state.pop("open_time_dialog", None)
+    if time_dialog == "reported":
+        input_time_reported()
+    elif time_dialog == "committed":
+        input_time_committed()
+
+    CaseDetailsForm(mps_cps, ppo_cpo, pro)
+    return st.session_state.get("case_detail_result")
\ No newline at end of file
@@ -1,15 +1,14 @@
 import streamlit as st
-import requests
 from modules.dataValidation import Offense_Validation
 from pydantic import ValidationError
-from config.database import api_endpoint
+from modules.api_client import get_api_client
 
 
 # Cache data for 30 minutes
 @st.cache_data(ttl=1800)
 def get_offense_classifications():
     # Make a GET request to the FastAPI endpoint
-    response = requests.get(f"{api_endpoint}/offense_classifications")
+    response = get_api_client().offense_classifications()
     response.raise_for_status()  # Ensure we handle HTTP errors
 
     # Parse the JSON response
@@ -124,4 +123,12 @@ def addOffense():
         if st.button("Remove Last Offense", use_container_width=True, type="primary",key="offense_btn2"):
             if st.session_state.offense_count > 1:
                 st.session_state.offense_count -= 1
-                st.rerun()  # Rerun the app to remove the last victim form
\ No newline at end of file
+                st.rerun()  # Rerun the app to remove the last victim form
+
+
+# The investigator and offense inputs run as one fragment.
+# The offense detail, or None, is kept in st.session_state.offense_detail_result.
+@st.experimental_fragment
+def OffenseForm():
+    investigator_info()
+    st.session_state.offense_detail_result = addOffense()
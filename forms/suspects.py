@@ -1,14 +1,13 @@
 import streamlit as st
-import requests
 from pydantic import ValidationError
 from modules.dataValidation import SuspectData_Validation
-from config.database import api_endpoint
+from modules.api_client import get_api_client
 
 
 @st.cache_data(ttl=1800)  # Cache data for 30 minutes
 def get_brgy_city_mun(mps_cps):
     # Make a GET request to the FastAPI endpoint
-    response = requests.get(f"{api_endpoint}/brgy-city-mun/{mps_cps}")
+    response = get_api_client().brgy_city_mun(mps_cps)
 
     # Parse the JSON response
     data = response.json()
@@ -175,19 +174,30 @@ def SuspectDetails(mps_cps, ppo_cpo, pro, index):
                 return dict(suspect_data)
     
 
+# Each suspect card is its own fragment, a change in one card only reruns that card.
+# Its validated data, or None, is kept in st.session_state.suspect_results by index.
+@st.experimental_fragment
+def SuspectCard(mps_cps, ppo_cpo, pro, index):
+    st.session_state.suspect_results[index] = SuspectDetails(mps_cps, ppo_cpo, pro, index)
+
+
+# The valid suspects of all cards currently shown
+def get_suspect_data_list():
+    results = st.session_state.get("suspect_results", {})
+    return [results[i] for i in range(st.session_state.get("suspect_count", 1)) if results.get(i)]
+
+
 def addSuspect(mps_cps, ppo_cpo, pro):
 
-    # Initialize session state for the number of victims
+    # Initialize session state for the number of suspects
     if 'suspect_count' not in st.session_state:
         st.session_state.suspect_count = 1
+    if 'suspect_results' not in st.session_state:
+        st.session_state.suspect_results = {}
 
-    victim_data_list = []
-
-    # Add a victim for each count in the session state
+    # Add a suspect for each count in the session state
     for i in range(st.session_state.suspect_count):
-        victim_data = SuspectDetails(mps_cps, ppo_cpo, pro, i)
-        if victim_data:
-            victim_data_list.append(victim_data)
+        SuspectCard(mps_cps, ppo_cpo, pro, i)
 
     # Buttons to add or remove victims
     col1, col2 = st.columns([1, 1])
@@ -198,6 +208,8 @@ def addSuspect(mps_cps, ppo_cpo, pro):
 
     with col2:
         if st.button("Remove Last Suspect", use_container_width=True, type="primary",key="suspect_btn2"):
-            if st.session_state.victim_count > 1:
-                st.session_state.victim_count -= 1
-                st.rerun()  # Rerun the app to remove the last victim form
\ No newline at end of file
+            if st.session_state.suspect_count > 1:
+                st.session_state.suspect_count -= 1
+                st.rerun()  # Rerun the app to remove the last suspect form
+
+    return get_suspect_data_list()
@@ -1,14 +1,13 @@
 import streamlit as st
-import requests
 from pydantic import ValidationError
 from modules.dataValidation import VictimData_Validation
-from config.database import api_endpoint
+from modules.api_client import get_api_client
 
 
 @st.cache_data(ttl=1800)  # Cache data for 30 minutes
 def get_brgy_city_mun(mps_cps):
     # Make a GET request to the FastAPI endpoint
-    response = requests.get(f"{api_endpoint}/brgy-city-mun/{mps_cps}")
+    response = get_api_client().brgy_city_mun(mps_cps)
 
     # Parse the JSON response
     data = response.json()
@@ -200,19 +199,30 @@ def VictimDetails(mps_cps, ppo_cpo, pro, index):
                 return dict(victim_data)
     
 
+# Each victim card is its own fragment, a change in one card only reruns that card.
+# Its validated data, or None, is kept in st.session_state.victim_results by index.
+@st.experimental_fragment
+def VictimCard(mps_cps, ppo_cpo, pro, index):
+    st.session_state.victim_results[index] = VictimDetails(mps_cps, ppo_cpo, pro, index)
+
+
+# The valid victims of all cards currently shown
+def get_victim_data_list():
+    results = st.session_state.get("victim_results", {})
+    return [results[i] for i in range(st.session_state.get("victim_count", 1)) if results.get(i)]
+
+
 def addVictim(mps_cps, ppo_cpo, pro):
 
     # Initialize session state for the number of victims
     if 'victim_count' not in st.session_state:
         st.session_state.victim_count = 1
-
-    victim_data_list = []
+    if 'victim_results' not in st.session_state:
+        st.session_state.victim_results = {}
 
     # Add a victim for each count in the session state
     for i in range(st.session_state.victim_count):
-        victim_data = VictimDetails(mps_cps, ppo_cpo, pro, i)
-        if victim_data:
-            victim_data_list.append(victim_data)
+        VictimCard(mps_cps, ppo_cpo, pro, i)
 
     # Buttons to add or remove victims
     col1, col2 = st.columns([1, 1])
@@ -227,7 +237,7 @@ def addVictim(mps_cps, ppo_cpo, pro):
                 st.session_state.victim_count -= 1
                 st.rerun()  # Rerun the app to remove the last victim form
 
-    st.write("All Victim Data:", victim_data_list)
+    return get_victim_data_list()
 
 # def addVictim(mps_cps,ppo_cpo,pro):
 #     # Initialize Barangay Values and City Mun Values
@@ -1,31 +1,79 @@
-from fastapi import FastAPI, HTTPException, Depends, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Depends, Request, Query, Header
+from fastapi.responses import JSONResponse, StreamingResponse, Response, ORJSONResponse, FileResponse
 import logging
-from pydantic import BaseModel
-from typing import Annotated,  List, Optional
+from pydantic import BaseModel, computed_field
+from typing import Annotated,  List, Optional, Literal
 from uuid import UUID
 import bcrypt
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import config.models as models
-from config.database import engine, SessionLocal
-from sqlalchemy.orm import Session
-from sqlalchemy import select, func
-from datetime import date, time
+from config.database import engine, AsyncSessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, insert, update, delete, cast, Integer, or_, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from datetime import date, time, datetime, timedelta, timezone
 from modules import dataValidation as dv
-import pandas as pd
-from sqlalchemy.orm import aliased
+import base64
+from collections import Counter
+import csv
+import io
+import json
+from config.summaries import case_summary_upsert, case_counts_backfill, crime_stats_backfill, refresh_case_summary, lock_entry_numbers, case_page_query, case_count_query
+from config.migrations import run_migrations
+from config.reference_data import build_reference_index, etag_matches
+from config.session_token import create_session_token, verify_session_token, create_report_download_token, verify_report_download_token
+from config.reports import run_report_job, REPORT_SCOPES, MEDIA_TYPES
+from config.partitions import ensure_partitions, archive_partitions, archived_case_query, entry_partition_filter, encoded_since_month
+import os
 
 
 app = FastAPI()
 models.Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
-def get_db():
-    db = SessionLocal()
-    try:
+# Month partitions of the case tables, topped up daily by maintain_partitions
+with engine.begin() as conn:
+    ensure_partitions(conn)
+
+# Barangay and offense lookups served from memory, see /admin/reference-data/reload
+with engine.connect() as conn:
+    reference_index = build_reference_index(conn)
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+
+
+# Endpoints that act for a user take the session token issued by /login/ as
+# a bearer token; the /admin endpoints are only open to administrators
+async def require_user(authorization: Optional[str] = Header(None)):
+    scheme, _, token = (authorization or "").partition(" ")
+    claims = verify_session_token(token) if scheme.lower() == "bearer" else None
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired session token", headers={"WWW-Authenticate": "Bearer"})
+    return claims
+
+user_dependency = Annotated[dict, Depends(require_user)]
+
+
+async def require_admin(claims: user_dependency):
+    if claims.get("role") != "administrator":
+        raise HTTPException(status_code=403, detail="Administrator role required")
+    return claims
+
+
+async def is_archived(db: AsyncSession, entry_number: str) -> bool:
+    return (await db.execute(archived_case_query(entry_number))).scalar()
+
+
+async def raise_not_found(db: AsyncSession, entry_number: str, detail: str):
+    # Cases moved out by /admin/partitions/archive are read-only and answer 410
+    if await is_archived(db, entry_number):
+        raise HTTPException(status_code=410, detail=f"Case {entry_number} is archived")
+    raise HTTPException(status_code=404, detail=detail)
 
 
 # Error Logging
@@ -82,10 +130,13 @@ class StationSequence(BaseModel):
 # Pydantic model for TempEntry
 class TempEntryCreate(BaseModel):
     combined_value: str
+    owner: Optional[str] = None
 
 class TempEntryResponse(BaseModel):
     id: int
     combined_value: str
+    owner: Optional[str] = None
+    expires_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -96,10 +147,13 @@ class TempEntryResponse(BaseModel):
 # Pydantic model for TempEntry for Editing
 class TempEntryEdit(BaseModel):
     entry_number: str
+    owner: Optional[str] = None
 
 class TempEntryEditResponse(BaseModel):
     id: int
     entry_number: str
+    owner: Optional[str] = None
+    expires_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -147,6 +201,31 @@ class CaseDetailsModel(BaseModel):
     time_reported: Optional[time] = None
     date_committed: Optional[date] = None
     time_committed: Optional[time] = None
+    brgy: Optional[str] = None
+
+# Partial update of a case: only the fields sent are written
+class CaseDetailsPatch(BaseModel):
+    pro: Optional[str] = None
+    ppo_cpo: Optional[str] = None
+    mps_cps: Optional[str] = None
+    offense: Optional[str] = None
+    offense_class: Optional[str] = None
+    case_status: Optional[str] = None
+    check: Optional[bool] = None
+
+    narrative: Optional[str] = None
+    date_reported: Optional[date] = None
+    time_reported: Optional[time] = None
+    date_committed: Optional[date] = None
+    time_committed: Optional[time] = None
+    brgy: Optional[str] = None
+
+# A whole case submitted at once: the case row (which carries the offense)
+# together with all of its victims and suspects
+class CaseSubmissionModel(BaseModel):
+    case: CaseDetailsModel
+    victims: List[dv.New_Entry_VictimData_Validation] = []
+    suspects: List[dv.New_Entry_SuspectData_Validation] = []
 
 # Define the Pydantic model for the response data
 class CaseData(BaseModel):
@@ -165,6 +244,40 @@ class CaseData(BaseModel):
 
 
 
+# A Detailed Crime Analysis Report for one scope and a range of reporting dates
+class ReportRequest(BaseModel):
+    mps_cps: Optional[str] = None
+    ppo_cpo: Optional[str] = None
+    pro: Optional[str] = None
+    date_from: date
+    date_to: date
+    format: Literal["xlsx", "csv"] = "xlsx"
+
+class ReportJobResponse(BaseModel):
+    id: UUID
+    requested_by: Optional[str] = None
+    scope: str
+    scope_value: str
+    date_from: date
+    date_to: date
+    format: str
+    status: str
+    error: Optional[str] = None
+    row_count: Optional[int] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    # Short-lived token for the download link of a finished report
+    @computed_field
+    @property
+    def download_token(self) -> Optional[str]:
+        if self.status != "done":
+            return None
+        return create_report_download_token(self.id, self.requested_by)
+
+    class Config:
+        from_attributes = True
 
 
 # ============================================
@@ -172,6 +285,158 @@ class CaseData(BaseModel):
 # ============================================
 
 
+# ============================================
+# Case List Helpers
+# ============================================
+# Default and maximum number of cases returned per page by the list endpoints
+CASE_PAGE_LIMIT = 100
+CASE_PAGE_MAX_LIMIT = 1000
+
+# "records" gives a list of row objects, "columnar" one array per column
+CaseListLayout = Literal["records", "columnar"]
+
+# Rows fetched per round trip from the server-side cursor while exporting
+EXPORT_BATCH_SIZE = 1000
+
+# Default and maximum number of matches returned by /search_case and /search_narrative
+SEARCH_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+# Highlighting of the matched words in narrative search results, in markdown bold
+NARRATIVE_HEADLINE_OPTIONS = "StartSel=**, StopSel=**, MaxFragments=3, MaxWords=30, MinWords=10"
+
+
+def encode_cursor(date_encoded: datetime, case_id: UUID) -> str:
+    raw = f"{date_encoded.isoformat()}|{case_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        date_encoded, case_id = raw.split('|', 1)
+        return datetime.fromisoformat(date_encoded), UUID(case_id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def list_cases_page(db: AsyncSession, scope_filter, columns, limit: int, cursor: Optional[str], layout: str):
+    # columns carry their display labels, so the rows go straight to JSON without renaming
+    after = decode_cursor(cursor) if cursor else None
+    rows = (await db.execute(case_page_query(scope_filter, columns, limit, after))).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].date_encoded, rows[-1].case_id)
+
+    # The keyset columns are only needed for the cursor
+    labels = [column.name for column in columns]
+    values = [tuple(row)[2:] for row in rows]
+
+    if layout == "columnar":
+        # One array per column, ready to be loaded as a DataFrame
+        data = {label: [row[index] for row in values] for index, label in enumerate(labels)}
+        return ORJSONResponse({"columns": data, "next_cursor": next_cursor})
+
+    return ORJSONResponse({"items": [dict(zip(labels, row)) for row in values], "next_cursor": next_cursor})
+
+
+async def count_cases(db: AsyncSession, scope_filter):
+    result = await db.execute(case_count_query(scope_filter))
+
+    by_station = Counter()
+    by_month = Counter()
+    by_status = Counter()
+    for row in result.fetchall():
+        by_station[row.mps_cps] += row.count
+        by_month[row.year_month] += row.count
+        by_status[row.case_status] += row.count
+
+    return {
+        "count": sum(by_status.values()),
+        "by_station": dict(by_station),
+        "by_month": dict(sorted(by_month.items())),
+        "by_status": dict(by_status)
+    }
+
+
+def case_scope_filter(mps_cps: Optional[str], ppo_cpo: Optional[str], pro: Optional[str], model=models.Case_Summary):
+    # Same scoping as the list endpoints: exactly one of station, province or region
+    scopes = [
+        (model.mps_cps, mps_cps),
+        (model.ppo_cpo, ppo_cpo),
+        (model.pro, pro),
+    ]
+    given = [(column, value) for column, value in scopes if value]
+    if len(given) != 1:
+        raise HTTPException(status_code=400, detail="Provide exactly one of mps_cps, ppo_cpo or pro")
+    column, value = given[0]
+    return column == value
+
+
+def escape_like(term: str) -> str:
+    # The LIKE wildcards in term taken literally, for patterns with escape='\\'
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def like_pattern(term: str) -> str:
+    # Match the term anywhere
+    return f"%{escape_like(term)}%"
+
+
+def json_default(value):
+    if isinstance(value, (date, time, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+async def export_case_rows(scope_filter, export_format: str):
+    # The session is opened here rather than taken from get_db because the
+    # dependency is closed before a StreamingResponse starts sending its body
+    async with AsyncSessionLocal() as db:
+        query = (
+            select(
+                models.Case_Summary.entry_number,
+                models.Case_Summary.pro,
+                models.Case_Summary.ppo_cpo,
+                models.Case_Summary.mps_cps,
+                models.Case_Summary.offense,
+                models.Case_Summary.offense_class,
+                models.Case_Summary.case_status,
+                models.Case_Summary.date_reported,
+                models.Case_Summary.time_reported,
+                models.Case_Summary.date_committed,
+                models.Case_Summary.time_committed,
+                models.Case_Summary.date_encoded,
+                models.Case_Summary.victim_details,
+                models.Case_Summary.suspect_details
+            )
+            .where(scope_filter)
+            .order_by(models.Case_Summary.date_encoded.desc(), models.Case_Summary.case_id.desc())
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)  # Server-side cursor
+        )
+
+        result = await db.stream(query)
+        columns = list(result.keys())
+
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue()
+
+        async for rows in result.partitions():
+            buffer = io.StringIO()
+            if export_format == "csv":
+                writer = csv.writer(buffer)
+                writer.writerows(rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(dict(zip(columns, row)), default=json_default))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+
+
 def hash_password(password: str) -> str:
     salt = bcrypt.gensalt()
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
@@ -180,37 +445,61 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
-# Get all USERS
-@app.get("/users/")
-async def get_users(db: db_dependency):
-    users = db.query(models.UserBase).all()
-    return users
 
+# bcrypt is CPU bound and would stall the event loop, so it runs on its own small
+# thread pool (bcrypt releases the GIL). The pool size caps how many hashes run at
+# once; a login storm queues here instead of taking the threads other requests use.
+# Size it with bench_login_storm.py: the smallest pool at which login throughput
+# stops growing while the p99 of /cases stays near its idle value.
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 4))
+password_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(password_hash_executor, hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(password_hash_executor, verify_password, plain_password, hashed_password)
+
+
+# Only the user logging in is read and verified; the pages check the returned
+# session token themselves instead of downloading the user table
 @app.post("/login/")
 async def login(user: UserLoginModel, db: db_dependency):
-    db_user = db.query(models.UserBase).filter(models.UserBase.username == user.username).first()
+    result = await db.execute(select(models.UserBase).where(models.UserBase.username == user.username))
+    db_user = result.scalars().first()
     if db_user is None:
         raise HTTPException(status_code=400, detail="Invalid username or password")
     
-    if not verify_password(user.password, db_user.password):
+    if not await verify_password_async(user.password, db_user.password):
         db_user.failed_login_attempts += 1
         db.add(db_user)
-        db.commit()
+        await db.commit()
         raise HTTPException(status_code=400, detail="Invalid username or password")
     
     db_user.is_logged_in = True
     db_user.failed_login_attempts = 0  # Reset on successful login
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
-    return {"message": "Login successful", "user": db_user}
+    return {
+        "message": "Login successful",
+        "token": create_session_token(db_user),
+        "user": {
+            "username": db_user.username,
+            "pro": db_user.pro,
+            "ppo_cpo": db_user.ppo_cpo,
+            "mps_cps": db_user.mps_cps,
+            "role": db_user.role
+        }
+    }
 
 
 # Endpoint to fetch `seq` by `mps_cps`
 @app.get("/stations/{mps_cps}", response_model=List[StationSequence])
-async def read_station_by_mps_cps(mps_cps: str, db: Session = Depends(get_db)):
-    station_sequence = db.execute(select(models.Station_Sequence).where(models.Station_Sequence.mps_cps == mps_cps)).scalars().all()
+async def read_station_by_mps_cps(mps_cps: str, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(models.Station_Sequence).where(models.Station_Sequence.mps_cps == mps_cps))
+    station_sequence = result.scalars().all()
     
     if not station_sequence:
         raise HTTPException(status_code=404, detail="Station sequence not found")
@@ -220,86 +509,132 @@ async def read_station_by_mps_cps(mps_cps: str, db: Session = Depends(get_db)):
 
 
 # Endpoint to store a new temp entry
+# ============================================
+# Temp Entries
+# ============================================
+# A temp entry hands an entry number from the dashboard to the entry or edit form.
+# It belongs to the encoder who created it and is purged when left unused this long.
+TEMP_ENTRY_TTL = timedelta(hours=2)
+
+# Seconds between purges of expired temp entries
+TEMP_ENTRY_REAP_INTERVAL = 300
+
+
+def temp_entry_expiry() -> datetime:
+    return datetime.now(timezone.utc) + TEMP_ENTRY_TTL
+
+
+async def get_live_temp_entry(db: AsyncSession, model, entry_id: int, owner: Optional[str]):
+    # Expired entries and entries of other encoders are treated as missing.
+    # Reading an entry keeps it alive for another TEMP_ENTRY_TTL.
+    db_entry = await db.get(model, entry_id)
+    if (
+        db_entry is None
+        or (db_entry.expires_at is not None and db_entry.expires_at < datetime.now(timezone.utc))
+        or (db_entry.owner is not None and db_entry.owner != owner)
+    ):
+        raise HTTPException(status_code=404, detail="Entry not found")
+    db_entry.expires_at = temp_entry_expiry()
+    await db.commit()
+    return db_entry
+
+
+async def reap_temp_entries():
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                now = datetime.now(timezone.utc)
+                await db.execute(delete(models.TempEntry).where(models.TempEntry.expires_at < now))
+                await db.execute(delete(models.TempEditEntry).where(models.TempEditEntry.expires_at < now))
+                await db.commit()
+        except Exception:
+            logger.exception("Failed to purge expired temp entries")
+        await asyncio.sleep(TEMP_ENTRY_REAP_INTERVAL)
+
+
+@app.on_event("startup")
+async def start_temp_entry_reaper():
+    app.state.temp_entry_reaper = asyncio.create_task(reap_temp_entries())
+
+
+@app.on_event("shutdown")
+async def stop_temp_entry_reaper():
+    app.state.temp_entry_reaper.cancel()
+
+
 @app.post("/temp-entries/", response_model=TempEntryResponse)
-async def create_temp_entry(entry: TempEntryCreate, db: Session = Depends(get_db)):
-    db_entry = models.TempEntry(combined_value=entry.combined_value)
+async def create_temp_entry(entry: TempEntryCreate, db: AsyncSession = Depends(get_db)):
+    db_entry = models.TempEntry(combined_value=entry.combined_value, owner=entry.owner, expires_at=temp_entry_expiry())
     db.add(db_entry)
-    db.commit()
-    db.refresh(db_entry)
+    await db.commit()
+    await db.refresh(db_entry)
     return db_entry
 
+# Endpoint to get one temp entry of an encoder
+@app.get("/temp-entries/{entry_id}", response_model=TempEntryResponse)
+async def get_temp_entry(entry_id: int, owner: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    return await get_live_temp_entry(db, models.TempEntry, entry_id, owner)
+
 # Endpoint to delete a temp entry
 @app.delete("/temp-entries/{entry_id}", response_model=TempEntryResponse)
-async def delete_temp_entry(entry_id: int, db: Session = Depends(get_db)):
-    db_entry = db.query(models.TempEntry).filter(models.TempEntry.id == entry_id).first()
+async def delete_temp_entry(entry_id: int, db: AsyncSession = Depends(get_db)):
+    db_entry = await db.get(models.TempEntry, entry_id)
     if db_entry is None:
         raise HTTPException(status_code=404, detail="Entry not found")
-    db.delete(db_entry)
-    db.commit()
+    await db.delete(db_entry)
+    await db.commit()
     return db_entry
 
 # Endpoint to get all temp entries (optional, for debugging)
 @app.get("/temp-entries/", response_model=List[TempEntryResponse])
-async def get_temp_entries(db: Session = Depends(get_db)):
-    return db.query(models.TempEntry).all()
+async def get_temp_entries(db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(models.TempEntry))
+    return result.scalars().all()
 
 
-# Endpoint to get Brgy_Value and City_Mun_Value based on mps_cps
-@app.get("/brgy-city-mun/{mps_cps}", response_model=Province_City_Mun_Value_ResponseModel)
-async def get_brgy_city_mun(mps_cps: str, db: db_dependency):
+# ============================================
+# Reference Data
+# ============================================
+# Clients may keep reference responses but have to revalidate them with If-None-Match
+REFERENCE_CACHE_CONTROL = "public, no-cache"
 
-    # Query to get Brgy_Value
-    brgy_query = select(
-        models.Province_Brgy_Details.id,
-        models.Province_Brgy_Details.brgy
-    ).where(models.Province_Brgy_Details.mps_cps == mps_cps)
-    
-    brgy_results = db.execute(brgy_query).fetchall()
-    brgy_values = [Brgy_Value(id=row[0], brgy=row[1]) for row in brgy_results]
 
-    # Query to get the first City_Mun_Value
-    city_mun_query = select(
-        models.Province_Brgy_Details.id,
-        models.Province_Brgy_Details.mun_city
-    ).where(models.Province_Brgy_Details.mps_cps == mps_cps).limit(1)
+def reference_response(request: Request, entry):
+    headers = {"ETag": entry.etag, "Cache-Control": REFERENCE_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
 
-    city_mun_result = db.execute(city_mun_query).first()
 
-    city_mun_value = None
-    if city_mun_result:
-        city_mun_value = City_Mun_Value(id=city_mun_result[0], city_mun=city_mun_result[1])
+# Endpoint to get Brgy_Value and City_Mun_Value based on mps_cps
+@app.get("/brgy-city-mun/{mps_cps}", response_model=Province_City_Mun_Value_ResponseModel)
+async def get_brgy_city_mun(mps_cps: str, request: Request):
+    entry = reference_index["brgy_city_mun"].get(mps_cps, reference_index["brgy_city_mun_empty"])
+    return reference_response(request, entry)
 
-    # Query to get the first Province
-    province_query = select(
-        models.Province_Brgy_Details.id,
-        models.Province_Brgy_Details.province
-    ).where(models.Province_Brgy_Details.mps_cps == mps_cps).limit(1)
 
-    province_result = db.execute(province_query).first()
+# Endpoint to get offense classifications
+@app.get("/offense_classifications")
+async def get_offense_classifications(request: Request):
+    return reference_response(request, reference_index["offense_classifications"])
 
-    province_value = None
-    if province_result:
-        province_value = Province_Value(id=province_result[0], province=province_result[1])
 
-    # Return the results as a dictionary
+# Rebuild the in-memory reference data after regionxii_brgy or offense_class
+# were changed. Each API worker process holds its own copy.
+@app.post("/admin/reference-data/reload", dependencies=[Depends(require_admin)])
+async def reload_reference_data(db: db_dependency):
+    global reference_index
+    reference_index = await db.run_sync(build_reference_index)
     return {
-        "brgy_values": brgy_values,
-        "city_mun_value": city_mun_value,
-        "province_value": province_value
+        "message": "Reference data reloaded",
+        "stations": len(reference_index["brgy_city_mun"])
     }
 
 
-# Endpoint to get offense classifications
-@app.get("/offense_classifications")
-async def get_offense_classifications(db: Session = Depends(get_db)):
-    offenses = db.query(models.Offense).all()
-    return [{"incidents": offense.incidents} for offense in offenses]
-
-
 
 
 @app.post("/case-details/")
-async def create_case_details(case_details: CaseDetailsModel, db: Session = Depends(get_db)):
+async def create_case_details(case_details: CaseDetailsModel, db: AsyncSession = Depends(get_db)):
     # Create a new database object
     db_case_details = models.CaseDetails(
 		pro= case_details.pro,
@@ -314,460 +649,595 @@ async def create_case_details(case_details: CaseDetailsModel, db: Session = Depe
         date_reported=case_details.date_reported,
         time_reported=case_details.time_reported,
         date_committed=case_details.date_committed,
-        time_committed=case_details.time_committed
+        time_committed=case_details.time_committed,
+        brgy=case_details.brgy
     )
 
     # Add it to the database
     db.add(db_case_details)
-    db.commit()
-    db.refresh(db_case_details)
+    await db.flush()
+    await refresh_case_summary(db, [db_case_details.entry_number])
+    await db.commit()
+    await db.refresh(db_case_details)
 
     return db_case_details
 
 
 @app.post("/victim-new-entry/", response_model=dv.New_Entry_VictimData_Validation)
-async def enter_victim(victim: dv.New_Entry_VictimData_Validation, db: Session = Depends(get_db)):
+async def enter_victim(victim: dv.New_Entry_VictimData_Validation, db: AsyncSession = Depends(get_db)):
     db_victim = models.Victim_Details(**victim.model_dump())
     db.add(db_victim)
-    db.commit()
-    db.refresh(db_victim)
+    await db.flush()
+    await refresh_case_summary(db, [db_victim.entry_number])
+    await db.commit()
+    await db.refresh(db_victim)
     return db_victim
 
 
 
 @app.post("/suspect-new-entry/", response_model=dv.New_Entry_SuspectData_Validation)
-async def enter_victim(suspect: dv.New_Entry_SuspectData_Validation, db: Session = Depends(get_db)):
+async def enter_victim(suspect: dv.New_Entry_SuspectData_Validation, db: AsyncSession = Depends(get_db)):
     db_suspect = models.Suspect_Details(**suspect.model_dump())
     db.add(db_suspect)
-    db.commit()
-    db.refresh(db_suspect)
+    await db.flush()
+    await refresh_case_summary(db, [db_suspect.entry_number])
+    await db.commit()
+    await db.refresh(db_suspect)
     return db_suspect
 
+@app.post("/cases/submit")
+async def submit_case(submission: CaseSubmissionModel, db: db_dependency):
+    entry_number = submission.case.entry_number
+
+    # Held until commit, so a second submit of the same entry number waits here
+    # and then finds the stored case instead of storing it again
+    await lock_entry_numbers(db, [entry_number])
+    existing = (await db.execute(
+        select(models.CaseDetails.id)
+        .where(models.CaseDetails.entry_number == entry_number, *entry_partition_filter(models.CaseDetails, [entry_number]))
+    )).first()
+    if existing or await is_archived(db, entry_number):
+        raise HTTPException(status_code=409, detail=f"Entry number {entry_number} already exists")
+
+    # Everything below runs in one transaction, either the whole case is stored or nothing is
+    try:
+        result = await db.execute(
+            insert(models.CaseDetails).values(**submission.case.model_dump()).returning(models.CaseDetails.id)
+        )
+        case_id = result.scalar_one()
+
+        victim_ids = []
+        if submission.victims:
+            result = await db.execute(
+                insert(models.Victim_Details).returning(models.Victim_Details.id, sort_by_parameter_order=True),
+                [{**victim.model_dump(), "entry_number": entry_number} for victim in submission.victims]
+            )
+            victim_ids = result.scalars().all()
+
+        suspect_ids = []
+        if submission.suspects:
+            result = await db.execute(
+                insert(models.Suspect_Details).returning(models.Suspect_Details.id, sort_by_parameter_order=True),
+                [{**suspect.model_dump(), "entry_number": entry_number} for suspect in submission.suspects]
+            )
+            suspect_ids = result.scalars().all()
+
+        await refresh_case_summary(db, [entry_number])
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    return {
+        "entry_number": entry_number,
+        "case_id": case_id,
+        "victim_ids": victim_ids,
+        "suspect_ids": suspect_ids
+    }
+
+
 # UPDATE CASES IN THE DATABASE
 @app.put("/update-case-details/{entry_number}")
-async def update_case_details(entry_number: str, case_details: CaseDetailsModel, db: Session = Depends(get_db)):
-    db_case_details = db.query(models.CaseDetails).filter(models.CaseDetails.entry_number == entry_number).first()
+async def update_case_details(entry_number: str, case_details: CaseDetailsModel, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(models.CaseDetails).where(models.CaseDetails.entry_number == entry_number, *entry_partition_filter(models.CaseDetails, [entry_number])))
+    db_case_details = result.scalars().first()
     if db_case_details is None:
-        raise HTTPException(status_code=404, detail="Case details not found")
+        await raise_not_found(db, entry_number, "Case details not found")
 
     for key, value in case_details.model_dump().items():
         setattr(db_case_details, key, value)
 
-    db.commit()
-    db.refresh(db_case_details)
+    await db.flush()
+    await refresh_case_summary(db, [entry_number, db_case_details.entry_number])
+    await db.commit()
+    await db.refresh(db_case_details)
 
     return db_case_details
 
 @app.put("/update-victim-details/{entry_number}")
-async def update_victim_details(entry_number: str, victim: dv.New_Entry_VictimData_Validation, db: Session = Depends(get_db)):
-    db_victim = db.query(models.Victim_Details).filter(models.Victim_Details.entry_number == entry_number).first()
+async def update_victim_details(entry_number: str, victim: dv.New_Entry_VictimData_Validation, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(models.Victim_Details).where(models.Victim_Details.entry_number == entry_number, *entry_partition_filter(models.Victim_Details, [entry_number])))
+    db_victim = result.scalars().first()
     if db_victim is None:
-        raise HTTPException(status_code=404, detail="Victim details not found")
+        await raise_not_found(db, entry_number, "Victim details not found")
 
     for key, value in victim.model_dump().items():
         setattr(db_victim, key, value)
 
-    db.commit()
-    db.refresh(db_victim)
+    await db.flush()
+    await refresh_case_summary(db, [entry_number, db_victim.entry_number])
+    await db.commit()
+    await db.refresh(db_victim)
     
     return db_victim
 
 @app.put("/update-suspect-details/{entry_number}")
-async def update_suspect_details(entry_number: str, suspect: dv.New_Entry_SuspectData_Validation, db: Session = Depends(get_db)):
-    db_suspect = db.query(models.Suspect_Details).filter(models.Suspect_Details.entry_number == entry_number).first()
+async def update_suspect_details(entry_number: str, suspect: dv.New_Entry_SuspectData_Validation, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(models.Suspect_Details).where(models.Suspect_Details.entry_number == entry_number, *entry_partition_filter(models.Suspect_Details, [entry_number])))
+    db_suspect = result.scalars().first()
     if db_suspect is None:
-        raise HTTPException(status_code=404, detail="Suspect details not found")
+        await raise_not_found(db, entry_number, "Suspect details not found")
 
     for key, value in suspect.model_dump().items():
         setattr(db_suspect, key, value)
 
-    db.commit()
-    db.refresh(db_suspect)
-    
+    await db.flush()
+    await refresh_case_summary(db, [entry_number, db_suspect.entry_number])
+    await db.commit()
+    await db.refresh(db_suspect)
+
     return db_suspect
 
 
+async def patch_entry_rows(db: AsyncSession, model, entry_number: str, row_id: Optional[UUID], changes: BaseModel, not_found: str):
+    # One UPDATE ... RETURNING that writes only the fields that were sent.
+    # row_id picks one row of the entry number, otherwise all of its rows change.
+    values = changes.model_dump(exclude_unset=True)
+    if not values:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    # An explicit null would otherwise reach the database as a NOT NULL violation
+    not_nullable = [key for key, value in values.items() if value is None and not model.__table__.c[key].nullable]
+    if not_nullable:
+        raise HTTPException(status_code=422, detail=f"Fields cannot be null: {', '.join(not_nullable)}")
+
+    statement = update(model).where(model.entry_number == entry_number, *entry_partition_filter(model, [entry_number]))
+    if row_id is not None:
+        statement = statement.where(model.id == row_id)
+    statement = statement.values(**values).returning(model).execution_options(synchronize_session=False)
+
+    rows = (await db.execute(statement)).scalars().all()
+    if not rows:
+        await db.rollback()
+        await raise_not_found(db, entry_number, not_found)
+
+    await refresh_case_summary(db, [entry_number])
+    await db.commit()
+    return rows
+
+@app.patch("/case-details/{entry_number}")
+async def patch_case_details(entry_number: str, changes: CaseDetailsPatch, id: Optional[UUID] = None, db: AsyncSession = Depends(get_db)):
+    return await patch_entry_rows(db, models.CaseDetails, entry_number, id, changes, "Case details not found")
+
+@app.patch("/victim-details/{entry_number}")
+async def patch_victim_details(entry_number: str, changes: dv.Patch_VictimData_Validation, id: Optional[UUID] = None, db: AsyncSession = Depends(get_db)):
+    return await patch_entry_rows(db, models.Victim_Details, entry_number, id, changes, "Victim details not found")
+
+@app.patch("/suspect-details/{entry_number}")
+async def patch_suspect_details(entry_number: str, changes: dv.Patch_SuspectData_Validation, id: Optional[UUID] = None, db: AsyncSession = Depends(get_db)):
+    return await patch_entry_rows(db, models.Suspect_Details, entry_number, id, changes, "Suspect details not found")
+
+
+
+@app.get('/cases', response_class=ORJSONResponse)
+async def get_cases(mps_cps: str, limit: int = Query(CASE_PAGE_LIMIT, ge=1, le=CASE_PAGE_MAX_LIMIT), cursor: Optional[str] = None, layout: CaseListLayout = "records", db: AsyncSession = Depends(get_db)):
+    columns = [
+        models.Case_Summary.entry_number.label("Entry Number"),
+        models.Case_Summary.offense.label("Offense"),
+        models.Case_Summary.case_status.label("Case Status"),
+        models.Case_Summary.date_reported.label("Date Reported"),
+        models.Case_Summary.date_committed.label("Date Committed"),
+        models.Case_Summary.victim_details.label("Victim Details"),
+        models.Case_Summary.suspect_details.label("Suspect Details"),
+    ]
 
-@app.get('/cases')
-def get_cases(mps_cps: str, db: Session = Depends(get_db)):
-    # Aliases for Victim_Details and Suspect_Details for aggregation
-    victims_alias = aliased(models.Victim_Details)
-    suspects_alias = aliased(models.Suspect_Details)
+    return await list_cases_page(db, models.Case_Summary.mps_cps == mps_cps, columns, limit, cursor, layout)
+
+@app.get('/cases-ppo', response_class=ORJSONResponse)
+async def get_cases_ppo(ppo_cpo: str, limit: int = Query(CASE_PAGE_LIMIT, ge=1, le=CASE_PAGE_MAX_LIMIT), cursor: Optional[str] = None, layout: CaseListLayout = "records", db: AsyncSession = Depends(get_db)):
+    columns = [
+        models.Case_Summary.entry_number.label("Entry Number"),
+        models.Case_Summary.mps_cps.label("Station"),
+        models.Case_Summary.offense.label("Offense"),
+        models.Case_Summary.case_status.label("Case Status"),
+        models.Case_Summary.date_reported.label("Date Reported"),
+        models.Case_Summary.date_committed.label("Date Committed"),
+        models.Case_Summary.victim_details.label("Victim Details"),
+        models.Case_Summary.suspect_details.label("Suspect Details"),
+    ]
 
-    # Subquery to aggregate victim details
-    victim_subquery = (
-        select(
-            victims_alias.entry_number,
-            func.string_agg(
-                func.concat(
-                    victims_alias.vic_fname, ' ', victims_alias.vic_midname, ' ',
-                    victims_alias.vic_lname, ' ', victims_alias.vic_qlfr, ' ',
-                    victims_alias.vic_alias, ' (', victims_alias.vic_age, '/', victims_alias.vic_gndr, ')'
-                ), '; '
-            ).label('victim_details')
-        )
-        .filter(victims_alias.mps_cps == mps_cps)  # Filtering based on mps_cps
-        .group_by(victims_alias.entry_number)
-        .subquery()
-    )
+    return await list_cases_page(db, models.Case_Summary.ppo_cpo == ppo_cpo, columns, limit, cursor, layout)
+
+
+@app.get('/cases-pro', response_class=ORJSONResponse)
+async def get_cases_pro(pro: str, limit: int = Query(CASE_PAGE_LIMIT, ge=1, le=CASE_PAGE_MAX_LIMIT), cursor: Optional[str] = None, layout: CaseListLayout = "records", db: AsyncSession = Depends(get_db)):
+    columns = [
+        models.Case_Summary.entry_number.label("Entry Number"),
+        models.Case_Summary.ppo_cpo.label("PPO"),
+        models.Case_Summary.mps_cps.label("Station"),
+        models.Case_Summary.offense.label("Offense"),
+        models.Case_Summary.case_status.label("Case Status"),
+        models.Case_Summary.date_reported.label("Date Reported"),
+        models.Case_Summary.date_committed.label("Date Committed"),
+        models.Case_Summary.victim_details.label("Victim Details"),
+        models.Case_Summary.suspect_details.label("Suspect Details"),
+    ]
 
-    # Subquery to aggregate suspect details
-    suspect_subquery = (
-        select(
-            suspects_alias.entry_number,
-            func.string_agg(
-                func.concat(
-                    suspects_alias.sus_fname, ' ', suspects_alias.sus_midname, ' ',
-                    suspects_alias.sus_lname, ' ', suspects_alias.sus_qlfr, ' ',
-                    suspects_alias.sus_alias, ' (', suspects_alias.sus_age, '/', suspects_alias.sus_gndr, ')'
-                ), '; '
-            ).label('suspect_details')
-        )
-        .filter(suspects_alias.mps_cps == mps_cps)  # Filtering based on mps_cps
-        .group_by(suspects_alias.entry_number)
-        .subquery()
-    )
+    return await list_cases_page(db, models.Case_Summary.pro == pro, columns, limit, cursor, layout)
 
-    # Main query to select case details and join with victim and suspect details
-    query = (
-        select(
-            models.CaseDetails.entry_number,
-            models.CaseDetails.offense,
-            models.CaseDetails.case_status,
-            models.CaseDetails.date_reported,
-            models.CaseDetails.time_reported,
-            models.CaseDetails.date_committed,
-            models.CaseDetails.time_committed,
-            victim_subquery.c.victim_details,
-            suspect_subquery.c.suspect_details
-        )
-        .outerjoin(victim_subquery, models.CaseDetails.entry_number == victim_subquery.c.entry_number)
-        .outerjoin(suspect_subquery, models.CaseDetails.entry_number == suspect_subquery.c.entry_number)
-        .filter(models.CaseDetails.mps_cps == mps_cps)  # Filtering based on mps_cps
-        .order_by(models.CaseDetails.date_encoded.desc())
-    )
+@app.get('/cases/export')
+async def export_cases(mps_cps: Optional[str] = None, ppo_cpo: Optional[str] = None, pro: Optional[str] = None, format: Literal["ndjson", "csv"] = "ndjson"):
+    scope_filter = case_scope_filter(mps_cps, ppo_cpo, pro)
 
-    # Execute the query
-    result = db.execute(query)
-
-    # Fetch all the rows
-    rows = result.fetchall()
-
-    # Convert the rows to a DataFrame
-    df = pd.DataFrame(rows, columns=[
-        "entry_number",
-        "offense",
-        "case_status",
-        "date_reported",
-        "time_reported",
-        "date_committed",
-        "time_committed",
-        "victim_details",
-        "suspect_details"
-    ])
-
-    # Drop the time_reported and time_committed columns if not needed
-    df = df.drop(columns=["time_reported", "time_committed"])
-
-    # Rename columns if needed
-    df = df.rename(columns={
-        "entry_number": "Entry Number",
-        "offense": "Offense",
-        "case_status": "Case Status",
-        "date_reported": "Date Reported",
-        "date_committed": "Date Committed",
-        "victim_details": "Victim Details",
-        "suspect_details": "Suspect Details"
-    })
-
-    # Return the DataFrame as a JSON response
-    return df
-
-@app.get('/cases-ppo')
-def get_cases_ppo(ppo_cpo: str, db: Session = Depends(get_db)):
-    # Aliases for Victim_Details and Suspect_Details for aggregation
-    victims_alias = aliased(models.Victim_Details)
-    suspects_alias = aliased(models.Suspect_Details)
-
-    # Subquery to aggregate victim details
-    victim_subquery = (
-        select(
-            victims_alias.entry_number,
-            func.string_agg(
-                func.concat(
-                    victims_alias.vic_fname, ' ', victims_alias.vic_midname, ' ',
-                    victims_alias.vic_lname, ' ', victims_alias.vic_qlfr, ' ',
-                    victims_alias.vic_alias, ' (', victims_alias.vic_age, '/', victims_alias.vic_gndr, ')'
-                ), '; '
-            ).label('victim_details')
-        )
-        .filter(victims_alias.ppo_cpo == ppo_cpo)  # Filtering based on mps_cps
-        .group_by(victims_alias.entry_number)
-        .subquery()
-    )
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f"attachment; filename=cases.{format}"}
 
-    # Subquery to aggregate suspect details
-    suspect_subquery = (
-        select(
-            suspects_alias.entry_number,
-            func.string_agg(
-                func.concat(
-                    suspects_alias.sus_fname, ' ', suspects_alias.sus_midname, ' ',
-                    suspects_alias.sus_lname, ' ', suspects_alias.sus_qlfr, ' ',
-                    suspects_alias.sus_alias, ' (', suspects_alias.sus_age, '/', suspects_alias.sus_gndr, ')'
-                ), '; '
-            ).label('suspect_details')
-        )
-        .filter(suspects_alias.ppo_cpo == ppo_cpo)  # Filtering based on mps_cps
-        .group_by(suspects_alias.entry_number)
-        .subquery()
-    )
+    return StreamingResponse(export_case_rows(scope_filter, format), media_type=media_type, headers=headers)
 
-    # Main query to select case details and join with victim and suspect details
-    query = (
-        select(
-            models.CaseDetails.entry_number,
-            models.CaseDetails.mps_cps,
-            models.CaseDetails.offense,
-            models.CaseDetails.case_status,
-            models.CaseDetails.date_reported,
-            models.CaseDetails.time_reported,
-            models.CaseDetails.date_committed,
-            models.CaseDetails.time_committed,
-            victim_subquery.c.victim_details,
-            suspect_subquery.c.suspect_details
-        )
-        .outerjoin(victim_subquery, models.CaseDetails.entry_number == victim_subquery.c.entry_number)
-        .outerjoin(suspect_subquery, models.CaseDetails.entry_number == suspect_subquery.c.entry_number)
-        .filter(models.CaseDetails.ppo_cpo == ppo_cpo)  # Filtering based on mps_cps
-        .order_by(models.CaseDetails.date_encoded.desc())
-    )
 
-    # Execute the query
-    result = db.execute(query)
-
-    # Fetch all the rows
-    rows = result.fetchall()
-
-    # Convert the rows to a DataFrame
-    df = pd.DataFrame(rows, columns=[
-        "entry_number",
-        "mps_cps",
-        "offense",
-        "case_status",
-        "date_reported",
-        "time_reported",
-        "date_committed",
-        "time_committed",
-        "victim_details",
-        "suspect_details"
-    ])
-
-    # Drop the time_reported and time_committed columns if not needed
-    df = df.drop(columns=["time_reported", "time_committed"])
-
-    # Rename columns if needed
-    df = df.rename(columns={
-        "entry_number": "Entry Number",
-        "mps_cps": "Station",
-        "offense": "Offense",
-        "case_status": "Case Status",
-        "date_reported": "Date Reported",
-        "date_committed": "Date Committed",
-        "victim_details": "Victim Details",
-        "suspect_details": "Suspect Details"
-    })
-
-    # Return the DataFrame as a JSON response
-    return df
-
-
-@app.get('/cases-pro')
-def get_cases_pro(pro: str, db: Session = Depends(get_db)):
-    # Aliases for Victim_Details and Suspect_Details for aggregation
-    victims_alias = aliased(models.Victim_Details)
-    suspects_alias = aliased(models.Suspect_Details)
-
-    # Subquery to aggregate victim details
-    victim_subquery = (
-        select(
-            victims_alias.entry_number,
-            func.string_agg(
-                func.concat(
-                    victims_alias.vic_fname, ' ', victims_alias.vic_midname, ' ',
-                    victims_alias.vic_lname, ' ', victims_alias.vic_qlfr, ' ',
-                    victims_alias.vic_alias, ' (', victims_alias.vic_age, '/', victims_alias.vic_gndr, ')'
-                ), '; '
-            ).label('victim_details')
-        )
-        .filter(victims_alias.pro == pro)  # Filtering based on mps_cps
-        .group_by(victims_alias.entry_number)
-        .subquery()
-    )
+# ============================================
+# Reports
+# ============================================
+# Reports are built by this small pool, never inside a request: the endpoints only
+# queue a job, report its status and hand out the finished file
+REPORT_WORKERS = 2
+report_executor = ThreadPoolExecutor(max_workers=REPORT_WORKERS, thread_name_prefix="report")
 
-    # Subquery to aggregate suspect details
-    suspect_subquery = (
-        select(
-            suspects_alias.entry_number,
-            func.string_agg(
-                func.concat(
-                    suspects_alias.sus_fname, ' ', suspects_alias.sus_midname, ' ',
-                    suspects_alias.sus_lname, ' ', suspects_alias.sus_qlfr, ' ',
-                    suspects_alias.sus_alias, ' (', suspects_alias.sus_age, '/', suspects_alias.sus_gndr, ')'
-                ), '; '
-            ).label('suspect_details')
+# Number of jobs listed by GET /reports
+REPORT_JOB_LIST_LIMIT = 20
+
+# A job left running this long is taken to have lost its worker and is queued
+# again. Far longer than a report takes to build, so jobs another API worker
+# is still building are left alone.
+REPORT_JOB_STALE_AFTER = timedelta(hours=1)
+
+# Seconds between checks for jobs left running by a stopped worker
+REPORT_JOB_SWEEP_INTERVAL = 300
+
+
+async def requeue_stale_report_jobs(db: AsyncSession):
+    result = await db.execute(
+        update(models.Report_Job)
+        .where(
+            models.Report_Job.status == "running",
+            models.Report_Job.started_at < datetime.now(timezone.utc) - REPORT_JOB_STALE_AFTER
         )
-        .filter(suspects_alias.pro == pro)  # Filtering based on mps_cps
-        .group_by(suspects_alias.entry_number)
-        .subquery()
+        .values(status="queued", started_at=None)
+        .returning(models.Report_Job.id)
+    )
+    return result.scalars().all()
+
+
+async def sweep_report_jobs():
+    while True:
+        await asyncio.sleep(REPORT_JOB_SWEEP_INTERVAL)
+        try:
+            async with AsyncSessionLocal() as db:
+                job_ids = await requeue_stale_report_jobs(db)
+                await db.commit()
+            for job_id in job_ids:
+                report_executor.submit(run_report_job, job_id)
+        except Exception:
+            logger.exception("Failed to requeue stale report jobs")
+
+
+@app.on_event("startup")
+async def resume_report_jobs():
+    # Jobs still queued when the API last stopped, and jobs whose worker died
+    # while building them, are picked up again
+    async with AsyncSessionLocal() as db:
+        await requeue_stale_report_jobs(db)
+        await db.commit()
+        job_ids = (await db.execute(select(models.Report_Job.id).where(models.Report_Job.status == "queued"))).scalars().all()
+    for job_id in job_ids:
+        report_executor.submit(run_report_job, job_id)
+    app.state.report_job_sweeper = asyncio.create_task(sweep_report_jobs())
+
+
+@app.on_event("shutdown")
+async def stop_report_workers():
+    app.state.report_job_sweeper.cancel()
+    report_executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def get_report_job(db: AsyncSession, job_id: UUID, username: str):
+    # Jobs of other users are reported as missing
+    job = await db.get(models.Report_Job, job_id)
+    if job is None or job.requested_by != username:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return job
+
+
+@app.post("/reports", response_model=ReportJobResponse, status_code=202)
+async def create_report(report: ReportRequest, db: db_dependency, user: user_dependency):
+    scopes = [(scope, getattr(report, scope)) for scope in REPORT_SCOPES if getattr(report, scope)]
+    if len(scopes) != 1:
+        raise HTTPException(status_code=400, detail="Provide exactly one of mps_cps, ppo_cpo or pro")
+    if report.date_from > report.date_to:
+        raise HTTPException(status_code=400, detail="date_from is after date_to")
+
+    scope, scope_value = scopes[0]
+    job = models.Report_Job(
+        requested_by=user["sub"],
+        scope=scope,
+        scope_value=scope_value,
+        date_from=report.date_from,
+        date_to=report.date_to,
+        format=report.format,
+        status="queued"
     )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
 
-    # Main query to select case details and join with victim and suspect details
-    query = (
-        select(
-            models.CaseDetails.entry_number,
-            models.CaseDetails.ppo_cpo,
-            models.CaseDetails.mps_cps,
-            models.CaseDetails.offense,
-            models.CaseDetails.case_status,
-            models.CaseDetails.date_reported,
-            models.CaseDetails.time_reported,
-            models.CaseDetails.date_committed,
-            models.CaseDetails.time_committed,
-            victim_subquery.c.victim_details,
-            suspect_subquery.c.suspect_details
-        )
-        .outerjoin(victim_subquery, models.CaseDetails.entry_number == victim_subquery.c.entry_number)
-        .outerjoin(suspect_subquery, models.CaseDetails.entry_number == suspect_subquery.c.entry_number)
-        .filter(models.CaseDetails.pro == pro)  # Filtering based on mps_cps
-        .order_by(models.CaseDetails.date_encoded.desc())
+    report_executor.submit(run_report_job, job.id)
+    return job
+
+
+@app.get("/reports", response_model=List[ReportJobResponse])
+async def list_reports(user: user_dependency, limit: int = Query(REPORT_JOB_LIST_LIMIT, ge=1, le=100), db: AsyncSession = Depends(get_db)):
+    result = await db.execute(
+        select(models.Report_Job)
+        .where(models.Report_Job.requested_by == user["sub"])
+        .order_by(models.Report_Job.created_at.desc())
+        .limit(limit)
     )
+    return result.scalars().all()
+
+
+@app.get("/reports/{job_id}", response_model=ReportJobResponse)
+async def get_report(job_id: UUID, db: db_dependency, user: user_dependency):
+    return await get_report_job(db, job_id, user["sub"])
+
+
+# Opened by the browser, so the user comes from the download_token of the job
+# listing instead of the Authorization header
+@app.get("/reports/{job_id}/download")
+async def download_report(job_id: UUID, token: str, db: db_dependency):
+    username = verify_report_download_token(token, job_id)
+    if username is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired download link")
+    job = await get_report_job(db, job_id, username)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Report is {job.status}")
+    if not job.file_path or not os.path.exists(job.file_path):
+        raise HTTPException(status_code=410, detail="Report file is no longer available")
+
+    filename = f"crime_analysis_{job.scope_value}_{job.date_from}_{job.date_to}.{job.format}"
+    return FileResponse(job.file_path, media_type=MEDIA_TYPES[job.format], filename=filename)
+
+
+# ============================================
+# Crime Statistics
+# ============================================
+# What /stats can group by and filter on: the crime_stats key plus the month and
+# year of the reporting day
+STAT_DIMENSIONS = {
+    "pro": models.Crime_Stat.pro,
+    "ppo_cpo": models.Crime_Stat.ppo_cpo,
+    "mps_cps": models.Crime_Stat.mps_cps,
+    "brgy": models.Crime_Stat.brgy,
+    "offense": models.Crime_Stat.offense,
+    "offense_class": models.Crime_Stat.offense_class,
+    "case_status": models.Crime_Stat.case_status,
+    "day": models.Crime_Stat.day,
+    # The formats are inlined so the grouped and selected expressions are identical SQL
+    "month": func.to_char(models.Crime_Stat.day, literal_column("'YYYY-MM'")),
+    "year": func.to_char(models.Crime_Stat.day, literal_column("'YYYY'")),
+}
+StatDimension = Literal["pro", "ppo_cpo", "mps_cps", "brgy", "offense", "offense_class", "case_status", "day", "month", "year"]
+
+
+@app.get("/stats", response_class=ORJSONResponse)
+async def get_stats(
+    group_by: List[StatDimension] = Query([]),
+    pro: List[str] = Query([]),
+    ppo_cpo: List[str] = Query([]),
+    mps_cps: List[str] = Query([]),
+    brgy: List[str] = Query([]),
+    offense: List[str] = Query([]),
+    offense_class: List[str] = Query([]),
+    case_status: List[str] = Query([]),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    # Offense counts from crime_stats, summed over the dimensions not grouped by.
+    # A filter given several times matches any of its values.
+    group_by = list(dict.fromkeys(group_by))
+    filters = {
+        "pro": pro, "ppo_cpo": ppo_cpo, "mps_cps": mps_cps, "brgy": brgy,
+        "offense": offense, "offense_class": offense_class, "case_status": case_status
+    }
+
+    dimensions = [STAT_DIMENSIONS[name] for name in group_by]
+    total = func.sum(models.Crime_Stat.count)
+    query = select(*[dimension.label(name) for name, dimension in zip(group_by, dimensions)], total.label("count"))
+
+    for name, values in filters.items():
+        if values:
+            query = query.where(STAT_DIMENSIONS[name].in_(values))
+    if date_from:
+        query = query.where(models.Crime_Stat.day >= date_from)
+    if date_to:
+        query = query.where(models.Crime_Stat.day <= date_to)
+
+    query = query.group_by(*dimensions).having(total > 0).order_by(*dimensions)
+
+    rows = (await db.execute(query)).fetchall()
+    return ORJSONResponse([dict(row._mapping) for row in rows])
+
+
+# Rebuild every case_summary row and the case and crime counters, e.g. after editing case tables by hand.
+# Summary rows of archived cases are kept and crime_stats also counts the archive.
+@app.post("/admin/case-summary/rebuild", dependencies=[Depends(require_admin)])
+async def rebuild_case_summary(db: db_dependency):
+    await db.execute(case_summary_upsert())
+    await db.execute(delete(models.Case_Count))
+    await db.execute(case_counts_backfill())
+    await db.execute(delete(models.Crime_Stat))
+    await db.execute(crime_stats_backfill(archived=True))
+    await db.commit()
+    return {"message": "Case summary rebuilt"}
+
+
+# Case table partitions
+
+# Seconds between checks that the coming months have their partitions
+PARTITION_MAINTENANCE_INTERVAL = 24 * 3600
+
+
+async def maintain_partitions():
+    while True:
+        await asyncio.sleep(PARTITION_MAINTENANCE_INTERVAL)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.run_sync(ensure_partitions)
+                await db.commit()
+        except Exception:
+            logger.exception("Failed to create case table partitions")
+
+
+@app.on_event("startup")
+async def start_partition_maintenance():
+    app.state.partition_maintenance = asyncio.create_task(maintain_partitions())
+
+
+@app.on_event("shutdown")
+async def stop_partition_maintenance():
+    app.state.partition_maintenance.cancel()
+
+
+# Move the month partitions before the given month into the *_archive tables.
+# Archived cases stay in case_summary, the counters and crime_stats, and the
+# case endpoints answer 410 for them.
+@app.post("/admin/partitions/archive", dependencies=[Depends(require_admin)])
+async def archive_case_partitions(before: date, db: db_dependency):
+    if before.day != 1:
+        raise HTTPException(status_code=400, detail="before must be the first day of a month")
+    if before > date.today().replace(day=1):
+        raise HTTPException(status_code=400, detail="The current month cannot be archived")
+
+    archived = await db.run_sync(archive_partitions, before)
+    await db.commit()
+    return {"archived": archived}
 
-    # Execute the query
-    result = db.execute(query)
-
-    # Fetch all the rows
-    rows = result.fetchall()
-
-    # Convert the rows to a DataFrame
-    df = pd.DataFrame(rows, columns=[
-        "entry_number",
-        "ppo_cpo",
-        "mps_cps",
-        "offense",
-        "case_status",
-        "date_reported",
-        "time_reported",
-        "date_committed",
-        "time_committed",
-        "victim_details",
-        "suspect_details"
-    ])
-
-    # Drop the time_reported and time_committed columns if not needed
-    df = df.drop(columns=["time_reported", "time_committed"])
-
-    # Rename columns if needed
-    df = df.rename(columns={
-        "entry_number": "Entry Number",
-        "ppo_cpo":"PPO",
-        "mps_cps": "Station",
-        "offense": "Offense",
-        "case_status": "Case Status",
-        "date_reported": "Date Reported",
-        "date_committed": "Date Committed",
-        "victim_details": "Victim Details",
-        "suspect_details": "Suspect Details"
-    })
-
-    # Return the DataFrame as a JSON response
-    return df
 
 @app.get("/check_entry/{entry_number}")
-async def check_entry(entry_number: str, db: Session = Depends(get_db)):
-    result = db.execute(select(models.CaseDetails).where(models.CaseDetails.entry_number == entry_number)).first()
-    if result:
+async def check_entry(entry_number: str, db: AsyncSession = Depends(get_db)):
+    result = (await db.execute(
+        select(models.CaseDetails.id)
+        .where(models.CaseDetails.entry_number == entry_number, *entry_partition_filter(models.CaseDetails, [entry_number]))
+    )).first()
+    if result or await is_archived(db, entry_number):
         return {"exists": True}
     else:
         return {"exists": False}
     
 
 # FastAPI endpoint to get the next entry number based on mps_cps
+# This is only a preview, use /reserve_entry_number to actually take a number
 @app.get("/next_entry_number/{mps_cps}")
-async def get_next_entry_number(mps_cps: str, db: Session = Depends(get_db)):
-    latest_entry = db.query(models.CaseDetails).filter(models.CaseDetails.mps_cps == mps_cps).order_by(models.CaseDetails.date_encoded.desc()).first()
-    if not latest_entry:
-        raise HTTPException(status_code=404, detail="No entries found for this mps_cps")
-    
-    latest_entry_number = int(latest_entry.entry_number.split('-')[-1])
-    next_entry_number = latest_entry_number + 1
-    return {"next_entry_number": next_entry_number}
+async def get_next_entry_number(mps_cps: str, db: AsyncSession = Depends(get_db)):
+    counter = await db.get(models.Entry_Number_Counter, (mps_cps, date.today().strftime('%Y%m')))
+    last_value = counter.last_value if counter else 0
+    return {"next_entry_number": last_value + 1}
 
 
-@app.get('/search_case')
-async def get_cases(entry_number: str, mps_cps: str, db: Session = Depends(get_db)):
-    # Aliases for Victim_Details and Suspect_Details for aggregation
-    victims_alias = aliased(models.Victim_Details)
-    suspects_alias = aliased(models.Suspect_Details)
+# Atomically take the next entry number of a station for the current month
+@app.post("/reserve_entry_number/{mps_cps}")
+async def reserve_entry_number(mps_cps: str, db: db_dependency):
+    seq = (await db.execute(select(models.Station_Sequence.seq).where(models.Station_Sequence.mps_cps == mps_cps).limit(1))).scalar()
+    if seq is None:
+        raise HTTPException(status_code=404, detail="Station sequence not found")
 
-    # Subquery to aggregate victim details
-    victim_subquery = (
-        select(
-            victims_alias.entry_number,
-            func.string_agg(
-                func.concat(
-                    victims_alias.vic_fname, ' ', victims_alias.vic_midname, ' ',
-                    victims_alias.vic_lname, ' ', victims_alias.vic_qlfr, ' ',
-                    victims_alias.vic_alias, ' (', victims_alias.vic_age, '/', victims_alias.vic_gndr, ')'
-                ), '; '
-            ).label('victim_details')
-        )
-        .filter(victims_alias.mps_cps == mps_cps)  # Filtering based on mps_cps
-        .group_by(victims_alias.entry_number)
-        .subquery()
-    )
+    year_month = date.today().strftime('%Y%m')
+    counter = models.Entry_Number_Counter
 
-    # Subquery to aggregate suspect details
-    suspect_subquery = (
-        select(
-            suspects_alias.entry_number,
-            func.string_agg(
-                func.concat(
-                    suspects_alias.sus_fname, ' ', suspects_alias.sus_midname, ' ',
-                    suspects_alias.sus_lname, ' ', suspects_alias.sus_qlfr, ' ',
-                    suspects_alias.sus_alias, ' (', suspects_alias.sus_age, '/', suspects_alias.sus_gndr, ')'
-                ), '; '
-            ).label('suspect_details')
-        )
-        .filter(suspects_alias.mps_cps == mps_cps)  # Filtering based on mps_cps
-        .group_by(suspects_alias.entry_number)
-        .subquery()
+    # The row lock taken by the UPDATE serializes concurrent encoders of the same station
+    result = await db.execute(
+        update(counter)
+        .where(counter.mps_cps == mps_cps, counter.year_month == year_month)
+        .values(last_value=counter.last_value + 1)
+        .returning(counter.last_value)
     )
+    entry_number = result.scalar_one_or_none()
+
+    if entry_number is None:
+        # First reservation of the month, continue after any entry already encoded with this prefix.
+        # The sequence is station data, so any % or _ in it must match literally.
+        encoded_max = (
+            select(func.coalesce(func.max(cast(func.substring(models.CaseDetails.entry_number, r'-(\d+)$'), Integer)), 0))
+            .where(
+                models.CaseDetails.entry_number.like(f"{escape_like(seq)}-{year_month}-%", escape='\\'),
+                models.CaseDetails.date_encoded >= encoded_since_month(date.today().replace(day=1))
+            )
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            pg_insert(counter)
+            .values(mps_cps=mps_cps, year_month=year_month, last_value=encoded_max + 1)
+            .on_conflict_do_update(
+                index_elements=[counter.mps_cps, counter.year_month],
+                set_={"last_value": counter.last_value + 1}
+            )
+            .returning(counter.last_value)
+        )
+        entry_number = result.scalar_one()
+
+    await db.commit()
+
+    return {"entry_number": f"{seq}-{year_month}-{entry_number}", "next_entry_number": entry_number}
+
 
-    # Main query to select case details and join with victim and suspect details
+@app.get('/search_case')
+async def get_cases(
+    mps_cps: str,
+    q: Optional[str] = None,
+    entry_number: Optional[str] = None,
+    limit: int = Query(SEARCH_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+    db: AsyncSession = Depends(get_db)
+):
+    # q matches entry numbers, victim names and suspect names; entry_number is
+    # still accepted as the search term for older clients
+    term = (q or entry_number or "").strip()
+    if not term:
+        raise HTTPException(status_code=400, detail="Provide a search term")
+
+    # The ILIKE filters are served by the trigram indexes on case_summary,
+    # the best similarity across the three fields ranks the matches
+    pattern = like_pattern(term)
+    rank = func.greatest(
+        func.similarity(models.Case_Summary.entry_number, term),
+        func.word_similarity(term, models.Case_Summary.victim_details),
+        func.word_similarity(term, models.Case_Summary.suspect_details)
+    )
     query = (
-        select(
-            models.CaseDetails.entry_number,
-            models.CaseDetails.mps_cps,
-            models.CaseDetails.offense,
-            models.CaseDetails.case_status,
-            models.CaseDetails.date_reported,
-            models.CaseDetails.time_reported,
-            models.CaseDetails.date_committed,
-            models.CaseDetails.time_committed,
-            models.CaseDetails.date_encoded,
-            victim_subquery.c.victim_details,
-            suspect_subquery.c.suspect_details
+        select(models.Case_Summary)
+        .where(
+            models.Case_Summary.mps_cps == mps_cps,
+            or_(
+                models.Case_Summary.entry_number.ilike(pattern, escape='\\'),
+                models.Case_Summary.victim_details.ilike(pattern, escape='\\'),
+                models.Case_Summary.suspect_details.ilike(pattern, escape='\\')
+            )
         )
-        .outerjoin(victim_subquery, models.CaseDetails.entry_number == victim_subquery.c.entry_number)
-        .outerjoin(suspect_subquery, models.CaseDetails.entry_number == suspect_subquery.c.entry_number)
-        .filter(models.CaseDetails.entry_number.like(f"%{entry_number}%"), models.CaseDetails.mps_cps == mps_cps)  # Filtering based on entry_number and mps_cps
-        .order_by(models.CaseDetails.date_encoded.desc())
+        .order_by(rank.desc(), models.Case_Summary.date_encoded.desc())
+        .limit(limit)
     )
 
     # Execute the query
-    result = db.execute(query)
-    cases = result.fetchall()
+    result = await db.execute(query)
+    cases = result.scalars().all()
 
     if not cases:
         raise HTTPException(status_code=404, detail="Cases not found")
@@ -793,66 +1263,165 @@ async def get_cases(entry_number: str, mps_cps: str, db: Session = Depends(get_d
     return cases_list
 
 
+@app.get('/search_narrative')
+async def search_narrative(
+    q: str,
+    mps_cps: Optional[str] = None,
+    ppo_cpo: Optional[str] = None,
+    pro: Optional[str] = None,
+    limit: int = Query(SEARCH_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+    db: AsyncSession = Depends(get_db)
+):
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Provide a search term")
+    scope_filter = case_scope_filter(mps_cps, ppo_cpo, pro, model=models.CaseDetails)
+
+    # websearch_to_tsquery accepts what users type: quoted phrases, "or" and -word
+    ts_query = func.websearch_to_tsquery('english', q)
+
+    # Rank and limit on the GIN-indexed tsvector first, so the headlines are
+    # only built for the rows that are returned
+    matches = (
+        select(
+            models.CaseDetails.entry_number,
+            models.CaseDetails.mps_cps,
+            models.CaseDetails.offense,
+            models.CaseDetails.case_status,
+            models.CaseDetails.date_encoded,
+            models.CaseDetails.narrative,
+            func.ts_rank_cd(models.CaseDetails.narrative_tsv, ts_query).label("rank")
+        )
+        .where(scope_filter, models.CaseDetails.narrative_tsv.op('@@')(ts_query))
+        .order_by(func.ts_rank_cd(models.CaseDetails.narrative_tsv, ts_query).desc(), models.CaseDetails.date_encoded.desc())
+        .limit(limit)
+        .subquery()
+    )
+    query = (
+        select(
+            matches.c.entry_number,
+            matches.c.mps_cps,
+            matches.c.offense,
+            matches.c.case_status,
+            matches.c.date_encoded,
+            matches.c.rank,
+            func.ts_headline('english', matches.c.narrative, ts_query, NARRATIVE_HEADLINE_OPTIONS).label("headline")
+        )
+        .order_by(matches.c.rank.desc(), matches.c.date_encoded.desc())
+    )
+
+    result = await db.execute(query)
+    return [dict(row._mapping) for row in result.fetchall()]
+
+
+# Counts are of cases, one per entry number however many offenses it has,
+# read from case_counts. Until the counters were added these endpoints counted
+# case_details rows, i.e. one per offense, so multi-offense cases now count once.
 @app.get('/count_cases_encoded')
-async def get_cases_count(mps_cps: str, db: Session = Depends(get_db)):
-    count = db.query(models.CaseDetails).filter(models.CaseDetails.mps_cps == mps_cps).count()
-    return {"count": count}
+async def get_cases_count(mps_cps: str, db: AsyncSession = Depends(get_db)):
+    return await count_cases(db, models.Case_Count.mps_cps == mps_cps)
 
 @app.get('/count_cases_encoded-ppo')
-async def get_cases_count_ppo(ppo_cpo: str, db: Session = Depends(get_db)):
-    count = db.query(models.CaseDetails).filter(models.CaseDetails.ppo_cpo == ppo_cpo).count()
-    return {"count": count}
+async def get_cases_count_ppo(ppo_cpo: str, db: AsyncSession = Depends(get_db)):
+    return await count_cases(db, models.Case_Count.ppo_cpo == ppo_cpo)
 
 @app.get('/count_cases_encoded-pro')
-async def get_cases_count_ppo(pro: str, db: Session = Depends(get_db)):
-    count = db.query(models.CaseDetails).filter(models.CaseDetails.pro == pro).count()
-    return {"count": count}
+async def get_cases_count_ppo(pro: str, db: AsyncSession = Depends(get_db)):
+    return await count_cases(db, models.Case_Count.pro == pro)
 
 
 # Get Details for Editing Entries
 
 @app.get('/get_victim_details')
-async def get_victim_details(entry_number: str, db: Session = Depends(get_db)):
-    cases = db.query(models.Victim_Details).filter(models.Victim_Details.entry_number == entry_number).all()
+async def get_victim_details(entry_number: str, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(models.Victim_Details).where(models.Victim_Details.entry_number == entry_number, *entry_partition_filter(models.Victim_Details, [entry_number])))
+    cases = result.scalars().all()
     if not cases:
-        raise HTTPException(status_code=404, detail="Cases not found")
+        await raise_not_found(db, entry_number, "Cases not found")
     return cases
 
 @app.get('/get_suspect_details')
-async def get_suspect_details(entry_number: str, db: Session = Depends(get_db)):
-    cases = db.query(models.Suspect_Details).filter(models.Suspect_Details.entry_number == entry_number).all()
+async def get_suspect_details(entry_number: str, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(models.Suspect_Details).where(models.Suspect_Details.entry_number == entry_number, *entry_partition_filter(models.Suspect_Details, [entry_number])))
+    cases = result.scalars().all()
     if not cases:
-        raise HTTPException(status_code=404, detail="Cases not found")
+        await raise_not_found(db, entry_number, "Cases not found")
     return cases
 
 @app.get('/get_case_details')
-async def get_case_details(entry_number: str, db: Session = Depends(get_db)):
-    cases = db.query(models.CaseDetails).filter(models.CaseDetails.entry_number == entry_number).all()
+async def get_case_details(entry_number: str, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(models.CaseDetails).where(models.CaseDetails.entry_number == entry_number, *entry_partition_filter(models.CaseDetails, [entry_number])))
+    cases = result.scalars().all()
     if not cases:
-        raise HTTPException(status_code=404, detail="Cases not found")
+        await raise_not_found(db, entry_number, "Cases not found")
     return cases
 
+# Everything the edit form needs about a case, with one query per table
+@app.get('/cases/{entry_number}/bundle')
+async def get_case_bundle(entry_number: str, db: db_dependency):
+    cases = (await db.execute(
+        select(models.CaseDetails)
+        .where(models.CaseDetails.entry_number == entry_number, *entry_partition_filter(models.CaseDetails, [entry_number]))
+        .order_by(models.CaseDetails.date_encoded.desc())
+    )).scalars().all()
+    if not cases:
+        await raise_not_found(db, entry_number, "Case not found")
+
+    victims = (await db.execute(
+        select(models.Victim_Details)
+        .where(models.Victim_Details.case_no == cases[0].case_no, *entry_partition_filter(models.Victim_Details, [entry_number]))
+        .order_by(models.Victim_Details.date_encoded, models.Victim_Details.id)
+    )).scalars().all()
+
+    suspects = (await db.execute(
+        select(models.Suspect_Details)
+        .where(models.Suspect_Details.case_no == cases[0].case_no, *entry_partition_filter(models.Suspect_Details, [entry_number]))
+        .order_by(models.Suspect_Details.date_encoded, models.Suspect_Details.id)
+    )).scalars().all()
+
+    return {
+        "case": cases[0],
+        # Every case_details row of the entry number carries one offense
+        "offenses": [
+            {
+                "id": case.id,
+                "offense": case.offense,
+                "offense_class": case.offense_class,
+                "case_status": case.case_status,
+                "check": case.check
+            }
+            for case in cases
+        ],
+        "victims": victims,
+        "suspects": suspects
+    }
+
 
 # Endpoint to store a new temp entry
 @app.post("/temp-edit-entries/", response_model=TempEntryEditResponse)
-async def create_edit_temp_entry(entry: TempEntryEdit, db: Session = Depends(get_db)):
-    db_entry = models.TempEditEntry(entry_number=entry.entry_number)
+async def create_edit_temp_entry(entry: TempEntryEdit, db: AsyncSession = Depends(get_db)):
+    db_entry = models.TempEditEntry(entry_number=entry.entry_number, owner=entry.owner, expires_at=temp_entry_expiry())
     db.add(db_entry)
-    db.commit()
-    db.refresh(db_entry)
+    await db.commit()
+    await db.refresh(db_entry)
     return db_entry
 
+# Endpoint to get one temp entry for editing of an encoder
+@app.get("/temp-edit-entries/{entry_id}", response_model=TempEntryEditResponse)
+async def get_edit_temp_entry(entry_id: int, owner: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    return await get_live_temp_entry(db, models.TempEditEntry, entry_id, owner)
+
 # Endpoint to delete a temp entry
 @app.delete("/temp-edit-entries/{entry_id}", response_model=TempEntryEditResponse)
-async def delete_edit_temp_entry(entry_id: int, db: Session = Depends(get_db)):
-    db_entry = db.query(models.TempEditEntry).filter(models.TempEditEntry.id == entry_id).first()
+async def delete_edit_temp_entry(entry_id: int, db: AsyncSession = Depends(get_db)):
+    db_entry = await db.get(models.TempEditEntry, entry_id)
     if db_entry is None:
         raise HTTPException(status_code=404, detail="Entry not found")
-    db.delete(db_entry)
-    db.commit()
+    await db.delete(db_entry)
+    await db.commit()
     return db_entry
 
 # Endpoint to get all temp entries (optional, for debugging)
 @app.get("/temp-edit-entries/", response_model=List[TempEntryEditResponse])
-async def get__edit_temp_entries(db: Session = Depends(get_db)):
-    return db.query(models.TempEditEntry).all()
\ No newline at end of file
+async def get__edit_temp_entries(db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(models.TempEditEntry))
+    return result.scalars().all()
\ No newline at end of file
@@ -0,0 +1,229 @@
+import threading
+from urllib.parse import quote
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import streamlit as st
+from config.database import api_endpoint
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (5, 30)
+
+# Failed idempotent calls are retried this many times, waiting backoff * 2**n seconds in between
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+
+# Connections kept open to the API, shared by all sessions of this Streamlit server
+DEFAULT_POOL_SIZE = 20
+
+# POST is left out: creating cases, entries and reservations must not be sent twice.
+# A PATCH sets fields to given values, so sending it again changes nothing.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "PATCH", "DELETE"})
+RETRY_STATUSES = (502, 503, 504)
+
+
+def row_params(row_id):
+    return {"id": row_id} if row_id is not None else None
+
+
+def page_params(scope, cursor, layout):
+    # Query parameters of one page of a case list; the first page has no cursor
+    params = {**scope, "layout": layout}
+    if cursor:
+        params["cursor"] = cursor
+    return params
+
+
+def bearer(session_token):
+    # Authorization header for the endpoints that act for the signed-in user
+    return {"Authorization": f"Bearer {session_token}"}
+
+
+# Client for the FastAPI backend over one keep-alive connection pool
+class ApiClient:
+    def __init__(self, base_url, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, pool_size=DEFAULT_POOL_SIZE):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=IDEMPOTENT_METHODS,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Last response of each revalidated GET, keyed by its URL
+        self._etag_cache = {}
+        self._etag_lock = threading.Lock()
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}{path}"
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, self.url(path), **kwargs)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path: str, **kwargs) -> requests.Response:
+        return self.request("PUT", path, **kwargs)
+
+    def patch(self, path: str, **kwargs) -> requests.Response:
+        return self.request("PATCH", path, **kwargs)
+
+    def delete(self, path: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", path, **kwargs)
+
+    def get_revalidated(self, path: str, **kwargs) -> requests.Response:
+        # Sends the ETag of the last response and reuses it when the API answers 304
+        key = requests.Request("GET", self.url(path), params=kwargs.get("params")).prepare().url
+        with self._etag_lock:
+            cached = self._etag_cache.get(key)
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if cached is not None:
+            headers["If-None-Match"] = cached.headers["ETag"]
+        response = self.get(path, headers=headers, **kwargs)
+
+        if response.status_code == 304 and cached is not None:
+            return cached
+        if response.status_code == 200 and "ETag" in response.headers:
+            with self._etag_lock:
+                self._etag_cache[key] = response
+        return response
+
+    # ---- Users and stations
+    def login(self, username: str, password: str) -> requests.Response:
+        return self.post("/login/", json={"username": username, "password": password})
+
+    def station(self, mps_cps: str) -> requests.Response:
+        return self.get(f"/stations/{mps_cps}")
+
+    def reserve_entry_number(self, mps_cps: str) -> requests.Response:
+        return self.post(f"/reserve_entry_number/{mps_cps}")
+
+    # ---- Reference data
+    def brgy_city_mun(self, mps_cps: str) -> requests.Response:
+        return self.get_revalidated(f"/brgy-city-mun/{mps_cps}")
+
+    def offense_classifications(self) -> requests.Response:
+        return self.get_revalidated("/offense_classifications")
+
+    # ---- Temp entries
+    def create_temp_entry(self, combined_value: str, owner: str) -> requests.Response:
+        return self.post("/temp-entries/", json={"combined_value": combined_value, "owner": owner})
+
+    def temp_entry(self, entry_id: int, owner: str) -> requests.Response:
+        return self.get(f"/temp-entries/{entry_id}", params={"owner": owner})
+
+    def delete_temp_entry(self, entry_id: int) -> requests.Response:
+        return self.delete(f"/temp-entries/{entry_id}")
+
+    def create_temp_edit_entry(self, entry_number: str, owner: str) -> requests.Response:
+        return self.post("/temp-edit-entries/", json={"entry_number": entry_number, "owner": owner})
+
+    def temp_edit_entry(self, entry_id: int, owner: str) -> requests.Response:
+        return self.get(f"/temp-edit-entries/{entry_id}", params={"owner": owner})
+
+    def delete_temp_edit_entry(self, entry_id: int) -> requests.Response:
+        return self.delete(f"/temp-edit-entries/{entry_id}")
+
+    # ---- Cases
+    def submit_case(self, case: dict, victims: list, suspects: list) -> requests.Response:
+        return self.post("/cases/submit", json={"case": case, "victims": victims, "suspects": suspects})
+
+    def create_case_details(self, case: dict) -> requests.Response:
+        return self.post("/case-details/", json=case)
+
+    def create_victim(self, victim: dict) -> requests.Response:
+        return self.post("/victim-new-entry/", json=victim)
+
+    def create_suspect(self, suspect: dict) -> requests.Response:
+        return self.post("/suspect-new-entry/", json=suspect)
+
+    # The patch calls send only the changed fields; row_id limits the change to one row of the entry
+    def patch_case_details(self, entry_number: str, changes: dict, row_id: str = None) -> requests.Response:
+        return self.patch(f"/case-details/{quote(entry_number, safe='')}", json=changes, params=row_params(row_id))
+
+    def patch_victim(self, entry_number: str, changes: dict, row_id: str = None) -> requests.Response:
+        return self.patch(f"/victim-details/{quote(entry_number, safe='')}", json=changes, params=row_params(row_id))
+
+    def patch_suspect(self, entry_number: str, changes: dict, row_id: str = None) -> requests.Response:
+        return self.patch(f"/suspect-details/{quote(entry_number, safe='')}", json=changes, params=row_params(row_id))
+
+    def case_bundle(self, entry_number: str) -> requests.Response:
+        return self.get(f"/cases/{quote(entry_number, safe='')}/bundle")
+
+    def case_details(self, entry_number: str) -> requests.Response:
+        return self.get("/get_case_details", params={"entry_number": entry_number})
+
+    def victim_details(self, entry_number: str) -> requests.Response:
+        return self.get("/get_victim_details", params={"entry_number": entry_number})
+
+    def suspect_details(self, entry_number: str) -> requests.Response:
+        return self.get("/get_suspect_details", params={"entry_number": entry_number})
+
+    # ---- Case lists, counts and search
+    def cases(self, mps_cps: str, cursor: str = None, layout: str = "records") -> requests.Response:
+        return self.get("/cases", params=page_params({"mps_cps": mps_cps}, cursor, layout))
+
+    def cases_ppo(self, ppo_cpo: str, cursor: str = None, layout: str = "records") -> requests.Response:
+        return self.get("/cases-ppo", params=page_params({"ppo_cpo": ppo_cpo}, cursor, layout))
+
+    def cases_pro(self, pro: str, cursor: str = None, layout: str = "records") -> requests.Response:
+        return self.get("/cases-pro", params=page_params({"pro": pro}, cursor, layout))
+
+    def count_cases_encoded(self, mps_cps: str) -> requests.Response:
+        return self.get("/count_cases_encoded", params={"mps_cps": mps_cps})
+
+    def count_cases_encoded_ppo(self, ppo_cpo: str) -> requests.Response:
+        return self.get("/count_cases_encoded-ppo", params={"ppo_cpo": ppo_cpo})
+
+    def count_cases_encoded_pro(self, pro: str) -> requests.Response:
+        return self.get("/count_cases_encoded-pro", params={"pro": pro})
+
+    def search_cases(self, q: str, mps_cps: str) -> requests.Response:
+        return self.get("/search_case", params={"q": q, "mps_cps": mps_cps})
+
+    def search_narratives(self, q: str, scope_params: dict) -> requests.Response:
+        return self.get("/search_narrative", params={"q": q, **scope_params})
+
+    # ---- Crime statistics
+    def stats(self, params: dict) -> requests.Response:
+        # List values are sent as repeated parameters, e.g. several group_by dimensions
+        return self.get("/stats", params=params)
+
+    # ---- Reports
+    # Reports belong to the user of the session token
+    def create_report(self, report: dict, session_token: str) -> requests.Response:
+        return self.post("/reports", json=report, headers=bearer(session_token))
+
+    def report_jobs(self, session_token: str) -> requests.Response:
+        return self.get("/reports", headers=bearer(session_token))
+
+    def report_download_url(self, job_id: str, download_token: str) -> str:
+        return self.url(f"/reports/{job_id}/download?token={quote(download_token, safe='')}")
+
+
+@st.cache_resource
+def get_api_client() -> ApiClient:
+    # One client per Streamlit server so every session and rerun reuses the pooled connections.
+    # Timeouts and retries can be overridden in the [api_client] section of the secrets.
+    settings = st.secrets.get("api_client", {})
+    return ApiClient(
+        api_endpoint,
+        timeout=(settings.get("connect_timeout", DEFAULT_TIMEOUT[0]), settings.get("read_timeout", DEFAULT_TIMEOUT[1])),
+        retries=settings.get("retries", DEFAULT_RETRIES),
+        backoff=settings.get("backoff", DEFAULT_BACKOFF),
+        pool_size=settings.get("pool_size", DEFAULT_POOL_SIZE)
+    )
@@ -1,38 +1,82 @@
-import requests
-from fastapi import HTTPException
+from datetime import datetime, timedelta
 import streamlit as st
-import streamlit_authenticator as stauth
-from config.database import api_endpoint
-
-
-@st.cache_data(ttl="60m")
-def fetch_users():
-    response = requests.get(f"{api_endpoint}/users/")
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail="Failed to fetch users")
-    return response.json()
-
-def prepare_credentials(users_data):
-    credentials = {
-        "usernames": {
-            user['username']: {
-                "name": user['username'],
-                "password": user['password'],
-                "pro":user.get('pro',''),
-                "mps_cps": user.get('mps_cps', ''),  # Include mps_cps, defaulting to an empty string if not present
-                "ppo_cpo": user.get('ppo_cpo', ''),   # Include ppo_cpo, defaulting to an empty string if not present
-                "role": user.get('role','')
-            }
-            for user in users_data
-        }
-    }
-    return credentials
-
-def initialize_authenticator(credentials):
-    authenticator = stauth.Authenticate(
-        credentials,
-        "my_app",
-        "auth_cookie_name",
-        cookie_expiry_days=30
-    )
-    return authenticator
+import extra_streamlit_components as stx
+from config.session_token import verify_session_token, SESSION_TOKEN_DAYS
+from modules.api_client import get_api_client
+
+# Browser cookie that keeps the session token across page reloads
+COOKIE_NAME = "auth_cookie_name"
+
+# Session state that survives reset_session_state
+AUTH_STATE_KEYS = ("authentication_status", "name", "user_info", "session_token", "logged_out")
+
+
+def set_logged_in(token, claims):
+    st.session_state["session_token"] = token
+    st.session_state["user_info"] = claims
+    st.session_state["name"] = claims["sub"]
+    st.session_state["authentication_status"] = True
+
+
+def get_current_user():
+    # Claims of the signed-in user, checked locally against the token signature
+    return verify_session_token(st.session_state.get("session_token"))
+
+
+def login(form_name):
+    # Sets authentication_status to True once a valid token is held, False
+    # after rejected credentials, and None while nobody has logged in
+    cookie_manager = stx.CookieManager(key="auth_cookie_manager")
+
+    # After a logout the cookie is removed and ignored until the next login
+    cookie_token = cookie_manager.get(COOKIE_NAME)
+    if st.session_state.get("logged_out") and cookie_token:
+        cookie_manager.delete(COOKIE_NAME)
+        cookie_token = None
+
+    for token in (st.session_state.get("session_token"), cookie_token):
+        claims = verify_session_token(token)
+        if claims:
+            set_logged_in(token, claims)
+            return claims
+
+    # No valid token, e.g. an expired one, leaves nobody logged in
+    if st.session_state.get("authentication_status") is not False:
+        st.session_state["authentication_status"] = None
+
+    login_placeholder = st.empty()
+    with login_placeholder.form("login_form"):
+        st.subheader(form_name)
+        username = st.text_input("Username")
+        password = st.text_input("Password", type="password")
+        submitted = st.form_submit_button("Login")
+
+    if submitted:
+        response = get_api_client().login(username, password)
+        if response.status_code == 200:
+            token = response.json()["token"]
+            claims = verify_session_token(token)
+            if claims:
+                set_logged_in(token, claims)
+                st.session_state.pop("logged_out", None)
+                login_placeholder.empty()
+                cookie_manager.set(COOKIE_NAME, token, expires_at=datetime.now() + timedelta(days=SESSION_TOKEN_DAYS))
+                return claims
+        st.session_state["authentication_status"] = False
+    return None
+
+
+def logout(button_name="Logout"):
+    if st.button(button_name):
+        for key in AUTH_STATE_KEYS:
+            st.session_state.pop(key, None)
+        st.session_state["authentication_status"] = None
+        st.session_state["logged_out"] = True
+        st.rerun()
+
+
+def reset_session_state():
+    # Clears the page state but keeps the user logged in
+    kept = {key: st.session_state[key] for key in AUTH_STATE_KEYS if key in st.session_state}
+    st.session_state.clear()
+    st.session_state.update(kept)
@@ -0,0 +1,56 @@
+import streamlit as st
+import pandas as pd
+from datetime import date
+from modules.api_client import get_api_client
+
+# Dimensions the statistics can be broken down by, as labelled in the dashboard
+STAT_DIMENSION_LABELS = {
+    "ppo_cpo": "PPO",
+    "mps_cps": "Station",
+    "brgy": "Barangay",
+    "offense_class": "Offense Classification",
+    "offense": "Offense",
+    "case_status": "Case Status",
+    "year": "Year",
+    "month": "Month",
+    "day": "Day"
+}
+
+
+def display_crime_stats(scope_params: dict):
+    # Offense counts of the user's scope, read from the pre-aggregated statistics
+    col1, col2 = st.columns(2)
+    date_from = col1.date_input("From (Date Reported)", value=date(date.today().year, 1, 1), key="stats_date_from")
+    date_to = col2.date_input("To (Date Reported)", value=date.today(), key="stats_date_to")
+    group_by = st.multiselect(
+        "Break down by",
+        list(STAT_DIMENSION_LABELS),
+        default=["offense_class", "case_status"],
+        format_func=STAT_DIMENSION_LABELS.get,
+        key="stats_group_by"
+    )
+
+    response = get_api_client().stats({
+        **scope_params,
+        "group_by": group_by,
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat()
+    })
+    if response.status_code != 200:
+        st.error(f"Failed to fetch crime statistics: Received status code {response.status_code}")
+        return
+
+    df = pd.DataFrame(response.json(), columns=group_by + ["count"])
+    st.subheader(f"Total Offenses: :red[{int(df['count'].sum())}]")
+    if not group_by or df.empty:
+        return
+
+    df = df.rename(columns={**STAT_DIMENSION_LABELS, "count": "Offenses"})
+    st.dataframe(df, use_container_width=True, hide_index=True)
+
+    # One bar per value of the first dimension, stacked by the second
+    labels = [STAT_DIMENSION_LABELS[name] for name in group_by]
+    if len(labels) == 1:
+        st.bar_chart(df, x=labels[0], y="Offenses")
+    else:
+        st.bar_chart(df, x=labels[0], y="Offenses", color=labels[1])
@@ -102,6 +102,7 @@ class Case_Detail_Validation(BaseModel):
     time_reported: Optional[time]
     dt_committed: Optional[date]
     time_committed: Optional[time]
+    brgy: Optional[str] = None
 
     @field_validator('dt_reported')
     def check_dt_reported(cls, value):
@@ -184,4 +185,40 @@ class New_Entry_SuspectData_Validation(BaseModel):
     sus_distprov: Optional[str] = Field(None, description="District/Province is required")
     sus_cityMun: Optional[str] = Field(None, description="City/Municipality is required")
     sus_brgy: Optional[str] = Field(None, description="Barangay is required")
-    sus_strName: Optional[str] = None
\ No newline at end of file
+    sus_strName: Optional[str] = None
+
+
+# Partial updates: every field is optional and only the ones sent are written
+class Patch_VictimData_Validation(BaseModel):
+    pro: Optional[str] = None
+    ppo_cpo: Optional[str] = None
+    mps_cps: Optional[str] = None
+    vic_fname: Optional[str] = Field(None, min_length=1, description="First name is required")
+    vic_midname: Optional[str] = None
+    vic_lname: Optional[str] = Field(None, min_length=1, description="Last name is required")
+    vic_qlfr: Optional[str] = None
+    vic_alias: Optional[str] = None
+    vic_gndr: Optional[str] = None
+    vic_age: Optional[int] = Field(None, ge=0, description="Age must be a non-negative integer")
+    vic_distprov: Optional[str] = None
+    vic_cityMun: Optional[str] = None
+    vic_brgy: Optional[str] = None
+    vic_strName: Optional[str] = None
+
+
+class Patch_SuspectData_Validation(BaseModel):
+    pro: Optional[str] = None
+    ppo_cpo: Optional[str] = None
+    mps_cps: Optional[str] = None
+    # Unknown names are sent as "Unidentified", as SuspectData_Validation does, never blank
+    sus_fname: Optional[str] = Field(None, min_length=1, description="First name must not be blank")
+    sus_midname: Optional[str] = Field(None, min_length=1, description="Middle name must not be blank")
+    sus_lname: Optional[str] = Field(None, min_length=1, description="Last name must not be blank")
+    sus_qlfr: Optional[str] = None
+    sus_alias: Optional[str] = None
+    sus_gndr: Optional[str] = None
+    sus_age: Optional[int] = Field(None, ge=0, description="Age must be a non-negative integer")
+    sus_distprov: Optional[str] = None
+    sus_cityMun: Optional[str] = None
+    sus_brgy: Optional[str] = None
+    sus_strName: Optional[str] = None
@@ -2,16 +2,72 @@ import requests
 import json
 import pandas as pd
 import streamlit as st
-from config.database import api_endpoint
+from urllib.parse import urlencode
+from modules.api_client import get_api_client
+
+def fetch_case_page(fetch_page, scope: str, cursor: str = None):
+    # Pages come in the columnar layout, one array per column, so they load
+    # into a DataFrame without building a dict per row
+    response = fetch_page(scope, cursor=cursor, layout="columnar")
+
+    if response.status_code != 200:
+        st.error(f"Failed to fetch case data: Received status code {response.status_code}")
+        print(f"Error: Received status code {response.status_code}")
+        print(response.text)
+        return None
+
+    try:
+        return response.json()
+    except json.JSONDecodeError:
+        st.error("Error decoding JSON from response")
+        return None
+
+def display_case_pages(fetch_page, scope: str):
+    # fetch_page is the ApiClient method of the list, e.g. cases_ppo, and scope its station, PPO or PRO.
+    # Pages already loaded are kept in the session so "Load More" only fetches the next one
+    state_key = f"case_pages_{fetch_page.__name__}_{scope}"
+
+    if state_key not in st.session_state:
+        with st.spinner("Fetching case data..."):
+            page = fetch_case_page(fetch_page, scope)
+        if page is None:
+            return
+        st.session_state[state_key] = {"columns": page["columns"], "next_cursor": page["next_cursor"]}
+
+    pages = st.session_state[state_key]
+    df = pd.DataFrame(pages["columns"])
+    st.dataframe(df)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if pages["next_cursor"] and st.button("Load More", use_container_width=True, key=f"{state_key}_more"):
+            with st.spinner("Fetching case data..."):
+                page = fetch_case_page(fetch_page, scope, pages["next_cursor"])
+            if page is not None:
+                for label, values in page["columns"].items():
+                    pages["columns"][label].extend(values)
+                pages["next_cursor"] = page["next_cursor"]
+                st.rerun()
+    with col2:
+        if st.button("Refresh", use_container_width=True, key=f"{state_key}_refresh"):
+            del st.session_state[state_key]
+            st.rerun()
+
+def export_case_links(params: dict):
+    # The export is streamed straight from the API to the browser, it never passes through Streamlit
+    api_client = get_api_client()
+    col1, col2 = st.columns(2)
+    col1.link_button("Export CSV", f"{api_client.url('/cases/export')}?{urlencode({**params, 'format': 'csv'})}", use_container_width=True)
+    col2.link_button("Export NDJSON", f"{api_client.url('/cases/export')}?{urlencode({**params, 'format': 'ndjson'})}", use_container_width=True)
 
 def encoded_data_mps(mps_cps: str):
-    if not mps_cps or not api_endpoint:
-        st.error("Both MPS/CPS value and API endpoint must be provided")
+    if not mps_cps:
+        st.error("MPS/CPS value must be provided")
         return
     
     try:
         with st.spinner("Fetching case count..."):
-            response = requests.get(f"{api_endpoint}/count_cases_encoded", params={"mps_cps": mps_cps})
+            response = get_api_client().count_cases_encoded(mps_cps)
 
             if response.status_code == 200:
                 try:
@@ -25,34 +81,20 @@ def encoded_data_mps(mps_cps: str):
 
         st.subheader(f"Total Number of Cases Encoded: :red[{offense_count}]")
 
-        with st.spinner("Fetching case data..."):
-            response = requests.get(f"{api_endpoint}/cases", params={"mps_cps": mps_cps})
-
-            if response.status_code == 200:
-                try:
-                    data = response.json()
-                except json.JSONDecodeError:
-                    st.error("Error decoding JSON from response")
-                    return
-
-                df = pd.DataFrame(data)
-                st.dataframe(df)
-            else:
-                st.error(f"Failed to fetch case data: Received status code {response.status_code}")
-                print(f"Error: Received status code {response.status_code}")
-                print(response.text)
+        display_case_pages(get_api_client().cases, mps_cps)
+        export_case_links({"mps_cps": mps_cps})
     except requests.RequestException as e:
         st.error(f"Request failed: {e}")
         print(f"Request failed: {e}")
 
 def encoded_data_ppo(ppo_cpo: str):
-    if not ppo_cpo or not api_endpoint:
-        st.error("Both MPS/CPS value and API endpoint must be provided")
+    if not ppo_cpo:
+        st.error("PPO/CPO value must be provided")
         return
     
     try:
         with st.spinner("Fetching case count..."):
-            response = requests.get(f"{api_endpoint}/count_cases_encoded-ppo", params={"ppo_cpo": ppo_cpo})
+            response = get_api_client().count_cases_encoded_ppo(ppo_cpo)
 
             if response.status_code == 200:
                 try:
@@ -66,35 +108,21 @@ def encoded_data_ppo(ppo_cpo: str):
 
         st.subheader(f"Total Number of Cases Encoded: :red[{offense_count}]")
 
-        with st.spinner("Fetching case data..."):
-            response = requests.get(f"{api_endpoint}/cases-ppo", params={"ppo_cpo": ppo_cpo})
-
-            if response.status_code == 200:
-                try:
-                    data = response.json()
-                except json.JSONDecodeError:
-                    st.error("Error decoding JSON from response")
-                    return
-
-                df = pd.DataFrame(data)
-                st.dataframe(df)
-            else:
-                st.error(f"Failed to fetch case data: Received status code {response.status_code}")
-                print(f"Error: Received status code {response.status_code}")
-                print(response.text)
+        display_case_pages(get_api_client().cases_ppo, ppo_cpo)
+        export_case_links({"ppo_cpo": ppo_cpo})
     except requests.RequestException as e:
         st.error(f"Request failed: {e}")
         print(f"Request failed: {e}")
 
 
 def encoded_data_pro(pro: str):
-    if not pro or not api_endpoint:
-        st.error("Both MPS/CPS value and API endpoint must be provided")
+    if not pro:
+        st.error("PRO value must be provided")
         return
     
     try:
         with st.spinner("Fetching case count..."):
-            response = requests.get(f"{api_endpoint}/count_cases_encoded-pro", params={"pro": pro})
+            response = get_api_client().count_cases_encoded_pro(pro)
 
             if response.status_code == 200:
                 try:
@@ -108,22 +136,8 @@ def encoded_data_pro(pro: str):
 
         st.subheader(f"Total Number of Cases Encoded: :red[{offense_count}]")
 
-        with st.spinner("Fetching case data..."):
-            response = requests.get(f"{api_endpoint}/cases-pro", params={"pro": pro})
-
-            if response.status_code == 200:
-                try:
-                    data = response.json()
-                except json.JSONDecodeError:
-                    st.error("Error decoding JSON from response")
-                    return
-
-                df = pd.DataFrame(data)
-                st.dataframe(df)
-            else:
-                st.error(f"Failed to fetch case data: Received status code {response.status_code}")
-                print(f"Error: Received status code {response.status_code}")
-                print(response.text)
+        display_case_pages(get_api_client().cases_pro, pro)
+        export_case_links({"pro": pro})
     except requests.RequestException as e:
         st.error(f"Request failed: {e}")
         print(f"Request failed: {e}")
@@ -1,83 +1,96 @@
 import streamlit as st
-from config.database import api_endpoint
-import requests
+from modules.api_client import get_api_client
 import json
 
 
-def get_victim_data(entry_number):
-    response = requests.get(f"{api_endpoint}/get_victim_details", params={"entry_number": entry_number})
-    if response.status_code == 200:
-        data = response.json()
-        if data and isinstance(data, list):
-            victim = data[0]
-            
-            victim_data = {
-                "id": victim.get("id"),
-                "pro": victim.get("pro"),
-                "mps_cps": victim.get("mps_cps"),
-                "vic_midname": victim.get("vic_midname"),
-                "vic_qlfr": victim.get("vic_qlfr"),
-                "vic_gndr": victim.get("vic_gndr"),
-                "vic_distprov": victim.get("vic_distprov"),
-                "vic_brgy": victim.get("vic_brgy"),
-                "date_encoded": victim.get("date_encoded"),
-                "entry_number": victim.get("entry_number"),
-                "ppo_cpo": victim.get("ppo_cpo"),
-                "vic_fname": victim.get("vic_fname"),
-                "vic_lname": victim.get("vic_lname"),
-                "vic_alias": victim.get("vic_alias"),
-                "vic_age": victim.get("vic_age"),
-                "vic_cityMun": victim.get("vic_cityMun"),
-                "vic_strName": victim.get("vic_strName")
-            }
-            
-            return victim_data
+def get_case_bundle(entry_number):
+    # The case, offenses, victims and suspects come in one request and are kept
+    # in the session for as long as the entry is being edited
+    bundles = st.session_state.setdefault("case_bundles", {})
+    if entry_number not in bundles:
+        response = get_api_client().case_bundle(entry_number)
+        if response.status_code == 410:
+            st.warning(response.json()["detail"])
+            return None
+        if response.status_code != 200:
+            print(f"Failed to retrieve data, status code: {response.status_code}")
+            return None
+        bundles[entry_number] = response.json()
+    return bundles[entry_number]
+
+
+def victim_fields(victim):
+    return {
+        "id": victim.get("id"),
+        "pro": victim.get("pro"),
+        "mps_cps": victim.get("mps_cps"),
+        "vic_midname": victim.get("vic_midname"),
+        "vic_qlfr": victim.get("vic_qlfr"),
+        "vic_gndr": victim.get("vic_gndr"),
+        "vic_distprov": victim.get("vic_distprov"),
+        "vic_brgy": victim.get("vic_brgy"),
+        "date_encoded": victim.get("date_encoded"),
+        "entry_number": victim.get("entry_number"),
+        "ppo_cpo": victim.get("ppo_cpo"),
+        "vic_fname": victim.get("vic_fname"),
+        "vic_lname": victim.get("vic_lname"),
+        "vic_alias": victim.get("vic_alias"),
+        "vic_age": victim.get("vic_age"),
+        "vic_cityMun": victim.get("vic_cityMun"),
+        "vic_strName": victim.get("vic_strName")
+    }
+
+
+def suspect_fields(suspect):
+    return {
+        "id": suspect.get("id"),
+        "pro": suspect.get("pro"),
+        "mps_cps": suspect.get("mps_cps"),
+        "sus_midname": suspect.get("sus_midname"),
+        "sus_qlfr": suspect.get("sus_qlfr"),
+        "sus_gndr": suspect.get("sus_gndr"),
+        "sus_distprov": suspect.get("sus_distprov"),
+        "sus_brgy": suspect.get("sus_brgy"),
+        "date_encoded": suspect.get("date_encoded"),
+        "entry_number": suspect.get("entry_number"),
+        "ppo_cpo": suspect.get("ppo_cpo"),
+        "sus_fname": suspect.get("sus_fname"),
+        "sus_lname": suspect.get("sus_lname"),
+        "sus_alias": suspect.get("sus_alias"),
+        "sus_age": suspect.get("sus_age"),
+        "sus_cityMun": suspect.get("sus_cityMun"),
+        "sus_strName": suspect.get("sus_strName")
+    }
+
+
+# Every victim and suspect of the case, keyed by row id in the order they were
+# encoded, so each one is edited and patched as its own row
+
+def get_victims_data(entry_number):
+    bundle = get_case_bundle(entry_number)
+    if bundle is not None:
+        data = bundle["victims"]
+        if isinstance(data, list):
+            return {victim.get("id"): victim_fields(victim) for victim in data}
         else:
             print("Unexpected JSON structure")
-    else:
-        print(f"Failed to retrieve data, status code: {response.status_code}")
 
 
-def get_suspect_data(entry_number):
-    response = requests.get(f"{api_endpoint}/get_suspect_details", params={"entry_number": entry_number})
-    if response.status_code == 200:
-        data = response.json()
-        if data and isinstance(data, list):
-            suspect = data[0]
-            
-            suspect_data = {
-                "id": suspect.get("id"),
-                "pro": suspect.get("pro"),
-                "mps_cps": suspect.get("mps_cps"),
-                "sus_midname": suspect.get("sus_midname"),
-                "sus_qlfr": suspect.get("sus_qlfr"),
-                "sus_gndr": suspect.get("sus_gndr"),
-                "sus_distprov": suspect.get("sus_distprov"),
-                "sus_brgy": suspect.get("sus_brgy"),
-                "date_encoded": suspect.get("date_encoded"),
-                "entry_number": suspect.get("entry_number"),
-                "ppo_cpo": suspect.get("ppo_cpo"),
-                "sus_fname": suspect.get("sus_fname"),
-                "sus_lname": suspect.get("sus_lname"),
-                "sus_alias": suspect.get("sus_alias"),
-                "sus_age": suspect.get("sus_age"),
-                "sus_cityMun": suspect.get("sus_cityMun"),
-                "sus_strName": suspect.get("sus_strName")
-            }
-            
-            return suspect_data
+def get_suspects_data(entry_number):
+    bundle = get_case_bundle(entry_number)
+    if bundle is not None:
+        data = bundle["suspects"]
+        if isinstance(data, list):
+            return {suspect.get("id"): suspect_fields(suspect) for suspect in data}
         else:
             print("Unexpected JSON structure")
-    else:
-        print(f"Failed to retrieve data, status code: {response.status_code}")
 
 
 def get_case_data(entry_number):
-    response = requests.get(f"{api_endpoint}/get_case_details", params={"entry_number": entry_number})
-    if response.status_code == 200:
-        data = response.json()
-        if data and isinstance(data, list):
-            case = data[0]
+    bundle = get_case_bundle(entry_number)
+    if bundle is not None:
+        case = bundle["case"]
+        if case and isinstance(case, dict):
             
             case_data = {
                 "id": case.get("id"),
@@ -100,5 +113,3 @@ def get_case_data(entry_number):
             return case_data
         else:
             print("Unexpected JSON structure")
-    else:
-        print(f"Failed to retrieve data, status code: {response.status_code}")
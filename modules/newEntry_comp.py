@@ -1,7 +1,7 @@
 import streamlit as st
 from datetime import date
 import requests
-from config.database import api_endpoint
+from modules.api_client import get_api_client
 
 # Fomat the dates
 def dateseq():
@@ -17,22 +17,22 @@ def dateseq():
 st.cache_data(ttl="60m")
 def fetch_seq_by_mps_cps(mps_cps):
     try:
-        response = requests.get(f"{api_endpoint}/stations/{mps_cps}")
+        response = get_api_client().station(mps_cps)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
         st.error(f"Error fetching data: {e}")
         return []
 
-# Function to get the next entry number (placeholder)
-def get_next_entry_number(mps_cps):
+# Function to take the next entry number of the station for this month
+def reserve_entry_number(mps_cps):
     try:
-        response = requests.get(f"{api_endpoint}/next_entry_number/{mps_cps}")
+        response = get_api_client().reserve_entry_number(mps_cps)
         response.raise_for_status()
-        return response.json()["next_entry_number"]
+        return response.json()["entry_number"]
     except requests.exceptions.RequestException as e:
-        # st.error(f"Error fetching the next entry number: {e}")
-        return 1
+        st.error(f"Error reserving an entry number: {e}")
+        return None
 
 
 
@@ -54,29 +54,21 @@ def newEntry(mps_cps):
     # Get the Blotter Sequence
     entrySeq, dateMon, entryNum = st.columns(3)
 
-    entrySeq_value = entrySeq.text_input("Station Code", seq, disabled=True,key="entrySeq")
-    dateMon_value = dateMon.text_input("Year|Month Encoded", dateseq(), disabled=True,key="dateMon")
+    entrySeq.text_input("Station Code", seq, disabled=True,key="entrySeq")
+    dateMon.text_input("Year|Month Encoded", dateseq(), disabled=True,key="dateMon")
 
-    # Auto-suggest for the next entry number
-    next_value = get_next_entry_number(mps_cps)
-    entryNum_value = entryNum.text_input("Entry Number", value=next_value)
+    # The number itself is handed out by the backend so two encoders never get the same one
+    entryNum.text_input("Entry Number", value="Assigned on New Entry", disabled=True, key="entryNum")
 
-    combined_value = f"{entrySeq_value}-{dateMon_value}-{entryNum_value}"
+    if st.button("New Entry", type="primary", use_container_width=True):
+        combined_value = reserve_entry_number(mps_cps)
+        if combined_value is None:
+            return
 
-    # Store the combined_value in the session state
-    st.session_state.combined_value = combined_value
+        # Store the combined_value in the session state
+        st.session_state.combined_value = combined_value
 
-    if st.button("New Entry", type="primary", use_container_width=True):
-        # Check if the entry number already exists
-        response = requests.get(f"{api_endpoint}/check_entry/{combined_value}")
-        if response.status_code == 200:
-            result = response.json()
-            if result.get("exists"):
-                st.error(f"Entry number {combined_value} already exists.")
-                return
-        
-        # If the entry number does not exist, proceed with creating a new entry
-        response = requests.post(f"{api_endpoint}/temp-entries/", json={"combined_value": st.session_state.combined_value})
+        response = get_api_client().create_temp_entry(st.session_state.combined_value, st.session_state["name"])
         if response.status_code == 200:
             st.session_state.temp_entry_id = response.json()["id"]
             # print(st.session_state.combined_value)
@@ -84,5 +76,5 @@ def newEntry(mps_cps):
         else:
             st.error("Failed to store the entry")
 
-    return combined_value
+    return st.session_state.get("combined_value")
     
\ No newline at end of file
@@ -1,4 +1,4 @@
-import requests
+from modules.api_client import get_api_client
 from config.models import CaseDetails
 import streamlit as st
 from datetime import date, time
@@ -6,7 +6,7 @@ import json
 
 # import json
 
-def dataEntry_caseDetails(entry_number, case_detail, offense_detail, api_url):
+def dataEntry_caseDetails(entry_number, case_detail, offense_detail):
     # Convert date and time objects to strings
     def serialize_datetime(obj):
         if isinstance(obj, date):
@@ -40,6 +40,8 @@ def dataEntry_caseDetails(entry_number, case_detail, offense_detail, api_url):
         data["date_committed"] = serialize_datetime(case_detail.dt_committed)
     if case_detail.time_committed is not None:
         data["time_committed"] = serialize_datetime(case_detail.time_committed)
+    if case_detail.brgy is not None:
+        data["brgy"] = case_detail.brgy
 
     # Create a new CaseDetails SQLAlchemy model instance with the data
     db_case_details = CaseDetails(**data)
@@ -54,7 +56,7 @@ def dataEntry_caseDetails(entry_number, case_detail, offense_detail, api_url):
         for key, value in case_detail_data.items() if value is not None
     }
 
-    response = requests.post(f"{api_url}/case-details/", json=serializable_case_detail_data)
+    response = get_api_client().create_case_details(serializable_case_detail_data)
 
     if response.status_code == 200:
         print("Case Detail Data successfully input to the database.")
@@ -65,7 +67,7 @@ def dataEntry_caseDetails(entry_number, case_detail, offense_detail, api_url):
 
 
 
-def dataEntry_victimDetails(entry_number, victim_data, api_url):
+def dataEntry_victimDetails(entry_number, victim_data):
     # Ensure victim_data is a dictionary
     if isinstance(victim_data, str):
         # Handle the case where victim_data is a string, perhaps from JSON
@@ -88,7 +90,7 @@ def dataEntry_victimDetails(entry_number, victim_data, api_url):
     # print("Data to be sent:", victim_data)
 
     # Send the data as a JSON payload to the API
-    response = requests.post(f"{api_url}/victim-new-entry/", json=victim_data)
+    response = get_api_client().create_victim(victim_data)
 
     # Print the response status and text for debugging
     # print("Response status code:", response.status_code)
@@ -102,7 +104,7 @@ def dataEntry_victimDetails(entry_number, victim_data, api_url):
 
 
 
-def dataEntry_suspectDetails(entry_number, suspect_data, api_url):
+def dataEntry_suspectDetails(entry_number, suspect_data):
     # Ensure suspect_data is a dictionary
     if isinstance(suspect_data, str):
         # Handle the case where suspect_data is a string, perhaps from JSON
@@ -123,10 +125,59 @@ def dataEntry_suspectDetails(entry_number, suspect_data, api_url):
     suspect_data = {k: v for k, v in suspect_data.items() if v is not None}
 
     # Send the data as a JSON payload to the API
-    response = requests.post(f"{api_url}/suspect-new-entry/", json=suspect_data)
+    response = get_api_client().create_suspect(suspect_data)
 
     if response.status_code == 200:
         print("Suspect Data successfully input to the database.")
     else:
         print("Failed to input data to the database.")
 
+
+def serialize_datetime(obj):
+    if isinstance(obj, date):
+        return obj.strftime('%Y-%m-%d')
+    elif isinstance(obj, time):
+        return obj.strftime('%H:%M:%S')
+    return obj
+
+
+def dataEntry_submitCase(entry_number, case_detail, offense_detail, victim_data_list, suspect_data_list):
+    # Submit the case, its victims and its suspects in one request so they are stored in one transaction
+    if not hasattr(offense_detail, 'offense'):
+        raise ValueError("offense_detail does not have an 'offense' attribute")
+
+    case_data = {
+        "entry_number": entry_number,
+        "pro": case_detail.pro,
+        "ppo_cpo": case_detail.ppo_cpo,
+        "mps_cps": case_detail.mps_cps,
+        "offense": offense_detail.offense,
+        "offense_class": offense_detail.offense_class,
+        "case_status": offense_detail.case_status,
+        "check": offense_detail.check,
+        "narrative": case_detail.det_narrative,
+        "date_reported": serialize_datetime(case_detail.dt_reported),
+        "time_reported": serialize_datetime(case_detail.time_reported),
+        "date_committed": serialize_datetime(case_detail.dt_committed),
+        "time_committed": serialize_datetime(case_detail.time_committed),
+        "brgy": case_detail.brgy
+    }
+
+    # Add entry_number to each victim and suspect and filter out None values
+    victims = [
+        {k: serialize_datetime(v) for k, v in {**victim, "entry_number": entry_number}.items() if v is not None}
+        for victim in victim_data_list
+    ]
+    suspects = [
+        {k: serialize_datetime(v) for k, v in {**suspect, "entry_number": entry_number}.items() if v is not None}
+        for suspect in suspect_data_list
+    ]
+
+    response = get_api_client().submit_case(case_data, victims, suspects)
+
+    if response.status_code == 200:
+        print("Case successfully input to the database.")
+        return True
+    else:
+        print("Failed to input case to the database. Status code:", response.status_code)
+        return False
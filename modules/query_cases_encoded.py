@@ -1,15 +1,14 @@
 import streamlit as st
-from config.database import api_endpoint
-import requests
+from modules.api_client import get_api_client
 from datetime import datetime
 from time import sleep
 
 def search_cases(mps_cps):
-    entry_search = st.text_input("Input Entry Number")
+    entry_search = st.text_input("Input Entry Number, Victim or Suspect Name")
     if st.button("Search Entry", use_container_width=True, type="primary", key="search_button"):
         st.session_state.clear
         if entry_search:
-            response = requests.get(f"{api_endpoint}/search_case", params={"entry_number": entry_search, "mps_cps": mps_cps})
+            response = get_api_client().search_cases(entry_search, mps_cps)
             
             if response.status_code == 200:
                 st.session_state.cases = response.json()
@@ -20,7 +19,7 @@ def search_cases(mps_cps):
                 st.error(f"An error occurred: {response.status_code}")
                 st.session_state.cases = []
         else:
-            st.warning("Please enter an entry number")
+            st.warning("Please enter an entry number or name")
             st.session_state.cases = []
 
 # Function to display cases
@@ -44,9 +43,9 @@ def display_cases():
                     # Store the entry number to be edited in session state
                     st.session_state.current_entry_number = case['entry_number']
                     # If the entry number does not exist, proceed with creating a new entry
-                    response = requests.post(f"{api_endpoint}/temp-edit-entries/", json={"entry_number": st.session_state.current_entry_number})
+                    response = get_api_client().create_temp_edit_entry(st.session_state.current_entry_number, st.session_state["name"])
                     if response.status_code == 200:
-                        st.session_state.current_entry_number = response.json()["id"]
+                        st.session_state.temp_edit_entry_id = response.json()["id"]
                         # print(st.session_state.combined_value)
                         st.cache_data.clear
                         st.switch_page("pages/edit_form.py")
@@ -55,3 +54,32 @@ def display_cases():
                         st.error("Failed to store the entry")
                     
                     # st.switch_page("pages/testpage.py")
+
+
+# Full-text search over the case narratives within a station, province or region
+def search_narratives(scope_params):
+    scope_key = "_".join(scope_params.values())
+    narrative_search = st.text_input("Search Narratives", key=f"narrative_search_{scope_key}",
+                                     help='Words to look for. Use "quotes" for exact phrases, or and -word to exclude')
+    if st.button("Search Narratives", use_container_width=True, key=f"narrative_search_button_{scope_key}"):
+        if narrative_search:
+            response = get_api_client().search_narratives(narrative_search, scope_params)
+
+            if response.status_code == 200:
+                st.session_state.narrative_results = response.json()
+                if not st.session_state.narrative_results:
+                    st.info("No narratives matched")
+            else:
+                st.error(f"An error occurred: {response.status_code}")
+                st.session_state.narrative_results = []
+        else:
+            st.warning("Please enter words to search for")
+            st.session_state.narrative_results = []
+
+    for case in st.session_state.get("narrative_results", []):
+        with st.container(border=True):
+            st.write(f"**:red[ENTRY NUMBER:]** {case['entry_number']}")
+            date_encoded = datetime.fromisoformat(case['date_encoded']).strftime("%m/%d/%Y %I:%M %p")
+            st.write(f":blue-background[**STATION:**] {case['mps_cps']}  :blue-background[**OFFENSE:**] {case['offense']}  "
+                     f":blue-background[**STATUS:**] {case['case_status']}  :blue-background[**DATE ENCODED:**] {date_encoded}")
+            st.markdown(case['headline'])
@@ -0,0 +1,70 @@
+import streamlit as st
+from datetime import date, datetime
+from modules.api_client import get_api_client
+
+# Seconds between refreshes of the report job list while the tab is open
+REPORT_POLL_SECONDS = 10
+
+REPORT_FORMAT_LABELS = {"xlsx": "Excel (XLSX)", "csv": "CSV"}
+
+REPORT_STATUS_LABELS = {
+    "queued": ":orange[Queued]",
+    "running": ":blue[Building]",
+    "done": ":green[Ready]",
+    "failed": ":red[Failed]"
+}
+
+
+@st.experimental_fragment
+def request_report(scope_params: dict, session_token: str):
+    # Only queues the report, the API builds it in the background
+    with st.form("report_request_form"):
+        col1, col2 = st.columns(2)
+        date_from = col1.date_input("Date Reported From", value=date.today().replace(day=1))
+        date_to = col2.date_input("Date Reported To", value=date.today())
+        report_format = st.radio("Format", list(REPORT_FORMAT_LABELS), format_func=REPORT_FORMAT_LABELS.get, horizontal=True)
+        submitted = st.form_submit_button("Request Report", type="primary", use_container_width=True)
+
+    if submitted:
+        if date_from > date_to:
+            st.error("Date Reported From must not be after Date Reported To")
+            return
+
+        response = get_api_client().create_report({
+            **scope_params,
+            "date_from": date_from.isoformat(),
+            "date_to": date_to.isoformat(),
+            "format": report_format
+        }, session_token)
+        if response.status_code == 202:
+            st.success("Report requested, it can be downloaded below once it is ready")
+        else:
+            st.error(f"Failed to request the report: Received status code {response.status_code}")
+
+
+@st.experimental_fragment(run_every=REPORT_POLL_SECONDS)
+def display_report_jobs(session_token: str):
+    api_client = get_api_client()
+    response = api_client.report_jobs(session_token)
+    if response.status_code != 200:
+        st.error(f"Failed to fetch reports: Received status code {response.status_code}")
+        return
+
+    jobs = response.json()
+    if not jobs:
+        st.info("No reports requested yet")
+        return
+
+    for job in jobs:
+        with st.container(border=True):
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                st.write(f"**{job['scope_value']}** | {job['date_from']} to {job['date_to']} | {job['format'].upper()}")
+                requested_at = datetime.fromisoformat(job['created_at']).strftime("%m/%d/%Y %I:%M %p")
+                st.write(f"{REPORT_STATUS_LABELS.get(job['status'], job['status'])} | Requested {requested_at}")
+                if job["status"] == "failed" and job["error"]:
+                    st.caption(job["error"])
+            with col2:
+                # The file is downloaded straight from the API, it never passes through Streamlit
+                if job["status"] == "done":
+                    st.link_button("Download", api_client.report_download_url(job["id"], job["download_token"]), use_container_width=True)
@@ -1,23 +1,31 @@
-import requests
+from modules.api_client import get_api_client
 from datetime import date, time
 import json
 
 
+# Fields of a case_details row that belong to its own offense; the rest are shared by every row of the entry
+OFFENSE_FIELDS = ("offense", "offense_class", "case_status", "check")
 
-def update_case_details(entry_number, case_detail, offense_detail, api_url):
 
-    def serialize_datetime(obj):
-        if isinstance(obj, date):
-            return obj.strftime('%Y-%m-%d')
-        elif isinstance(obj, time):
-            return obj.strftime('%H:%M:%S')
-        return obj
-    
+def serialize_datetime(obj):
+    if isinstance(obj, date):
+        return obj.strftime('%Y-%m-%d')
+    elif isinstance(obj, time):
+        return obj.strftime('%H:%M:%S')
+    return obj
+
+
+def field_diff(original, current):
+    # The fields of current whose value differs from the record as it was loaded
+    original = original or {}
+    return {key: value for key, value in current.items() if original.get(key) != value}
+
+
+def update_case_details(entry_number, case_detail, offense_detail, original_case):
     if not hasattr(offense_detail, 'offense'):
         raise ValueError("offense_detail does not have an 'offense' attribute")
 
     data = {
-        "entry_number": entry_number,
         "pro": case_detail.pro,
         "ppo_cpo": case_detail.ppo_cpo,
         "mps_cps": case_detail.mps_cps,
@@ -26,29 +34,36 @@ def update_case_details(entry_number, case_detail, offense_detail, api_url):
         "case_status": offense_detail.case_status,
         "check": offense_detail.check,
         "narrative": case_detail.det_narrative,
-        "date_reported": serialize_datetime(case_detail.dt_reported)
+        "date_reported": serialize_datetime(case_detail.dt_reported),
+        "time_reported": serialize_datetime(case_detail.time_reported),
+        "date_committed": serialize_datetime(case_detail.dt_committed),
+        "time_committed": serialize_datetime(case_detail.time_committed)
     }
 
-    if case_detail.time_reported is not None:
-        data["time_reported"] = serialize_datetime(case_detail.time_reported)
-    if case_detail.dt_committed is not None:
-        data["date_committed"] = serialize_datetime(case_detail.dt_committed)
-    if case_detail.time_committed is not None:
-        data["time_committed"] = serialize_datetime(case_detail.time_committed)
+    changes = field_diff(original_case, data)
+    if not changes:
+        print("Case Detail Data unchanged.")
+        return
+
+    # The edited offense is the one of the loaded row, the other fields apply to the whole entry
+    offense_changes = {key: value for key, value in changes.items() if key in OFFENSE_FIELDS}
+    case_changes = {key: value for key, value in changes.items() if key not in OFFENSE_FIELDS}
 
-    # print("Request data:", data) # Addedd Code for debugging
-    response = requests.put(f"{api_url}/update-case-details/{entry_number}", json=data)
-    # print("Response status code:", response.status_code)  # Addedd Code for debugging
-    # print("Response text:", response.text)  # Addedd Code for debugging
+    client = get_api_client()
+    responses = []
+    if case_changes:
+        responses.append(client.patch_case_details(entry_number, case_changes))
+    if offense_changes:
+        responses.append(client.patch_case_details(entry_number, offense_changes, row_id=original_case.get("id")))
 
-    if response.status_code == 200:
+    if all(response.status_code == 200 for response in responses):
         print("Case Detail Data successfully updated in the database.")
     else:
         print("Failed to update data in the database.")
 
 
 
-def update_victim_details(entry_number, victim_data, api_url):
+def update_victim_details(entry_number, victim_data, original_victim):
     if isinstance(victim_data, str):
         try:
             victim_data = json.loads(victim_data)
@@ -59,14 +74,14 @@ def update_victim_details(entry_number, victim_data, api_url):
         print("Invalid victim_data format. Expected a dictionary.")
         return
 
-    victim_data['entry_number'] = entry_number
+    victim_data.pop('entry_number', None)
 
-    victim_data = {k: v for k, v in victim_data.items() if v is not None}
+    changes = field_diff(original_victim, victim_data)
+    if not changes:
+        print("Victim Data unchanged.")
+        return
 
-    # print("Request data:", victim_data) # Addedd Code for debugging
-    response = requests.put(f"{api_url}/update-victim-details/{entry_number}", json=victim_data)
-    # print("Response status code:", response.status_code)  # Addedd Code for debugging
-    # print("Response text:", response.text)  # Addedd Code for debugging
+    response = get_api_client().patch_victim(entry_number, changes, row_id=(original_victim or {}).get("id"))
 
     if response.status_code == 200:
         print("Victim Data successfully updated in the database.")
@@ -76,7 +91,7 @@ def update_victim_details(entry_number, victim_data, api_url):
 
 
 
-def update_suspect_details(entry_number, suspect_data, api_url):
+def update_suspect_details(entry_number, suspect_data, original_suspect):
     if isinstance(suspect_data, str):
         try:
             suspect_data = json.loads(suspect_data)
@@ -87,15 +102,14 @@ def update_suspect_details(entry_number, suspect_data, api_url):
         print("Invalid suspect_data format. Expected a dictionary.")
         return
 
-    suspect_data['entry_number'] = entry_number
+    suspect_data.pop('entry_number', None)
 
-    suspect_data = {k: v for k, v in suspect_data.items() if v is not None}
-
-    # print("Request data:", suspect_data) # Addedd Code for debugging
-    response = requests.put(f"{api_url}/update-suspect-details/{entry_number}", json=suspect_data)
-    # print("Response status code:", response.status_code)  # Addedd Code for debugging
-    # print("Response text:", response.text)  # Addedd Code for debugging
+    changes = field_diff(original_suspect, suspect_data)
+    if not changes:
+        print("Suspect Data unchanged.")
+        return
 
+    response = get_api_client().patch_suspect(entry_number, changes, row_id=(original_suspect or {}).get("id"))
 
     if response.status_code == 200:
         print("Suspect Data successfully updated in the database.")
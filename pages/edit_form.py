@@ -1,11 +1,10 @@
 from time import sleep
 import streamlit as st
-from modules.auth_utils import fetch_users, prepare_credentials, initialize_authenticator
-import requests
+from modules.auth_utils import login, get_current_user, reset_session_state
 from edit_data_forms import edit_caseDetails, edit_offenses, edit_suspects, edit_victims
 from modules.updateEntry_functions import *
-from config.database import api_endpoint
-from modules.get_data import get_victim_data, get_suspect_data, get_case_data
+from modules.api_client import get_api_client
+from modules.get_data import get_victims_data, get_suspects_data, get_case_data
 import concurrent.futures
 
 
@@ -20,23 +19,18 @@ def process_offense(offense, offense_class, otherOffense, case_status, check):
         "check": check
     }
 
-# Define the FastAPI base URL
-API_URL = api_endpoint
+def get_entry_number(owner):
+    # The temp edit entry created by this session on the dashboard, looked up by its id
+    entry_id = st.session_state.get("temp_edit_entry_id")
+    if entry_id is None:
+        return None, None
 
-@st.cache_data(ttl="60m")
-def get_entry_number(api_url):
-    response = requests.get(f"{api_url}/temp-edit-entries/")
+    response = get_api_client().temp_edit_entry(entry_id, owner)
     if response.status_code == 200:
-        temp_entries = response.json()
-        if temp_entries:
-            latest_entry = temp_entries[-1]
-            combined_value = latest_entry['entry_number']
-            entry_id = latest_entry['id']
-        else:
-            combined_value = None
-            entry_id = None
+        combined_value = response.json()['entry_number']
     else:
-        st.error("Failed to fetch the combined value")
+        if response.status_code != 404:
+            st.error("Failed to fetch the combined value")
         combined_value = None
         entry_id = None
     return combined_value, entry_id
@@ -64,20 +58,15 @@ def editForm():
     '''
     st.markdown(hide_sidebar_css, unsafe_allow_html=True)
 
-    # Fetch users from FastAPI and prepare credentials
-    users_data = fetch_users()
-    credentials = prepare_credentials(users_data)
-
-    # Initialize the authenticator
-    authenticator = initialize_authenticator(credentials)
-    authenticator.login(fields={'Form name': 'PRO 12 KP Cases Details Encoding User\'s Login'})
+    # Check the session token, or show the login form
+    login('PRO 12 KP Cases Details Encoding User\'s Login')
 
     if st.session_state["authentication_status"]:
         # If authenticated, store and retrieve username
         st.session_state['username'] = st.session_state["name"]
         
         # Fetch the combined_value and its ID using the cached function
-        entry_number, entry_id = get_entry_number(API_URL)
+        entry_number, entry_id = get_entry_number(st.session_state['username'])
         
         # Redirect to home page if combined_value is None
         if entry_number is None:
@@ -87,14 +76,14 @@ def editForm():
 
         if st.button("Home"):
             if entry_id is not None:
-                requests.delete(f"{API_URL}/temp-edit-entries/{entry_id}")
+                get_api_client().delete_temp_edit_entry(entry_id)
             st.cache_data.clear()
-            st.session_state.clear()
+            reset_session_state()
             st.switch_page('app.py')
             
 
         username = st.session_state['username']
-        user_info = credentials["usernames"].get(username, {})
+        user_info = get_current_user()
         pro = "PRO 12"
         mps_cps = user_info.get("mps_cps", "") # THERE IS A POSSIBILITY THAT I WILL BE DELETING THIS
         ppo_cpo = user_info.get("ppo_cpo", "") # THERE IS A POSSIBILITY THAT I WILL BE DELETING THIS
@@ -109,15 +98,23 @@ def editForm():
 
         with complainant:
             st.subheader("Victims's Profile")
-            # Query the victims data and return the nessesary variables
-            vicdetails = get_victim_data(entry_number)
-            victim_data = edit_victims.editVictim(vicdetails)
+            # Query the victims data and return the nessesary variables, one form per victim
+            vicdetails = get_victims_data(entry_number) or {}
+            victim_data = {}
+            for number, (row_id, victim) in enumerate(vicdetails.items(), start=1):
+                if len(vicdetails) > 1:
+                    st.markdown(f"**Victim {number}**")
+                victim_data[row_id] = edit_victims.editVictim(victim, row_key=row_id)
 
 
         with suspect:
             st.subheader("Suspect's Profile")
-            susdetails = get_suspect_data(entry_number)
-            suspect_data = edit_suspects.editSuspect(susdetails)
+            susdetails = get_suspects_data(entry_number) or {}
+            suspect_data = {}
+            for number, (row_id, suspect) in enumerate(susdetails.items(), start=1):
+                if len(susdetails) > 1:
+                    st.markdown(f"**Suspect {number}**")
+                suspect_data[row_id] = edit_suspects.editSuspect(suspect, row_key=row_id)
 
 
         with caseDetail:
@@ -136,12 +133,12 @@ def editForm():
         show_error("Please Complete the Required Entries in Case Detail and Offense Tab")
 
     # Check completeness of victim data
-    victim_data_complete = victim_data is not None
+    victim_data_complete = all(data is not None for data in victim_data.values())
     if not victim_data_complete:
         show_error("Please Complete the Required Entries in Victim's Profile Tab")
 
     # Check completeness of suspect data
-    suspect_data_complete = suspect_data is not None
+    suspect_data_complete = all(data is not None for data in suspect_data.values())
     if not suspect_data_complete:
         show_error("Please Complete the Required Entries in Suspect's Profile Tab")
 
@@ -150,9 +147,12 @@ def editForm():
         if st.button("Update Entry", type="primary", use_container_width=True):
             with concurrent.futures.ThreadPoolExecutor() as executor:
                 futures = []
-                futures.append(executor.submit(update_case_details, entry_number, case_detail, offense_detail, API_URL))
-                futures.append(executor.submit(update_victim_details, entry_number, victim_data, API_URL))
-                futures.append(executor.submit(update_suspect_details, entry_number, suspect_data, API_URL))
+                # Each update sends only what differs from the record loaded into the form
+                futures.append(executor.submit(update_case_details, entry_number, case_detail, offense_detail, casedata))
+                for row_id, data in victim_data.items():
+                    futures.append(executor.submit(update_victim_details, entry_number, data, vicdetails[row_id]))
+                for row_id, data in suspect_data.items():
+                    futures.append(executor.submit(update_suspect_details, entry_number, data, susdetails[row_id]))
 
                 # Wait for all futures to complete
                 for future in concurrent.futures.as_completed(futures):
@@ -163,8 +163,8 @@ def editForm():
             #  Delete temp-entry and go back to main page
             st.warning(f"Entry Number {entry_number} succesfuly updated")
             sleep(3)
-            requests.delete(f"{API_URL}/temp-edit-entries/{entry_id}")
-            st.session_state.clear()
+            get_api_client().delete_temp_edit_entry(entry_id)
+            reset_session_state()
             st.cache_data.clear()
             st.switch_page('app.py')
 
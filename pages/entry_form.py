@@ -1,13 +1,11 @@
 from time import sleep
 import streamlit as st
-from modules.auth_utils import fetch_users, prepare_credentials, initialize_authenticator
-import requests
+from modules.auth_utils import login, get_current_user
 from forms import offenses, victims, suspects, caseDetails
-from forms.offenses import investigator_info
+from forms.offenses import OffenseForm
 from modules.newEntry_functions import *
 from pydantic import ValidationError
-import concurrent.futures
-from config.database import api_endpoint
+from modules.api_client import get_api_client
 
 
 def process_offense(offense, offense_class, otherOffense, case_status, check):
@@ -21,23 +19,18 @@ def process_offense(offense, offense_class, otherOffense, case_status, check):
         "check": check
     }
 
-# Define the FastAPI base URL
-API_URL = api_endpoint
+def fetch_combined_value_and_id(owner):
+    # The temp entry created by this session on the dashboard, looked up by its id
+    entry_id = st.session_state.get("temp_entry_id")
+    if entry_id is None:
+        return None, None
 
-@st.cache_data(ttl="60m")
-def fetch_combined_value_and_id(api_url):
-    response = requests.get(f"{api_url}/temp-entries/")
+    response = get_api_client().temp_entry(entry_id, owner)
     if response.status_code == 200:
-        temp_entries = response.json()
-        if temp_entries:
-            latest_entry = temp_entries[-1]
-            combined_value = latest_entry['combined_value']
-            entry_id = latest_entry['id']
-        else:
-            combined_value = None
-            entry_id = None
+        combined_value = response.json()['combined_value']
     else:
-        st.error("Failed to fetch the combined value")
+        if response.status_code != 404:
+            st.error("Failed to fetch the combined value")
         combined_value = None
         entry_id = None
     return combined_value, entry_id
@@ -65,20 +58,15 @@ def entryForm():
     '''
     st.markdown(hide_sidebar_css, unsafe_allow_html=True)
 
-    # Fetch users from FastAPI and prepare credentials
-    users_data = fetch_users()
-    credentials = prepare_credentials(users_data)
-
-    # Initialize the authenticator
-    authenticator = initialize_authenticator(credentials)
-    authenticator.login(fields={'Form name': 'PRO 12 Crime Incident Recording User\'s Login'})
+    # Check the session token, or show the login form
+    login('PRO 12 Crime Incident Recording User\'s Login')
 
     if st.session_state["authentication_status"]:
         # If authenticated, store and retrieve username
         st.session_state['username'] = st.session_state["name"]
         
         # Fetch the combined_value and its ID using the cached function
-        combined_value, entry_id = fetch_combined_value_and_id(API_URL)
+        combined_value, entry_id = fetch_combined_value_and_id(st.session_state['username'])
         
         # Redirect to home page if combined_value is None
         if combined_value is None:
@@ -88,7 +76,8 @@ def entryForm():
 
         if st.button("Home"):
             if entry_id is not None:
-                requests.delete(f"{API_URL}/temp-entries/{entry_id}")
+                get_api_client().delete_temp_entry(entry_id)
+                st.session_state.pop("temp_entry_id", None)
                 # if response.status_code == 200:
                 #     st.success("Successfully deleted the entry")
                 # else:
@@ -96,7 +85,7 @@ def entryForm():
             st.switch_page('app.py')
 
         username = st.session_state['username']
-        user_info = credentials["usernames"].get(username, {})
+        user_info = get_current_user()
         pro = "PRO 12"
         mps_cps = user_info.get("mps_cps", "")
         ppo_cpo = user_info.get("ppo_cpo", "")
@@ -109,59 +98,64 @@ def entryForm():
 
         complainant, suspect, caseDetail, offense = st.tabs(["Complainant / Victim's Profile", "Suspect/s Profile", "Case Detail", "Offense"])
 
+        # Every sub-form is a fragment that keeps its validated data in the session,
+        # so editing one of them doesn't rerun this page or the other sub-forms
         with complainant:
             st.subheader("Victims's Profile")
-            victim_data = victims.addVictim(mps_cps,ppo_cpo,pro)
+            victims.addVictim(mps_cps,ppo_cpo,pro)
 
 
         with suspect:
             st.subheader("Suspect's Profile")
-            suspect_data = suspects.addSuspect(mps_cps,ppo_cpo,pro)
+            suspects.addSuspect(mps_cps,ppo_cpo,pro)
 
 
         with caseDetail:
             st.subheader("Case Details")
-            case_detail = caseDetails.case_Details(mps_cps,ppo_cpo,pro)
+            caseDetails.addCaseDetails(mps_cps,ppo_cpo,pro)
         
         with offense:
-            invest_info = investigator_info()
-            offense_detail = offenses.addOffense()
-
-
-    # Check completeness of case detail and offense detail
-    case_detail_complete = case_detail is not None and offense_detail is not None and hasattr(offense_detail, 'offense')
-    if not case_detail_complete:
-        show_error("Please Complete the Required Entries in Case Detail and Offense Tab")
-
-    # Check completeness of victim data
-    victim_data_complete = victim_data is not None
-    if not victim_data_complete:
-        show_error("Please Complete the Required Entries in Victim's Profile Tab")
+            OffenseForm()
 
-    # Check completeness of suspect data
-    suspect_data_complete = suspect_data is not None
-    if not suspect_data_complete:
-        show_error("Please Complete the Required Entries in Suspect's Profile Tab")
 
-    # Add submit button if all required data is complete
-    if case_detail_complete and victim_data_complete and suspect_data_complete:
         if st.button("Submit Entry", type="primary", use_container_width=True):
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                futures = []
-                futures.append(executor.submit(dataEntry_caseDetails, combined_value, case_detail, offense_detail, API_URL))
-                futures.append(executor.submit(dataEntry_victimDetails, combined_value, victim_data, API_URL))
-                futures.append(executor.submit(dataEntry_suspectDetails, combined_value, suspect_data, API_URL))
-
-                # Wait for all futures to complete
-                for future in concurrent.futures.as_completed(futures):
-                    try:
-                        future.result()  # Get the result to raise any exceptions
-                    except Exception as e:
-                        show_error(f"An error occurred: {e}")
+            # Read what the sub-forms last validated
+            case_detail = st.session_state.get("case_detail_result")
+            offense_detail = st.session_state.get("offense_detail_result")
+            victim_data = victims.get_victim_data_list()
+            suspect_data = suspects.get_suspect_data_list()
+
+            # Check completeness of case detail and offense detail
+            case_detail_complete = case_detail is not None and offense_detail is not None and hasattr(offense_detail, 'offense')
+            if not case_detail_complete:
+                show_error("Please Complete the Required Entries in Case Detail and Offense Tab")
+
+            # Check completeness of victim data
+            victim_data_complete = bool(victim_data)
+            if not victim_data_complete:
+                show_error("Please Complete the Required Entries in Victim's Profile Tab")
+
+            # Check completeness of suspect data
+            suspect_data_complete = bool(suspect_data)
+            if not suspect_data_complete:
+                show_error("Please Complete the Required Entries in Suspect's Profile Tab")
+
+            if not (case_detail_complete and victim_data_complete and suspect_data_complete):
+                return
+
+            try:
+                submitted = dataEntry_submitCase(combined_value, case_detail, offense_detail, victim_data, suspect_data)
+            except Exception as e:
+                show_error(f"An error occurred: {e}")
+                return
+            if not submitted:
+                show_error(f"Entry Number {combined_value} was not submitted, please try again")
+                return
             #  Delete temp-entry and go back to main page
             st.success(f"Entry Number {combined_value} succesfuly submitted")
             sleep(3)
-            requests.delete(f"{API_URL}/temp-entries/{entry_id}")
+            get_api_client().delete_temp_entry(entry_id)
+            st.session_state.pop("temp_entry_id", None)
             st.switch_page('app.py')
 
 